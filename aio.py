@@ -0,0 +1,344 @@
+"""Regex searches from asyncio code without blocking the event loop"""
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import nfa
+import recache
+import streaming
+
+# A long recache.search(r"foo.*bar", <huge string>) inside a coroutine blocks the event loop: the re module
+# runs the whole search in C and never gives the loop a chance to run anything else.
+# Handing the search to a thread doesn't help much either, re holds the GIL while it matches.
+# So there are two ways out here:
+#   - Pool runs asearch(), amatch(), afullmatch() and asub() in worker processes. Only a bounded number of
+#     calls is handed to the workers at a time, the others wait in the event loop where they can be cancelled,
+#     and stats() tells how many are waiting and running (the queue depth).
+#     A call that times out or is cancelled returns right away, but re can't be interrupted: its worker only
+#     becomes free again once the search ends. Pool(engine="nfa") runs the calls on nfa.py's engine instead,
+#     with the time the caller has left: the worker gives up when the caller does. That engine is much slower
+#     than re on everyday patterns and can't run everything (backreferences, lookarounds, ...), it is meant
+#     for patterns that can run away on untrusted input (see backtracking.analyze()).
+#     Every event loop that uses a Pool gets its own count of free workers (an asyncio.Semaphore belongs
+#     to one loop), so one Pool can serve successive asyncio.run() calls.
+#   - afinditer() searches in the event loop itself, one chunk at a time (see streaming.py), and lets the loop
+#     run other tasks between chunks. It reads from an asyncio.StreamReader, or chops up a str/bytes object.
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+ENGINES = ("re", "nfa")
+
+
+class AsyncMatch:
+    """re.Match lookalike for a match found in a worker: the spans travel back, the text is sliced here"""
+
+    def __init__(self, regex, string, regs, lastindex):
+        self.re = regex
+        self.string = string
+        self.regs = regs
+        self.lastindex = lastindex
+        names = {index: name for name, index in regex.groupindex.items()}
+        self.lastgroup = names.get(lastindex)
+
+    def _index(self, group):
+        if isinstance(group, str):
+            group = self.re.groupindex.get(group, -1)
+        if not 0 <= group <= self.re.groups:
+            raise IndexError("no such group")
+        return group
+
+    def span(self, group=0):
+        return self.regs[self._index(group)]
+
+    def start(self, group=0):
+        return self.span(group)[0]
+
+    def end(self, group=0):
+        return self.span(group)[1]
+
+    def _group(self, group, default=None):
+        start, end = self.span(group)
+        return default if start == -1 else self.string[start:end]
+
+    def group(self, *groups):
+        if not groups:
+            return self._group(0)
+        if len(groups) == 1:
+            return self._group(groups[0])
+        return tuple(self._group(group) for group in groups)
+
+    def __getitem__(self, group):
+        return self._group(group)
+
+    def groups(self, default=None):
+        return tuple(
+            self._group(index, default) for index in range(1, self.re.groups + 1)
+        )
+
+    def groupdict(self, default=None):
+        return {
+            name: self._group(index, default)
+            for name, index in self.re.groupindex.items()
+        }
+
+    def __repr__(self):
+        return f"<aio.AsyncMatch object; span={self.span()!r}, match={self.group()!r}>"
+
+
+# The functions below run in the workers, every worker process has its own recache
+
+
+_nfa_cache = recache.PatternCache(compiler=nfa.compile)
+
+
+def _compile(engine, pattern, flags, timeout):
+    if engine == "re":
+        return recache.compile(pattern, flags)
+    # Raises nfa.MatchTimeout once the call has run for timeout seconds
+    program = _nfa_cache.compile(pattern, flags).program
+    return nfa.NFAPattern(pattern, flags, timeout=timeout, program=program)
+
+
+def _find(engine, pattern, flags, method, string, pos, endpos, timeout):
+    m = getattr(_compile(engine, pattern, flags, timeout), method)(string, pos, endpos)
+    return None if m is None else (m.regs, m.lastindex)
+
+
+def _subn(engine, pattern, flags, repl, string, count, timeout):
+    return _compile(engine, pattern, flags, timeout).subn(repl, string, count)
+
+
+class Pool:
+    """Bounded executor for regex calls from coroutines
+
+    At most max_workers calls run at a time. When max_waiting is set, a call arriving while that many
+    are already waiting raises asyncio.QueueFull instead of waiting too.
+    processes=False runs the calls in threads: cheaper to start, but re holds the GIL while it matches.
+    engine="nfa" runs them on nfa.py's engine, which stops at the timeout and raises nfa.Unsupported for
+    patterns it can't run.
+    """
+
+    def __init__(self, max_workers=None, max_waiting=None, processes=True, engine="re"):
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, not {engine!r}")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_waiting = max_waiting
+        self.processes = processes
+        self.engine = engine
+        self._executor = None
+        # event loop -> asyncio.Semaphore with a slot per worker
+        self._slots = weakref.WeakKeyDictionary()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            kind = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            self._executor = kind(self.max_workers)
+        return self._executor
+
+    def _get_slots(self, loop):
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_workers)
+        return slots
+
+    async def run(self, fn, *args, timeout=None, remaining=False):
+        """Run fn(*args) in a worker, waiting at most timeout seconds for a free worker and the result
+
+        remaining=True passes fn the seconds of timeout left once it has a worker (None without a timeout)
+        as its last argument.
+        """
+        executor = self._get_executor()
+        if self.max_waiting is not None and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise asyncio.QueueFull(f"{self.waiting} regex calls are already waiting")
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots(loop)
+        deadline = None if timeout is None else loop.time() + timeout
+        self.waiting += 1
+        try:
+            if timeout is None:
+                await slots.acquire()
+            else:
+                await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        if remaining:
+            left = None if deadline is None else max(0.0, deadline - loop.time())
+            args += (left,)
+        future = loop.run_in_executor(executor, fn, *args)
+        # The slot is given back when the worker is done, not when the caller stops waiting for it
+        future.add_done_callback(functools.partial(self._release, slots))
+        try:
+            if deadline is None:
+                return await asyncio.shield(future)
+            return await asyncio.wait_for(
+                asyncio.shield(future), max(0.0, deadline - loop.time())
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except nfa.MatchTimeout as e:
+            # The worker gave up just before the caller did
+            self.timeouts += 1
+            raise asyncio.TimeoutError(str(e)) from e
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    def _release(self, slots, future):
+        self.running -= 1
+        self.completed += 1
+        slots.release()
+        if not future.cancelled():
+            # Mark the exception as retrieved when nobody waits for the result anymore
+            future.exception()
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+        }
+
+    async def _find(self, method, pattern, string, flags, pos, endpos, timeout):
+        regex = recache.compile(pattern, flags)
+        if endpos is None:
+            endpos = len(string)
+        found = await self.run(
+            _find,
+            self.engine,
+            regex.pattern,
+            regex.flags,
+            method,
+            string,
+            pos,
+            endpos,
+            timeout=timeout,
+            remaining=True,
+        )
+        return None if found is None else AsyncMatch(regex, string, *found)
+
+    async def asearch(self, pattern, string, flags=0, pos=0, endpos=None, timeout=None):
+        return await self._find("search", pattern, string, flags, pos, endpos, timeout)
+
+    async def amatch(self, pattern, string, flags=0, pos=0, endpos=None, timeout=None):
+        return await self._find("match", pattern, string, flags, pos, endpos, timeout)
+
+    async def afullmatch(
+        self, pattern, string, flags=0, pos=0, endpos=None, timeout=None
+    ):
+        return await self._find(
+            "fullmatch", pattern, string, flags, pos, endpos, timeout
+        )
+
+    async def asubn(self, pattern, repl, string, count=0, flags=0, timeout=None):
+        """re.subn() in a worker, repl must be a template (a function can't be sent to a worker process)"""
+        regex = recache.compile(pattern, flags)
+        return await self.run(
+            _subn,
+            self.engine,
+            regex.pattern,
+            regex.flags,
+            repl,
+            string,
+            count,
+            timeout=timeout,
+            remaining=True,
+        )
+
+    async def asub(self, pattern, repl, string, count=0, flags=0, timeout=None):
+        return (await self.asubn(pattern, repl, string, count, flags, timeout))[0]
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait)
+            self._executor = None
+
+
+_default = None
+
+
+def default_pool():
+    """The Pool used by the module level functions, created on first use"""
+    global _default
+    if _default is None:
+        _default = Pool()
+    return _default
+
+
+async def asearch(pattern, string, flags=0, pos=0, endpos=None, timeout=None):
+    return await default_pool().asearch(pattern, string, flags, pos, endpos, timeout)
+
+
+async def amatch(pattern, string, flags=0, pos=0, endpos=None, timeout=None):
+    return await default_pool().amatch(pattern, string, flags, pos, endpos, timeout)
+
+
+async def afullmatch(pattern, string, flags=0, pos=0, endpos=None, timeout=None):
+    return await default_pool().afullmatch(pattern, string, flags, pos, endpos, timeout)
+
+
+async def asub(pattern, repl, string, count=0, flags=0, timeout=None):
+    return await default_pool().asub(pattern, repl, string, count, flags, timeout)
+
+
+async def asubn(pattern, repl, string, count=0, flags=0, timeout=None):
+    return await default_pool().asubn(pattern, repl, string, count, flags, timeout)
+
+
+async def _read_chunks(source, chunk_size):
+    if isinstance(source, (str, bytes, bytearray, memoryview)):
+        for chunk in streaming.chunks(source, chunk_size):
+            yield chunk
+        return
+    while True:
+        chunk = await source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def afinditer(
+    pattern,
+    source,
+    flags=0,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    overlap=streaming.DEFAULT_OVERLAP,
+    timeout=None,
+):
+    """Async generator of the streaming.StreamMatch objects of pattern in source
+
+    source is an asyncio.StreamReader or a str/bytes object. The event loop gets to run other tasks after
+    every chunk; with timeout, asyncio.TimeoutError is raised once that many seconds have passed.
+    """
+    scanner = streaming.StreamScanner(pattern, flags, overlap)
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    async for chunk in _read_chunks(source, chunk_size):
+        for _, base, m in scanner.feed(chunk):
+            if not isinstance(m, int):
+                yield streaming.StreamMatch(m, base)
+        if deadline is not None and loop.time() > deadline:
+            raise asyncio.TimeoutError(f"afinditer() ran for more than {timeout}s")
+        await asyncio.sleep(0)
+    for _, base, m in scanner.finish():
+        if not isinstance(m, int):
+            yield streaming.StreamMatch(m, base)
@@ -0,0 +1,253 @@
+"""Spotting patterns that can make the re module backtrack for ages"""
+import re
+
+import nfa
+import recache
+import reparse
+
+# The re module tries the ways a pattern can match one after the other and backtracks when one fails.
+# Some pattern shapes give it a huge number of ways to try on a string that (almost) matches:
+#   - exponential: a repeated group whose body can match the same text in more than one way,
+#     e.g. nested quantifiers (a+)+ or (\w*\s?)* and repeated alternatives that overlap (\d|\w+)* or (ab|a.)*.
+#     Each extra character doubles the work: ~30 characters can already pin a core.
+#   - polynomial: unbounded quantifiers next to each other that accept the same characters, e.g. \d+\d+ or .*.*=.*
+#     The work grows with a power of the string length.
+# analyze() looks for these shapes in the parse tree. It is a heuristic: it doesn't prove a pattern is slow,
+# it points out the constructs that usually are.
+# compile() uses it to pick an engine: patterns with an exponential risk go to the linear-time engine in nfa.py
+# (when they don't need backtracking features like backreferences), everything else to re.
+
+NONE = "none"
+POLYNOMIAL = "polynomial"
+EXPONENTIAL = "exponential"
+
+# Repeats with an upper bound above this count as unbounded: (a{1,100}){1,100} is as bad as (a+)+
+UNBOUNDED = 16
+
+# Characters used to decide whether two character sets overlap
+_SAMPLE = range(0x250)
+
+
+class Analysis:
+    """Result of analyze(): the worst risk found and a human readable reason for every finding"""
+
+    def __init__(self, pattern, risk, reasons):
+        self.pattern = pattern
+        self.risk = risk
+        self.reasons = reasons
+
+    def __bool__(self):
+        return self.risk != NONE
+
+    def __repr__(self):
+        return (
+            f"Analysis({self.pattern!r}, risk={self.risk!r}, reasons={self.reasons!r})"
+        )
+
+
+class _Anything:
+    def __contains__(self, code):
+        return True
+
+
+class _NotNewline:
+    def __contains__(self, code):
+        return code != 10
+
+
+def _first(items, flags, ascii):
+    """Character sets one of which the first consumed character of items belongs to, and whether items can be empty"""
+    sets = []
+    for op, av in items:
+        if op in (reparse.AT, reparse.ASSERT, reparse.ASSERT_NOT):
+            continue
+        if op is reparse.LITERAL:
+            sets.append(nfa.CharClass([(op, av)], bool(flags & re.IGNORECASE), ascii))
+            return sets, False
+        if op is reparse.NOT_LITERAL:
+            sets.append(
+                nfa.CharClass(
+                    [(reparse.NEGATE, None), (reparse.LITERAL, av)], False, ascii
+                )
+            )
+            return sets, False
+        if op is reparse.IN:
+            sets.append(nfa.CharClass(av, bool(flags & re.IGNORECASE), ascii))
+            return sets, False
+        if op is reparse.ANY:
+            sets.append(_Anything() if flags & re.DOTALL else _NotNewline())
+            return sets, False
+        if op is reparse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            sub_sets, nullable = _first(sub, (flags | add_flags) & ~del_flags, ascii)
+        elif op is reparse.BRANCH:
+            sub_sets, nullable = [], False
+            for alternative in av[1]:
+                alternative_sets, alternative_nullable = _first(
+                    alternative, flags, ascii
+                )
+                sub_sets += alternative_sets
+                nullable = nullable or alternative_nullable
+        elif op in (reparse.MAX_REPEAT, reparse.MIN_REPEAT, reparse.POSSESSIVE_REPEAT):
+            sub_sets, nullable = _first(av[2], flags, ascii)
+            nullable = nullable or av[0] == 0
+        else:
+            # Backreferences, conditionals, atomic groups: assume they could start with anything
+            sets.append(_Anything())
+            return sets, False
+        sets += sub_sets
+        if not nullable:
+            return sets, False
+    return sets, True
+
+
+def _overlap(sets1, sets2):
+    return any(
+        any(code in s for s in sets1) and any(code in s for s in sets2)
+        for code in _SAMPLE
+    )
+
+
+def _unbounded(op, av):
+    return op in (reparse.MAX_REPEAT, reparse.MIN_REPEAT) and av[1] > UNBOUNDED
+
+
+class _Analyzer:
+    def __init__(self, parsed, ascii):
+        self.parsed = parsed
+        self.ascii = ascii
+        self.risk = NONE
+        self.reasons = []
+
+    def report(self, risk, reason):
+        if risk == EXPONENTIAL or self.risk == NONE:
+            self.risk = risk
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+
+    def width(self, op, av):
+        return reparse.width(self.parsed, [(op, av)])
+
+    def sequence(self, items, flags):
+        # previous holds the character sets of the last unbounded quantifier, as long as
+        # everything after it can match the empty string
+        previous = None
+        for op, av in items:
+            if _unbounded(op, av):
+                sets, _ = _first(av[2], flags, self.ascii)
+                if previous is not None and _overlap(previous, sets):
+                    self.report(
+                        POLYNOMIAL,
+                        "adjacent unbounded quantifiers accept the same characters",
+                    )
+                previous = sets
+            elif self.width(op, av)[0] > 0:
+                previous = None
+            self.node(op, av, flags)
+
+    def node(self, op, av, flags):
+        if op is reparse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            self.sequence(sub, (flags | add_flags) & ~del_flags)
+        elif op is reparse.BRANCH:
+            for alternative in av[1]:
+                self.sequence(alternative, flags)
+        elif op in (reparse.ASSERT, reparse.ASSERT_NOT):
+            self.sequence(av[1], flags)
+        elif op is reparse.ATOMIC_GROUP:
+            self.sequence(av, flags)
+        elif op is reparse.GROUPREF_EXISTS:
+            self.sequence(av[1], flags)
+            if av[2] is not None:
+                self.sequence(av[2], flags)
+        elif op in (reparse.MAX_REPEAT, reparse.MIN_REPEAT):
+            if _unbounded(op, av):
+                self.repeated(av[2], flags)
+            self.sequence(av[2], flags)
+
+    def restarts(self, body, flags, sets):
+        """Whether what an alternative consumes could instead start the next iteration of body
+
+        Only when an iteration can't be empty: re ends the loop after an empty one, (a|)+ isn't ambiguous.
+        """
+        if reparse.width(self.parsed, body)[0] == 0:
+            return False
+        return _overlap(sets, _first(body, flags, self.ascii)[0])
+
+    def repeated(self, body, flags):
+        """Look inside the body of an unbounded repeat for ways to match the same text more than once"""
+        for op, av, item_flags in _walk(body, flags):
+            if _unbounded(op, av) and self.width(op, av)[1] != 0:
+                self.report(
+                    EXPONENTIAL,
+                    "nested quantifiers: a repeated group contains an unbounded quantifier",
+                )
+            elif op is reparse.BRANCH:
+                # The parser already factored out common prefixes: (a|a)* arrives as a(?:|)*, two empty alternatives
+                firsts = [
+                    _first(alternative, item_flags, self.ascii) for alternative in av[1]
+                ]
+                for i, (sets, nullable) in enumerate(firsts):
+                    for other_sets, other_nullable in firsts[i + 1 :]:
+                        if (nullable and other_nullable) or _overlap(sets, other_sets):
+                            self.report(
+                                EXPONENTIAL,
+                                "a repeated alternation has alternatives that can match alike",
+                            )
+                        elif nullable != other_nullable and self.restarts(
+                            body, flags, other_sets if nullable else sets
+                        ):
+                            # (a|aa)+ arrives as a(?:|a)+: "aa" is one iteration taking the second
+                            # alternative or two taking the empty one
+                            self.report(
+                                EXPONENTIAL,
+                                "a repeated alternation has an alternative that can match nothing "
+                                "next to one that consumes",
+                            )
+
+
+def _walk(items, flags):
+    """Every node below items (lookarounds excluded), with the flags in effect for it"""
+    for op, av in items:
+        yield op, av, flags
+        if op is reparse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            yield from _walk(sub, (flags | add_flags) & ~del_flags)
+        elif op is reparse.BRANCH:
+            for alternative in av[1]:
+                yield from _walk(alternative, flags)
+        elif op in (reparse.MAX_REPEAT, reparse.MIN_REPEAT):
+            yield from _walk(av[2], flags)
+
+
+def analyze(pattern, flags=0):
+    """Return an Analysis of how badly the re module can backtrack on pattern"""
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    parsed = reparse.parse(pattern, flags)
+    ascii = isinstance(pattern, bytes) or bool(parsed.state.flags & re.ASCII)
+    analyzer = _Analyzer(parsed, ascii)
+    analyzer.sequence(parsed, parsed.state.flags)
+    return Analysis(pattern, analyzer.risk, analyzer.reasons)
+
+
+# Risks for which compile() switches to the NFA engine. Polynomial patterns stay on re: the NFA engine is
+# written in Python and much slower per character, it only pays off where re can take exponential time.
+NFA_RISKS = (EXPONENTIAL,)
+
+
+def _compile(pattern, flags):
+    if analyze(pattern, flags).risk in NFA_RISKS:
+        try:
+            return nfa.compile(pattern, flags)
+        except nfa.Unsupported:
+            pass
+    return recache.compile(pattern, flags)
+
+
+_cache = recache.PatternCache(compiler=_compile)
+
+
+def compile(pattern, flags=0):
+    """Compile pattern with re, or with the linear-time NFA engine when re could backtrack exponentially"""
+    return _cache.compile(pattern, flags)
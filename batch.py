@@ -0,0 +1,126 @@
+"""Matching one pattern against millions of strings on every core"""
+import os
+import re
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import recache
+
+# Calling recache.search(<regex>, <string>) in a loop uses a single core, and every call builds a Match object.
+# batch_search() splits the strings into chunks and hands the chunks to a pool of worker processes:
+#   - each worker compiles <regex> once when it starts, only the strings travel to the workers
+#   - results come back as compact arrays instead of Match objects:
+#       spans=False -> array("B") with 1 where the string matched and 0 where it didn't
+#       spans=True  -> array("q") with a (start, end) pair per string, (-1, -1) where it didn't match
+#   - only a few chunks per worker are in flight at any time, so the input can be a lazy iterable
+#     (e.g. the lines of a huge file) without being read into memory first
+
+DEFAULT_CHUNKSIZE = 10_000
+METHODS = ("search", "match", "fullmatch")
+
+_worker_regex = None
+
+
+def _init_worker(pattern, flags):
+    global _worker_regex
+    _worker_regex = recache.compile(pattern, flags)
+
+
+def _run(regex, items, method, spans):
+    find = getattr(regex, method)
+    if not spans:
+        return array("B", [find(item) is not None for item in items])
+    result = array("q")
+    for item in items:
+        m = find(item)
+        result.extend(m.span() if m is not None else (-1, -1))
+    return result
+
+
+def _work(offset, items, method, spans):
+    return offset, _run(_worker_regex, items, method, spans)
+
+
+def _chunked(iterable, chunksize):
+    iterator = iter(iterable)
+    offset = 0
+    while True:
+        items = list(islice(iterator, chunksize))
+        if not items:
+            return
+        yield offset, items
+        offset += len(items)
+
+
+def ibatch_search(
+    pattern,
+    iterable,
+    flags=0,
+    workers=None,
+    chunksize=DEFAULT_CHUNKSIZE,
+    spans=False,
+    method="search",
+    ordered=True,
+):
+    """Yield (offset, results) per chunk, where offset is the index of the chunk's first string in iterable
+
+    With ordered=False chunks are yielded as soon as a worker finishes them, not in input order.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+    if isinstance(pattern, re.Pattern):
+        if flags:
+            raise ValueError("cannot process flags argument with a compiled pattern")
+        pattern, flags = pattern.pattern, pattern.flags
+    workers = workers or os.cpu_count() or 1
+    tasks = _chunked(iterable, chunksize)
+    if workers == 1:
+        regex = recache.compile(pattern, flags)
+        for offset, items in tasks:
+            yield offset, _run(regex, items, method, spans)
+        return
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(pattern, flags)
+    ) as executor:
+        pending = deque()
+        for offset, items in tasks:
+            pending.append(executor.submit(_work, offset, items, method, spans))
+            if len(pending) >= 2 * workers:
+                yield from _drain(pending, ordered, everything=False)
+        yield from _drain(pending, ordered, everything=True)
+
+
+def _drain(pending, ordered, everything):
+    while pending:
+        if ordered:
+            yield pending.popleft().result()
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                yield future.result()
+        if not everything:
+            return
+
+
+def batch_search(
+    pattern,
+    iterable,
+    flags=0,
+    workers=None,
+    chunksize=DEFAULT_CHUNKSIZE,
+    spans=False,
+    method="search",
+):
+    """Match pattern against every string of iterable in parallel, returning one array in input order"""
+    results = {}
+    for offset, result in ibatch_search(
+        pattern, iterable, flags, workers, chunksize, spans, method, ordered=False
+    ):
+        results[offset] = result
+    combined = array("q" if spans else "B")
+    for offset in sorted(results):
+        combined.extend(results[offset])
+    return combined
@@ -0,0 +1,86 @@
+"""Throughput of multiliteral.LiteralAlternation versus an re alternation of the same literals
+
+Run from the repository root:
+    python -m benchmarks.alternation [--size BYTES] [--counts 10,1000,100000]
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+import multiliteral
+
+
+def words(count, rng):
+    seen = set()
+    while len(seen) < count:
+        seen.add(
+            "".join(
+                rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12))
+            )
+        )
+    return sorted(seen, key=lambda _: rng.random())
+
+
+def corpus(size, keywords, rng):
+    # Mostly filler words with a keyword roughly every 200 characters
+    parts, length = [], 0
+    while length < size:
+        if rng.random() < 0.03:
+            word = rng.choice(keywords)
+        else:
+            word = "".join(
+                rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))
+            )
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=1_000_000, help="corpus size in characters"
+    )
+    parser.add_argument(
+        "--counts",
+        default="10,1000,100000",
+        help="comma separated numbers of alternatives",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    print(
+        f"{'alternatives':>12} {'engine':>10} {'compile s':>10} {'scan s':>9} {'MB/s':>8} {'matches':>8}"
+    )
+    for count in map(int, args.counts.split(",")):
+        keywords = words(count, rng)
+        text = corpus(args.size, keywords, rng)
+        pattern = "|".join(map(re.escape, keywords))
+        engines = (
+            ("re", lambda: re.compile(pattern)),
+            ("automaton", lambda: multiliteral.LiteralAlternation(keywords, pattern)),
+        )
+        spans = []
+        for name, build in engines:
+            compiled, compile_seconds = timed(build)
+            found, scan_seconds = timed(
+                lambda: [m.span() for m in compiled.finditer(text)]
+            )
+            spans.append(found)
+            print(
+                f"{count:>12} {name:>10} {compile_seconds:>10.3f} {scan_seconds:>9.3f}"
+                f" {len(text) / scan_seconds / 1e6:>8.2f} {len(found):>8}"
+            )
+        assert spans[0] == spans[1], "engines disagree"
+
+
+if __name__ == "__main__":
+    main()
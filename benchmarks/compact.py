@@ -0,0 +1,67 @@
+"""Memory and time of compact.findall_spans() versus keeping re.finditer() matches or re.findall() tuples
+
+Run from the repository root:
+    python -m benchmarks.compact [--matches 1000000]
+"""
+import argparse
+import gc
+import random
+import re
+import string
+import time
+import tracemalloc
+
+import compact
+
+PATTERN = r"(?P<w1>\w+),(?P<w2>\w+),(?P<w3>\w+)"
+
+
+def make_text(count, rng):
+    def word():
+        return "".join(
+            rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 8))
+        )
+
+    return "\n".join(f"{word()},{word()},{word()}" for _ in range(count))
+
+
+def measure(fn):
+    """(seconds, bytes still allocated by the result, peak bytes while building it)
+
+    tracemalloc slows down every allocation, so the time comes from a separate untraced run.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    text = make_text(args.matches, random.Random(args.seed))
+    regex = re.compile(PATTERN)
+    contenders = (
+        ("finditer Match objects", lambda: list(regex.finditer(text))),
+        ("findall tuples", lambda: regex.findall(text)),
+        ("findall_spans", lambda: compact.findall_spans(regex, text)),
+    )
+    print(f"{'':>24} {'seconds':>8} {'kept MB':>8} {'peak MB':>8} {'bytes/match':>12}")
+    for name, fn in contenders:
+        elapsed, current, peak = measure(fn)
+        print(
+            f"{name:>24} {elapsed:>8.2f} {current / 1e6:>8.1f} {peak / 1e6:>8.1f} {current / args.matches:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Validations per second of dfa.fullmatch_bool() versus re.fullmatch() and the NFA engine
+
+"dfa" always runs the LazyDFA, "auto" is what dfa.compile() picks for the pattern.
+
+Run from the repository root:
+    python -m benchmarks.dfa [--strings 20000] [--max-states 4096]
+"""
+import argparse
+import random
+import re
+import time
+
+import dfa
+import nfa
+
+PHONE = r"^(\(\d{3}\))?\s?\d{3}[-.]\d{4}$"
+
+
+def phone_numbers(count, rng):
+    """Phone numbers in the formats of flags.py, every fourth one broken"""
+    strings = []
+    for i in range(count):
+        digits = "".join(rng.choice("0123456789") for _ in range(10))
+        area = rng.choice(["", f"({digits[:3]})", f"({digits[:3]}) "])
+        number = f"{area}{digits[3:6]}{rng.choice('-.')}{digits[6:]}"
+        if i % 4 == 3:
+            at = rng.randrange(len(number))
+            number = number[:at] + rng.choice("x- ") + number[at + 1 :]
+        strings.append(number)
+    return strings
+
+
+# (name, pattern, strings): the last one makes re backtrack exponentially, hence the short strings
+def workloads(count, rng):
+    words = "".join(rng.choice("abcdefgh ") for _ in range(100_000))
+    return (
+        ("phone numbers", PHONE, phone_numbers(count, rng)),
+        ("one 100K line", r"[a-h ]*", [words] * 10),
+        ("(a|aa)*b", r"(a|aa)*b", ["a" * n for n in range(20, 28)]),
+    )
+
+
+def timed(validate, strings):
+    start = time.perf_counter()
+    answers = [validate(s) for s in strings]
+    return time.perf_counter() - start, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strings", type=int, default=20_000)
+    parser.add_argument("--max-states", type=int, default=dfa.DEFAULT_MAX_STATES)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    print(f"{'workload':>16} {'engine':>6} {'strings/s':>12} {'ns/char':>9}")
+    for name, pattern, strings in workloads(args.strings, rng):
+        characters = sum(map(len, strings))
+        validator = dfa.Validator(pattern, max_states=args.max_states, engine="dfa")
+        # A first pass builds the states, the measured one runs with a warm cache
+        validator.fullmatch_bool(strings[0])
+        # What dfa.compile() picks: re, or the DFA where re backtracks exponentially
+        auto = dfa.Validator(pattern, max_states=args.max_states)
+        auto.fullmatch_bool(strings[0])
+        engines = (
+            ("re", lambda s, r=re.compile(pattern): r.fullmatch(s) is not None),
+            ("nfa", lambda s, n=nfa.compile(pattern): n.fullmatch(s) is not None),
+            ("dfa", validator.fullmatch_bool),
+            ("auto", auto.fullmatch_bool),
+        )
+        expected = None
+        for engine, validate in engines:
+            elapsed, answers = timed(validate, strings)
+            assert expected is None or answers == expected, "engines disagree"
+            expected = answers
+            print(
+                f"{name:>16} {engine:>6} {len(strings) / elapsed:>12.0f}"
+                f" {elapsed / characters * 1e9:>9.1f}"
+            )
+        stats = validator.stats()
+        print(
+            f"{'':>16} {stats['states']} states, hit rate {stats['hit_rate']:.4f},"
+            f" {stats['flushes']} flushes"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Startup time of compiling many patterns with re versus loading them from a diskcache.DiskCache
+
+Every measurement runs in a fresh interpreter, like a worker process that was just started:
+    re    -> re.compile() (and with --analyze prefilter.required_literals() and nfa.compile_program())
+    cold  -> the same through a DiskCache with an empty directory, then save()
+    warm  -> the same through the DiskCache that cold left behind
+Run from the repository root:
+    python -m benchmarks.diskcache [--patterns 1000,10000] [--analyze] [--repeats 3]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import diskcache
+import nfa
+import prefilter
+
+# Variations of the VERBOSE phone number regex of flags.py and of other validation patterns
+TEMPLATES = (
+    (
+        r"""^               # Start of string
+            (\({area}\))?   # Optional area code
+            \s?             # Optional whitespace
+            \d{{{prefix}}}  # Prefix
+            [{separators}]  # Separator character
+            \d{{{line}}}    # Line number
+            $               # Anchor at the end of the string
+        """,
+        re.VERBOSE,
+    ),
+    (r"^(?P<user>[\w.+-]+)@(?P<host>{word}\.(?:com|org|net))$", re.IGNORECASE),
+    (r"\b{word}\b.*\b(\d{{{prefix},{line}}})\b", 0),
+    (r"(?m)^{word}:\s*(?P<value>[^#\n]*?)\s*(?:#.*)?$", 0),
+)
+
+
+def make_patterns(count, rng):
+    patterns = []
+    for i in range(count):
+        template, flags = TEMPLATES[i % len(TEMPLATES)]
+        fields = {
+            "area": rng.choice([r"\d{3}", r"\d{2,4}", "[2-9]\\d\\d"]),
+            "prefix": rng.randint(2, 4),
+            "line": rng.randint(4, 6),
+            "separators": rng.choice(["-.", "-. ", "/-"]),
+            "word": "".join(
+                rng.choice("abcdefghijklmnopqrstuvwxyz")
+                for _ in range(rng.randint(4, 8))
+            ),
+        }
+        patterns.append((template.format(**fields), flags))
+    return patterns
+
+
+def worker(mode, patterns_path, cache_dir, analyze):
+    with open(patterns_path) as f:
+        patterns = json.load(f)
+    start = time.perf_counter()
+    if mode == "re":
+        for pattern, flags in patterns:
+            re.compile(pattern, flags)
+            if analyze:
+                prefilter.required_literals(pattern, flags)
+                try:
+                    nfa.compile_program(pattern, flags)
+                except nfa.Unsupported:
+                    pass
+    else:
+        cache = diskcache.DiskCache(cache_dir)
+        for pattern, flags in patterns:
+            cache.compile(pattern, flags)
+            if analyze:
+                cache.literals(pattern, flags)
+                try:
+                    cache.program(pattern, flags)
+                except nfa.Unsupported:
+                    pass
+        cache.save()
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+
+
+def measure(mode, patterns_path, cache_dir, analyze):
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.diskcache",
+        "--worker",
+        mode,
+        patterns_path,
+        cache_dir,
+    ]
+    if analyze:
+        command.append("--analyze")
+    start = time.perf_counter()
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output)
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--patterns", default="1000,10000", help="comma separated counts"
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="also extract the required literals and build the NFA programs",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--worker", nargs=3, metavar=("MODE", "PATTERNS", "DIR"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+    if args.worker:
+        worker(*args.worker, args.analyze)
+        return
+    print(
+        f"{'patterns':>9} {'mode':>5} {'compile s':>10} {'process s':>10} {'cache MB':>9}"
+    )
+    for count in map(int, args.patterns.split(",")):
+        directory = tempfile.mkdtemp()
+        try:
+            patterns_path = os.path.join(directory, "patterns.json")
+            with open(patterns_path, "w") as f:
+                json.dump(make_patterns(count, random.Random(args.seed)), f)
+            cache_dir = os.path.join(directory, "cache")
+            for mode in ("re", "cold", "warm"):
+                best = None
+                for _ in range(args.repeats):
+                    if mode == "cold":
+                        shutil.rmtree(cache_dir, ignore_errors=True)
+                    result = measure(mode, patterns_path, cache_dir, args.analyze)
+                    if best is None or result["seconds"] < best["seconds"]:
+                        best = result
+                size = os.path.join(cache_dir, "patterns.cache")
+                size = os.path.getsize(size) if os.path.exists(size) else 0
+                print(
+                    f"{count:>9} {mode:>5} {best['seconds']:>10.3f}"
+                    f" {best['process_seconds']:>10.3f} {size / 1e6:>9.2f}"
+                )
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Throughput of re.IGNORECASE searches: re, re without the flag, and prefilter's folded literal search
+
+Run from the repository root:
+    python -m benchmarks.ignorecase [--size 4M] [--repeats 5]
+"""
+import argparse
+import random
+import re
+import time
+
+import prefilter
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+# Literal heavy log patterns, the kind most re.I patterns are
+PATTERNS = (
+    r"connection reset",
+    r"error: \w+",
+    r"(?i:warn)ing \d+",
+    r"\bdisk full\b",
+)
+WORDS = ("request", "served", "in", "ms", "user", "GET", "POST", "ok", "cache", "hit")
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1:] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_text(size, rng):
+    """Log lines of random words, every 2000th line has something the patterns look for in a random case"""
+    needles = ("Connection RESET", "ERROR: timeout", "WARNing 42", "Disk Full")
+    lines, length = [], 0
+    while length < size:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 12))]
+        if rng.random() < 1 / 2000:
+            words.insert(rng.randrange(len(words)), rng.choice(needles))
+        line = " ".join(words)
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def best_time(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="4M")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    text = make_text(parse_size(args.size), random.Random(args.seed))
+    print(f"{'pattern':>20} {'input':>5} {'engine':>18} {'MB/s':>9} {'matches':>8}")
+    for pattern in PATTERNS:
+        for kind, string, regex in (
+            ("str", text, pattern),
+            ("bytes", text.encode(), pattern.encode()),
+        ):
+            contenders = (
+                ("re, case-sensitive", re.compile(regex)),
+                ("re, re.I", re.compile(regex, re.I)),
+                ("prefilter, re.I", prefilter.compile(regex, re.I)),
+            )
+            for name, compiled in contenders:
+                elapsed, count = best_time(
+                    lambda: sum(1 for _ in compiled.finditer(string)), args.repeats
+                )
+                print(
+                    f"{pattern:>20} {kind:>5} {name:>18}"
+                    f" {len(string) / elapsed / 1e6:>9.1f} {count:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Line-numbered MULTILINE searches of a large file: one re pass versus a lineindex.LineIndex on more cores
+
+Run from the repository root:
+    python -m benchmarks.lineindex [--size 256M] [--workers 1,2,4] [--dir /tmp]
+The file and its index are generated in --dir and removed afterwards.
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+import lineindex
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+# flags.py's ^bar and bar$, and a pattern that does more work per line
+PATTERNS = (rb"^bar", rb"bar$", rb"^\d{4}-\d\d-\d\d .*status (?:error|fail)$")
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_file(directory, size):
+    lines = (
+        b"foo\nbar\nbaz\n",
+        b"2021-07-14 kplc token 0x3fA9 meter 14229 units 35.2 status ok\n",
+        b"2021-07-14 kplc token 0x3fAA meter 14230 units 0.0 status error\n",
+        b"kplc bar\n",
+    )
+    block = b"".join(lines[i % 7 % len(lines)] for i in range(20_000))
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".txt")
+    with os.fdopen(fd, "wb") as f:
+        written = 0
+        while written < size:
+            piece = block[: size - written]
+            f.write(piece)
+            written += len(piece)
+    return path
+
+
+def plain_re(path, pattern):
+    """Line numbers the straightforward way: read the file, finditer over all of it, count the newlines"""
+    with open(path, "rb") as f:
+        data = f.read()
+    results, line, counted = 0, 1, 0
+    for m in re.finditer(pattern, data, re.MULTILINE):
+        line += data.count(b"\n", counted, m.start())
+        counted = m.start()
+        results += 1
+    return results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="256M")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated counts")
+    parser.add_argument("--executor", default="process", choices=lineindex.EXECUTORS)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+    size = parse_size(args.size)
+    path = make_file(args.dir, size)
+    try:
+        elapsed, index = timed(lambda: lineindex.LineIndex(path))
+        print(f"index built in {elapsed:.3f}s, {len(index)} lines")
+        index.close()
+        elapsed, index = timed(lambda: lineindex.LineIndex(path))
+        assert index.loaded
+        print(f"index loaded in {elapsed:.4f}s")
+        index.close()
+        print(
+            f"{'pattern':>44} {'engine':>16} {'seconds':>8} {'MB/s':>8}"
+            f" {'matches':>8} {'first s':>8}"
+        )
+        for pattern in PATTERNS:
+            elapsed, expected = timed(lambda: plain_re(path, pattern))
+            name = pattern.decode()
+            print(
+                f"{name:>44} {'re':>16} {elapsed:>8.3f}"
+                f" {size / elapsed / 1e6:>8.1f} {expected:>8}"
+            )
+            for workers in map(int, args.workers.split(",")):
+                with lineindex.LineIndex(
+                    path, workers=workers, executor=args.executor
+                ) as index:
+                    first, _ = timed(lambda: index.count(pattern))
+                    # The first query started the workers, the second one reuses them
+                    elapsed, count = timed(lambda: index.count(pattern))
+                assert count == expected, "results differ"
+                engine = f"{args.executor} x{workers}"
+                print(
+                    f"{name:>44} {engine:>16} {elapsed:>8.3f}"
+                    f" {size / elapsed / 1e6:>8.1f} {count:>8} {first:>8.3f}"
+                )
+    finally:
+        os.unlink(path)
+        if os.path.exists(path + ".lines"):
+            os.unlink(path + ".lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Peak RSS and wall time of zerocopy (mmap) searches versus reading the whole file into a str
+
+Every measurement runs in a fresh interpreter so that ru_maxrss only reflects that one search.
+Run from the repository root:
+    python -m benchmarks.mmap_vs_read [--sizes 1M,64M,1G,10G] [--pattern '\\d'] [--dir /tmp]
+The files are generated in --dir and removed afterwards, the 10G size needs that much free disk space.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import zerocopy
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+PATTERNS = (r"\d", r"[0-9a-fA-F]", r"\s")
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_file(directory, size):
+    # A line of log-like text repeated, with digits, hex and whitespace in it
+    line = b"2021-07-14 kplc token 0x3fA9 meter 14229 units 35.2 status ok\n"
+    block = line * ((1 << 20) // len(line) + 1)
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".txt")
+    with os.fdopen(fd, "wb") as f:
+        written = 0
+        while written < size:
+            piece = block[: size - written]
+            f.write(piece)
+            written += len(piece)
+    return path
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def worker(mode, path, pattern):
+    start = time.perf_counter()
+    if mode == "mmap":
+        matches = sum(1 for _ in zerocopy.search_file(pattern, path))
+    else:
+        with open(path, encoding="latin-1") as f:
+            text = f.read()
+        matches = sum(1 for _ in re.finditer(pattern, text))
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {"seconds": elapsed, "matches": matches, "peak_rss": peak_rss_bytes()}
+        )
+    )
+
+
+def measure(mode, path, pattern):
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.mmap_vs_read",
+        "--worker",
+        mode,
+        path,
+        pattern,
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="1M,16M,128M",
+        help="comma separated file sizes, e.g. 1M,1G,10G",
+    )
+    parser.add_argument(
+        "--pattern", action="append", help="byte pattern(s) to search for, repeatable"
+    )
+    parser.add_argument("--dir", default=None, help="directory for the generated files")
+    parser.add_argument(
+        "--worker", nargs=3, metavar=("MODE", "PATH", "PATTERN"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+    if args.worker:
+        worker(*args.worker)
+        return
+    patterns = args.pattern or PATTERNS
+    print(
+        f"{'size':>8} {'pattern':>14} {'mode':>5} {'seconds':>9} {'peak RSS MB':>12} {'matches':>12}"
+    )
+    for size_text in args.sizes.split(","):
+        path = make_file(args.dir, parse_size(size_text))
+        try:
+            for pattern in patterns:
+                results = {}
+                for mode in ("read", "mmap"):
+                    results[mode] = result = measure(mode, path, pattern)
+                    print(
+                        f"{size_text:>8} {pattern:>14} {mode:>5} {result['seconds']:>9.3f}"
+                        f" {result['peak_rss'] / (1 << 20):>12.1f} {result['matches']:>12}"
+                    )
+                assert (
+                    results["read"]["matches"] == results["mmap"]["matches"]
+                ), "modes disagree"
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
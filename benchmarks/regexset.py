@@ -0,0 +1,89 @@
+"""Lines per second of regexset.RegexSet versus one re search per pattern per line
+
+Run from the repository root:
+    python -m benchmarks.regexset [--patterns 10,100,500] [--lines 2000] [--match-rate 0.05]
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+import regexset
+
+# Validation style templates like the ones in flags.py and metacharacters.py, {} is replaced by a random word
+TEMPLATES = (
+    (r"^{}\d{{3}}[-.]\d{{4}}$", 0),
+    (r"\b{}\b", re.IGNORECASE),
+    (r"^{}$", re.MULTILINE),
+    (r"{}[a-z]+\d", 0),
+    (r"(?i:{})bar", 0),
+    (r"{}.*baz", 0),
+    (r"ba[artz]{}", 0),
+)
+
+
+def word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 8)))
+
+
+def make_patterns(count, rng):
+    patterns = []
+    for _ in range(count):
+        template, flags = rng.choice(TEMPLATES)
+        patterns.append((template.format(word(rng)), flags))
+    return patterns
+
+
+def make_lines(count, patterns, match_rate, rng):
+    # Random log-like lines, match_rate of them contain the word of a random pattern
+    lines = []
+    for _ in range(count):
+        line = " ".join(word(rng) for _ in range(rng.randint(6, 14)))
+        if rng.random() < match_rate:
+            pattern = rng.choice(patterns)[0]
+            line += " " + re.sub(r"[^a-z]", "", pattern.split("{")[0])[:8] + "bar baz"
+        lines.append(line)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--patterns", default="10,100,500", help="comma separated set sizes"
+    )
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--match-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    print(f"{'patterns':>8} {'engine':>9} {'lines/s':>10} {'matched lines':>14}")
+    for count in map(int, args.patterns.split(",")):
+        patterns = make_patterns(count, rng)
+        lines = make_lines(args.lines, patterns, args.match_rate, rng)
+        compiled = [re.compile(pattern, flags) for pattern, flags in patterns]
+
+        def loop():
+            return [
+                {i for i, regex in enumerate(compiled) if regex.search(line)}
+                for line in lines
+            ]
+
+        regex_set = regexset.RegexSet(patterns)
+        results = []
+        for name, fn in (
+            ("re loop", loop),
+            ("RegexSet", lambda: regex_set.matches_many(lines)),
+        ):
+            start = time.perf_counter()
+            found = fn()
+            elapsed = time.perf_counter() - start
+            results.append(found)
+            print(
+                f"{count:>8} {name:>9} {len(lines) / elapsed:>10.0f} {sum(map(bool, found)):>14}"
+            )
+        assert results[0] == results[1], "engines disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Tokens per second of scanner.Scanner on a synthetic KPLC-style document, versus trying the rules one by one
+
+The document is written to a file in --dir and tokenized from there in chunks, then removed.
+The rule-by-rule tokenizer is only run over the first --naive-size bytes, it is much slower.
+Run from the repository root:
+    python -m benchmarks.scanner [--size 256M] [--chunk-size 1M] [--dir /tmp]
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+import scanner
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+# The fields of a KPLC bill or token receipt
+RULES = (
+    ("DATE", r"\d{2}/\d{2}/\d{4}"),
+    ("AMOUNT", r"KSh ?\d{1,3}(?:,\d{3})*\.\d{2}"),
+    ("TOKEN", r"\d{4}(?:-\d{4}){4}"),
+    ("NUMBER", r"\d+(?:\.\d+)?"),
+    ("LABEL", r"[A-Z][a-z]+(?: [A-Z][a-z]+)*:"),
+    ("WORD", r"[A-Za-z]+"),
+    ("PUNCT", r"[-.,()/]"),
+    ("NEWLINE", r"\n"),
+    ("SPACE", r"[ \t]+"),
+)
+SKIP = ("SPACE",)
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_lines(rng, count):
+    """Bill and receipt lines, now and then with a character no rule matches"""
+    lines = []
+    for _ in range(count):
+        digits = "".join(rng.choice("0123456789") for _ in range(20))
+        fields = [
+            f"Account No: {rng.randint(10**6, 10**7)}",
+            f"Date: {rng.randint(1, 28):02}/{rng.randint(1, 12):02}/20{rng.randint(10, 23)}",
+            f"Units: {rng.randint(0, 500)}.{rng.randint(0, 99):02} KWh",
+            f"Amount Due: KSh {rng.randint(1, 99)},{rng.randint(0, 999):03}.{rng.randint(0, 99):02}",
+            "Token: " + "-".join(digits[i : i + 4] for i in range(0, 20, 4)),
+            "Meter (prepaid) serial " + str(rng.randint(10**8, 10**9)),
+        ]
+        rng.shuffle(fields)
+        line = " ".join(fields[: rng.randint(2, len(fields))])
+        if rng.random() < 0.01:
+            at = rng.randrange(len(line))
+            line = line[:at] + rng.choice("#@*") + line[at:]
+        lines.append(line + "\n")
+    return lines
+
+
+def make_file(directory, size, rng):
+    block = "".join(make_lines(rng, 5000))
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".txt")
+    with os.fdopen(fd, "w") as f:
+        written = 0
+        while written < size:
+            piece = block[: size - written]
+            f.write(piece)
+            written += len(piece)
+    return path
+
+
+def one_by_one(rules, skip, string):
+    """The tokenizer without a master pattern: every rule is tried with match() at every position"""
+    compiled = [(kind, re.compile(pattern)) for kind, pattern in rules]
+    tokens, pos, length = 0, 0, len(string)
+    in_gap = False
+    while pos < length:
+        for kind, regex in compiled:
+            m = regex.match(string, pos)
+            if m is not None:
+                tokens += kind not in skip
+                pos = m.end()
+                in_gap = False
+                break
+        else:
+            # Like the Scanner, one ERROR token per stretch of unmatched text
+            tokens += not in_gap
+            in_gap = True
+            pos += 1
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="256M")
+    parser.add_argument("--naive-size", default="4M")
+    parser.add_argument("--chunk-size", default="1M")
+    parser.add_argument("--dir", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    size = parse_size(args.size)
+    path = make_file(args.dir, size, random.Random(args.seed))
+    print(f"{'tokenizer':>24} {'MB':>7} {'seconds':>8} {'tokens':>11} {'tokens/s':>11}")
+    try:
+        compiled = scanner.compile(RULES, skip=SKIP)
+        with open(path) as f:
+            start = time.perf_counter()
+            count = sum(
+                1 for _ in compiled.tokens(f, chunk_size=parse_size(args.chunk_size))
+            )
+            elapsed = time.perf_counter() - start
+        print(
+            f"{'Scanner.tokens(file)':>24} {size / 1e6:>7.1f} {elapsed:>8.2f}"
+            f" {count:>11} {count / elapsed:>11.0f}"
+        )
+        with open(path) as f:
+            string = f.read(parse_size(args.naive_size))
+        for name, tokenize in (
+            (
+                "Scanner.tokenize(str)",
+                lambda: sum(1 for _ in compiled.tokenize(string)),
+            ),
+            ("rules one by one", lambda: one_by_one(RULES, SKIP, string)),
+        ):
+            start = time.perf_counter()
+            count = tokenize()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>24} {len(string) / 1e6:>7.1f} {elapsed:>8.2f}"
+                f" {count:>11} {count / elapsed:>11.0f}"
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
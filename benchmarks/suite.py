@@ -0,0 +1,427 @@
+"""Benchmark suite built from the patterns of metacharacters.py, flags.py and functions.py
+
+Every re/recache call with a constant pattern in the three scripts becomes a benchmark case, calls of
+the patterns the scripts compile (re_obj.search(...), recache.search(re_obj, ...)) included. Each case runs
+on the input the script uses ("short") and on synthetic corpora of --sizes characters where the script's
+input sits at the start (match-early), at the end (match-late) or is left out (no-match).
+Run from the repository root:
+    python -m benchmarks.suite [--sizes short,1M,100M] [--engine re] [--save baseline.json]
+    python -m benchmarks.suite --compare baseline.json
+With --compare the exit status is 1 when a case got slower by more than --threshold beyond the noise.
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from collections import deque
+
+import backtracking
+import nfa
+import prefilter
+import recache
+
+SCRIPTS = ("metacharacters.py", "flags.py", "functions.py")
+METHODS = (
+    "search",
+    "match",
+    "fullmatch",
+    "findall",
+    "finditer",
+    "split",
+    "sub",
+    "subn",
+)
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+# Characters tried, in order, to pad the synthetic corpora: the first one the pattern can't match is used
+FILLERS = ("~", "\x00", " ", "Q", "☃")
+
+ENGINES = {
+    "re": re.compile,
+    "recache": recache.compile,
+    "prefilter": prefilter.compile,
+    "backtracking": backtracking.compile,
+    "nfa": nfa.compile,
+    # The NFA engine with a budget no case reaches, to measure what the checks cost
+    "nfa-budget": lambda pattern, flags=0: nfa.compile(
+        pattern, flags, max_steps=10**12, timeout=3600
+    ),
+}
+
+# Two sided 95% quantiles of Student's t distribution by degrees of freedom, 1.96 beyond the table
+_T95 = {
+    1: 12.71,
+    2: 4.30,
+    3: 3.18,
+    4: 2.78,
+    5: 2.57,
+    6: 2.45,
+    7: 2.36,
+    8: 2.31,
+    9: 2.26,
+    10: 2.23,
+    12: 2.18,
+    15: 2.13,
+    20: 2.09,
+    30: 2.04,
+}
+
+
+class Case:
+    """One call found in a script: method, pattern, flags and the arguments around them"""
+
+    def __init__(self, script, line, method, pattern, flags, string, extra):
+        self.script = script
+        self.line = line
+        self.method = method
+        self.pattern = pattern
+        self.flags = flags
+        self.string = string
+        # maxsplit for split, (repl, count) for sub and subn
+        self.extra = extra
+
+    def key(self, corpus, scenario):
+        # No line number: editing a script must not invalidate the baselines saved for its other calls
+        return (
+            f"{self.script} {self.method} {self.pattern!r} flags={int(self.flags)}"
+            f" {self.string!r} {self.extra!r} {corpus} {scenario}"
+        )
+
+
+class _Compiled:
+    """What re.compile()/recache.compile() returned in a script: the pattern and flags it was given"""
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+
+
+def _evaluate(node, env):
+    """Value of a constant expression, with names looked up in env; raises ValueError otherwise"""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Tuple):
+        return tuple(_evaluate(element, env) for element in node.elts)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id in ("re", "recache")
+        and node.func.attr == "compile"
+    ):
+        args = _arguments(node, ("pattern", "flags"), env)
+        if "pattern" not in args or not args.keys() <= {"pattern", "flags"}:
+            raise ValueError(ast.dump(node))
+        return _Compiled(**args)
+    if isinstance(node, ast.Name) and node.id in env:
+        return env[node.id]
+    if (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "re"
+        and isinstance(getattr(re, node.attr, None), re.RegexFlag)
+    ):
+        return getattr(re, node.attr)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitOr, ast.Add)):
+        left, right = _evaluate(node.left, env), _evaluate(node.right, env)
+        return left | right if isinstance(node.op, ast.BitOr) else left + right
+    raise ValueError(ast.dump(node))
+
+
+def _arguments(call, names, env):
+    values = dict(zip(names, (_evaluate(arg, env) for arg in call.args)))
+    for keyword in call.keywords:
+        values[keyword.arg] = _evaluate(keyword.value, env)
+    return values
+
+
+def _call_arguments(node, env):
+    """(method, arguments) of a call of a re/recache function or of a compiled pattern in env, None otherwise"""
+    if not (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.attr in METHODS
+    ):
+        return None
+    method, name = node.func.attr, node.func.value.id
+    if isinstance(env.get(name), _Compiled):
+        if method in ("sub", "subn"):
+            names = ("repl", "string", "count")
+        elif method == "split":
+            names = ("string", "maxsplit")
+        else:
+            names = ("string", "pos", "endpos")
+        args = _arguments(node, names, env)
+        args["pattern"] = env[name]
+        return method, args
+    if name not in ("re", "recache"):
+        return None
+    if method in ("sub", "subn"):
+        names = ("pattern", "repl", "string", "count", "flags")
+    elif method == "split":
+        names = ("pattern", "string", "maxsplit", "flags")
+    else:
+        # re.search(pattern, string, flags): pos only comes before flags in the Pattern methods
+        names = ("pattern", "string", "flags")
+    return method, _arguments(node, names, env)
+
+
+def _assign(target, value, env):
+    if isinstance(target, ast.Name):
+        env[target.id] = value
+    elif isinstance(target, ast.Tuple):
+        for element, item in zip(target.elts, value):
+            _assign(element, item, env)
+
+
+def _forget(target, env):
+    for node in ast.walk(target):
+        if isinstance(node, ast.Name):
+            env.pop(node.id, None)
+
+
+def extract(path):
+    """Yield a Case for every re/recache call with constant arguments in the script at path"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    script = os.path.basename(path)
+    env = {}
+    # Statements are visited in order so that a name like regex or s has the value assigned last
+    for statement in tree.body:
+        for node in ast.walk(statement):
+            try:
+                found = _call_arguments(node, env)
+            except ValueError:
+                continue
+            if found is None:
+                continue
+            method, args = found
+            flags = args.get("flags", 0)
+            if isinstance(args["pattern"], _Compiled):
+                # A compiled pattern carries its flags, re refuses any others
+                if flags:
+                    continue
+                args["pattern"], flags = args["pattern"].pattern, args["pattern"].flags
+            # Cases run on whole strings
+            if "pos" in args or "endpos" in args:
+                continue
+            if flags & re.DEBUG or not isinstance(args.get("string"), str):
+                continue
+            if method in ("sub", "subn"):
+                extra = (args["repl"], args.get("count", 0))
+            else:
+                extra = args.get("maxsplit", 0)
+            yield Case(
+                script,
+                node.lineno,
+                method,
+                args["pattern"],
+                flags,
+                args["string"],
+                extra,
+            )
+        if isinstance(statement, ast.Assign):
+            for target in statement.targets:
+                try:
+                    _assign(target, _evaluate(statement.value, env), env)
+                except (ValueError, TypeError):
+                    _forget(target, env)
+
+
+def cases(root="."):
+    """Every Case of the three scripts, once per distinct (method, pattern, flags, string)"""
+    seen = set()
+    for script in SCRIPTS:
+        for case in extract(os.path.join(root, script)):
+            identity = (case.method, case.pattern, case.flags, case.string, case.extra)
+            if identity not in seen:
+                seen.add(identity)
+                yield case
+
+
+def call(regex, case):
+    """A function running case.method of regex on its argument once"""
+    if case.method in ("sub", "subn"):
+        repl, count = case.extra
+        method = getattr(regex, case.method)
+        return lambda text: method(repl, text, count)
+    if case.method == "split":
+        split = regex.split
+        return lambda text: split(text, case.extra)
+    if case.method == "finditer":
+        finditer = regex.finditer
+        return lambda text: deque(finditer(text), maxlen=0)
+    return getattr(regex, case.method)
+
+
+def filler(regex):
+    """A character no match of regex can be made of, or None when the pattern matches anything"""
+    for ch in FILLERS:
+        if regex.search(ch * 8192) is None:
+            return ch
+    return None
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def corpora(case, regex, sizes):
+    """Yield (corpus, scenario, text) for every input case runs on"""
+    for size in sizes:
+        if size == "short":
+            yield size, "script", case.string
+            continue
+        ch = filler(regex)
+        if ch is None:
+            continue
+        length = parse_size(size)
+        padding = ch * max(0, length - len(case.string))
+        yield size, "match-early", case.string + padding
+        yield size, "match-late", padding + case.string
+        yield size, "no-match", ch * length
+
+
+def measure(fn, text, repeats, min_time):
+    """Seconds per call: each of repeats runs calls fn in a loop for at least min_time"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn(text)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    samples = [elapsed / loops]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn(text)
+        samples.append((time.perf_counter() - start) / loops)
+    return samples
+
+
+def summarize(samples, length):
+    mean = statistics.fmean(samples)
+    n = len(samples)
+    if n > 1:
+        df = n - 1
+        t = next((_T95[d] for d in sorted(_T95) if d >= df), 1.96)
+        ci = t * statistics.stdev(samples) / math.sqrt(n)
+    else:
+        ci = 0.0
+    return {
+        "mean": mean,
+        "ci95": ci,
+        "ops_per_sec": 1 / mean,
+        "ns_per_byte": mean * 1e9 / length if length else 0.0,
+        "bytes": length,
+        "repeats": n,
+    }
+
+
+def run(args):
+    compile_pattern = ENGINES[args.engine]
+    results = {}
+    for case in cases(args.root):
+        if args.filter and args.filter not in case.pattern:
+            continue
+        try:
+            regex = compile_pattern(case.pattern, case.flags)
+            fn = call(regex, case)
+            fn(case.string)
+        except (re.error, AttributeError, nfa.Unsupported, TypeError):
+            # The pattern doesn't compile on this Python (see flags.py) or the engine lacks the method
+            continue
+        for corpus, scenario, text in corpora(case, regex, args.sizes):
+            stats = summarize(measure(fn, text, args.repeats, args.min_time), len(text))
+            key = case.key(corpus, scenario)
+            results[key] = stats
+            print(
+                f"{stats['ops_per_sec']:>14.1f} ops/s {stats['ns_per_byte']:>10.3f} ns/byte"
+                f" +-{stats['ci95'] / stats['mean']:>6.1%}  {key}"
+            )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print every case slower than in baseline, return how many were beyond threshold and the noise"""
+    regressions = 0
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = new["mean"] / old["mean"]
+        slower = new["mean"] - new["ci95"] > old["mean"] + old["ci95"]
+        if ratio > 1 + threshold and slower:
+            regressions += 1
+            print(f"REGRESSION {ratio:>6.2f}x  {key}")
+        elif (
+            ratio < 1 - threshold
+            and new["mean"] + new["ci95"] < old["mean"] - old["ci95"]
+        ):
+            print(f"faster     {ratio:>6.2f}x  {key}")
+    missing = len(set(baseline) - set(results))
+    print(
+        f"{len(results)} cases, {regressions} regressions, {missing} baseline cases not run"
+    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="short,1M",
+        help="comma separated corpora: short (the script's input) and sizes like 1M or 100M",
+    )
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="re")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument(
+        "--min-time", type=float, default=0.02, help="seconds per repeat"
+    )
+    parser.add_argument("--filter", help="only patterns containing this text")
+    parser.add_argument("--root", default=".", help="directory holding the scripts")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to compare the results with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative slowdown reported as a regression",
+    )
+    args = parser.parse_args()
+    args.sizes = args.sizes.split(",")
+    results = run(args)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": sys.version,
+                    "platform": platform.platform(),
+                    "engine": args.engine,
+                    "results": results,
+                },
+                f,
+                indent=1,
+            )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
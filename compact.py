@@ -0,0 +1,94 @@
+"""Keeping millions of matches as integer spans instead of Match objects"""
+import itertools
+from array import array
+
+import recache
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, only to_numpy() needs it
+    numpy = None
+
+# metacharacters.py reads the groups of a match with m.groups() and m.group("w1"). Keeping every re.Match of
+# recache.finditer(r"(?P<w1>\w+),(?P<w2>\w+),(?P<w3>\w+)", <string>) around costs a few hundred bytes per match,
+# plus a str object for every group that is looked at.
+# findall_spans() keeps 2 x (groups + 1) integers per match in one array("q") instead, 8 bytes each:
+#     start and end of group 0 (the whole match), of group 1, ... of match 0, then the same for match 1, ...
+# A group that didn't take part in a match has the span (-1, -1), like in re.
+# The text is only sliced out of the string when group() asks for it, and the Match objects that re creates
+# on the way are dropped right away. benchmarks/compact.py measures memory and speed against finditer().
+
+
+class CompactMatches:
+    """All the matches of a pattern in a string, as one array of group spans"""
+
+    def __init__(self, string, groups, groupindex, spans):
+        self.string = string
+        self.groups = groups
+        self.groupindex = dict(groupindex)
+        # Flat array: 2 x (groups + 1) integers per match
+        self.spans = spans
+        self._width = 2 * (groups + 1)
+
+    def __len__(self):
+        return len(self.spans) // self._width
+
+    def _index(self, group):
+        if isinstance(group, str):
+            group = self.groupindex.get(group, -1)
+        if not 0 <= group <= self.groups:
+            raise IndexError("no such group")
+        return group
+
+    def span(self, index, group=0):
+        """Span of group in match number index"""
+        if not -len(self) <= index < len(self):
+            raise IndexError("match index out of range")
+        offset = (index % len(self)) * self._width + 2 * self._index(group)
+        return self.spans[offset], self.spans[offset + 1]
+
+    def group(self, index, group=0, default=None):
+        """Text of group in match number index, sliced out of the string now"""
+        start, end = self.span(index, group)
+        return default if start == -1 else self.string[start:end]
+
+    def groupdict(self, index, default=None):
+        return {
+            name: self.group(index, group, default)
+            for name, group in self.groupindex.items()
+        }
+
+    def column(self, group=0, default=None):
+        """Yield the text of group for every match"""
+        offset = 2 * self._index(group)
+        spans, string = self.spans, self.string
+        for i in range(offset, len(spans), self._width):
+            start = spans[i]
+            yield default if start == -1 else string[start : spans[i + 1]]
+
+    def to_numpy(self):
+        """The spans as a NumPy array of shape (matches, groups + 1, 2), sharing the array's memory"""
+        if numpy is None:
+            raise RuntimeError("to_numpy() needs NumPy")
+        return numpy.frombuffer(self.spans, dtype=numpy.int64).reshape(
+            -1, self.groups + 1, 2
+        )
+
+    def __repr__(self):
+        return f"<compact.CompactMatches object; {len(self)} matches, {self.groups} groups>"
+
+
+def findall_spans(pattern, string, flags=0, pos=0, endpos=None):
+    """Find every match of pattern in string and return them as CompactMatches"""
+    regex = recache.compile(pattern, flags)
+    if endpos is None:
+        endpos = len(string)
+    spans = array("q")
+    # regs is the (start, end) of every group, chain flattens them straight into the array
+    spans.extend(
+        itertools.chain.from_iterable(
+            itertools.chain.from_iterable(m.regs)
+            for m in regex.finditer(string, pos, endpos)
+        )
+    )
+    return CompactMatches(string, regex.groups, regex.groupindex, spans)
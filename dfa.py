@@ -0,0 +1,359 @@
+"""Yes/no validation with a lazily built DFA, a fixed amount of work per character"""
+import re
+
+import backtracking
+import nfa
+import recache
+import reparse
+
+# Validation patterns like the phone number regex of flags.py,
+#     ^(\(\d{3}\))?\s?\d{3}[-.]\d{4}$
+# only need an answer to "does the whole string match?", no groups and no match object.
+# nfa.py answers it by moving a set of threads over the string, and the set can be as big as the program.
+# A DFA state is such a set, frozen: every (state, character) pair is worked out once, after that moving to
+# the next state is a single dict lookup no matter how big the pattern is.
+#   - the states are built lazily, only those the strings actually reach exist. The number of possible
+#     states grows exponentially with the pattern (try (a|b)*a(a|b){20}), so at most max_states are kept.
+#     When the cache is full it is flushed and states get built again as they are needed.
+#   - the states are sets of positions in the program of nfa.py, so the same patterns are supported:
+#     no backreferences, conditionals, lookarounds, atomic groups or possessive repeats.
+#     Of the anchors only \A, \Z and ^ and $ without MULTILINE are supported, their answer only depends on
+#     where the string starts and ends. compile() falls back to re for anything else.
+#   - stats() returns the number of states, how often a transition was already known (the hit rate)
+#     and how often the cache was flushed.
+#   - table() exports the states and transitions found so far as plain data, LazyDFA(..., table=...) starts
+#     from them in another process (see diskcache.py).
+#   - the DFA is written in Python: on patterns that don't backtrack re's C loop is several times faster
+#     (5x on the phone number regex, 16x on a 100K character line, see benchmarks/dfa.py). So compile() only
+#     builds one for patterns backtracking.analyze() rates exponential, where re can take exponential time,
+#     like backtracking.compile() does. engine="dfa" asks for a DFA anyway, engine="re" never builds one.
+
+DEFAULT_MAX_STATES = 4096
+ENGINES = ("auto", "dfa", "re")
+
+# What the anchors need to know about a position
+START = 1  # it is the start of the string
+END = 2  # it is the end of the string
+FINAL_NEWLINE = 4  # the character at it is a newline, the last character of the string
+
+_ANCHORS = (
+    reparse.AT_BEGINNING_STRING,
+    reparse.AT_END_STRING,
+    reparse.AT_BEGINNING,
+    reparse.AT_END,
+)
+
+
+def supported(program):
+    """Whether the DFA can run program: only anchors that don't look at the characters around them"""
+    for instruction in program.instructions:
+        if instruction[0] == nfa.ASSERT:
+            if instruction[1] not in _ANCHORS or instruction[2] & re.MULTILINE:
+                return False
+    return True
+
+
+def _holds(at, context):
+    if at is reparse.AT_BEGINNING_STRING or at is reparse.AT_BEGINNING:
+        return bool(context & START)
+    if at is reparse.AT_END_STRING:
+        return bool(context & END)
+    return bool(context & (END | FINAL_NEWLINE))
+
+
+class _State:
+    """Positions in the program after consuming a character, with the transitions found so far"""
+
+    __slots__ = ("positions", "next", "consuming", "accepts")
+
+    def __init__(self, positions):
+        self.positions = positions
+        # {character (str) or byte (int): _State}, for positions in the middle of the string
+        self.next = {}
+        self.consuming = None
+        self.accepts = None
+
+
+class LazyDFA:
+    """Full match yes/no answers for an nfa.Program, with at most max_states states in memory"""
+
+    def __init__(self, program, max_states=DEFAULT_MAX_STATES, table=None):
+        if not supported(program):
+            raise nfa.Unsupported("the DFA only supports the anchors \\A \\Z ^ $")
+        if max_states < 2:
+            raise ValueError("max_states must be at least 2")
+        self.program = program
+        self.max_states = max_states
+        self._states = {}
+        # Transitions from the start state at the start of the string, where ^ and \A hold
+        self._first = {}
+        self._dead = _State(frozenset())
+        self._dead.consuming = ()
+        self._dead.accepts = False
+        self.hits = self.misses = self.flushes = self.states_built = 0
+        # A table with more states than fit would be flushed on the first new state anyway
+        if table is not None and len(table[0]) <= max_states:
+            self._load(table)
+        self._start = self._state(frozenset((0,)))
+
+    def table(self):
+        """([positions], [{character: state number}], {character: state number}) of the states found so far
+
+        The transitions are those of every state and those from the start of the string, the dead state
+        is -1. The containers are copied first, another thread may be adding to them.
+        """
+        states = list(self._states.values())
+        numbers = {state: number for number, state in enumerate(states)}
+        numbers[self._dead] = -1
+
+        def transitions(table):
+            # A state flushed while this ran is left out, its transition gets worked out again
+            return {
+                character: numbers[following]
+                for character, following in dict(table).items()
+                if following in numbers
+            }
+
+        return (
+            [state.positions for state in states],
+            [transitions(state.next) for state in states],
+            transitions(self._first),
+        )
+
+    def _load(self, table):
+        positions, transitions, first = table
+        states = [_State(frozenset(p)) for p in positions]
+
+        def following(table):
+            return {
+                character: self._dead if number < 0 else states[number]
+                for character, number in table.items()
+            }
+
+        for state, table in zip(states, transitions):
+            state.next = following(table)
+        self._first = following(first)
+        self._states = {state.positions: state for state in states}
+
+    def _closure(self, positions, context):
+        """Instructions consuming a character that positions lead to, and whether MATCH is among them"""
+        instructions = self.program.instructions
+        consuming = []
+        matched = False
+        seen = set()
+        stack = sorted(positions, reverse=True)
+        while stack:
+            pc = stack.pop()
+            instruction = instructions[pc]
+            opcode = instruction[0]
+            if opcode == nfa.LOOP:
+                # See nfa._closure: an iteration that consumed nothing leaves the loop
+                stack.append(
+                    instruction[2] if instruction[1] in seen else instruction[3]
+                )
+                continue
+            if pc in seen:
+                continue
+            seen.add(pc)
+            if opcode == nfa.JMP:
+                stack.append(instruction[1])
+            elif opcode == nfa.SPLIT:
+                stack.append(instruction[2])
+                stack.append(instruction[1])
+            elif opcode == nfa.SAVE:
+                stack.append(pc + 1)
+            elif opcode == nfa.ASSERT:
+                if _holds(instruction[1], context):
+                    stack.append(pc + 1)
+            elif opcode == nfa.MATCH:
+                matched = True
+            else:
+                consuming.append(pc)
+        return consuming, matched
+
+    def _state(self, positions):
+        if not positions:
+            return self._dead
+        state = self._states.get(positions)
+        if state is None:
+            if len(self._states) >= self.max_states:
+                self._flush()
+            state = self._states[positions] = _State(positions)
+            self.states_built += 1
+        return state
+
+    def _flush(self):
+        # The transitions are cleared too: states still referenced elsewhere must not keep the others alive
+        for state in self._states.values():
+            state.next.clear()
+        self._states = {}
+        self._first = {}
+        self.flushes += 1
+        self._start = self._states[self._start.positions] = _State(
+            self._start.positions
+        )
+
+    def _step(self, state, character, context):
+        """The state after consuming character from state, at a position described by context"""
+        if context:
+            consuming, _ = self._closure(state.positions, context)
+        else:
+            if state.consuming is None:
+                state.consuming = self._closure(state.positions, 0)[0]
+            consuming = state.consuming
+        code = character if isinstance(character, int) else ord(character)
+        instructions = self.program.instructions
+        following = []
+        for pc in consuming:
+            instruction = instructions[pc]
+            opcode = instruction[0]
+            if opcode == nfa.CHAR:
+                ok = code == instruction[1]
+            elif opcode == nfa.CLASS:
+                ok = code in instruction[1]
+            elif opcode == nfa.ANY:
+                ok = code != 10
+            else:
+                ok = True
+            if ok:
+                following.append(pc + 1)
+        return self._state(frozenset(following))
+
+    def _next(self, state, character, first):
+        """The state after state for character, from the cache when possible; first: at the start of the string"""
+        table = self._first if first else state.next
+        following = table.get(character)
+        if following is None:
+            following = table[character] = self._step(
+                state, character, START if first else 0
+            )
+            self.misses += 1
+        else:
+            self.hits += 1
+        return following
+
+    def _accepts(self, state, context):
+        if context == END:
+            if state.accepts is None:
+                state.accepts = self._closure(state.positions, END)[1]
+            return state.accepts
+        return self._closure(state.positions, context)[1]
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        """Whether string[pos:endpos] matches as a whole, like re.fullmatch() is not None"""
+        if isinstance(string, str) == self.program.is_bytes:
+            kind = "bytes" if self.program.is_bytes else "string"
+            raise TypeError(f"cannot use a {kind} pattern on this type of object")
+        length = len(string)
+        endpos = length if endpos is None else max(0, min(endpos, length))
+        pos = max(0, min(pos, length))
+        if pos > endpos:
+            return False
+        state = self._start
+        if pos == endpos:
+            return self._accepts(state, END | START if pos == 0 else END)
+        # The first and the last character can have anchors around them, the others go through the cache
+        last = endpos - 1
+        first = pos == 0
+        if pos < last:
+            state = self._next(state, string[pos], first)
+            first = False
+            dead = self._dead
+            hits = 0
+            for character in string[pos + 1 : last]:
+                if state is dead:
+                    break
+                following = state.next.get(character)
+                if following is None:
+                    following = state.next[character] = self._step(state, character, 0)
+                    self.misses += 1
+                else:
+                    hits += 1
+                state = following
+            self.hits += hits
+            if state is dead:
+                return False
+        character = string[last]
+        if character in ("\n", 10):
+            state = self._step(
+                state, character, FINAL_NEWLINE | (START if first else 0)
+            )
+        else:
+            state = self._next(state, character, first)
+        return state is not self._dead and self._accepts(state, END)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "states": len(self._states),
+            "max_states": self.max_states,
+            "states_built": self.states_built,
+            "flushes": self.flushes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _wants_dfa(pattern, flags, engine):
+    if engine == "auto":
+        return backtracking.analyze(pattern, flags).risk in backtracking.NFA_RISKS
+    return engine == "dfa"
+
+
+class Validator:
+    """fullmatch_bool() for one pattern: through a LazyDFA or through re, see engine in the module comment"""
+
+    def __init__(
+        self,
+        pattern,
+        flags=0,
+        max_states=DEFAULT_MAX_STATES,
+        engine="auto",
+        automaton=None,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, not {engine!r}")
+        self.pattern = pattern
+        self.flags = flags
+        # automaton can be a LazyDFA for the pattern built earlier (see diskcache.py), engine is then ignored
+        self.dfa = automaton
+        if automaton is None and _wants_dfa(pattern, flags, engine):
+            try:
+                self.dfa = LazyDFA(nfa.compile_program(pattern, flags), max_states)
+            except nfa.Unsupported:
+                pass
+        if self.dfa is None:
+            self.regex = recache.compile(pattern, flags)
+
+    def fullmatch_bool(self, string, pos=0, endpos=None):
+        if self.dfa is not None:
+            return self.dfa.fullmatch(
+                string, pos, len(string) if endpos is None else endpos
+            )
+        if endpos is None:
+            endpos = len(string)
+        return self.regex.fullmatch(string, pos, endpos) is not None
+
+    def stats(self):
+        """The LazyDFA's stats(), None when the pattern goes through re"""
+        return None if self.dfa is None else self.dfa.stats()
+
+    def __repr__(self):
+        engine = "re" if self.dfa is None else "dfa"
+        return f"dfa.compile({self.pattern!r}) [{engine}]"
+
+
+_cache = recache.PatternCache(compiler=Validator)
+
+
+def compile(pattern, flags=0, max_states=DEFAULT_MAX_STATES, engine="auto"):
+    """A Validator for pattern, use its fullmatch_bool() for the answers"""
+    if max_states != DEFAULT_MAX_STATES or engine != "auto":
+        return Validator(pattern, flags, max_states, engine)
+    return _cache.compile(pattern, flags)
+
+
+def fullmatch_bool(pattern, string, flags=0):
+    """re.fullmatch(pattern, string, flags) is not None, without building a match object"""
+    return _cache.compile(pattern, flags).fullmatch_bool(string)
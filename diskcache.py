@@ -0,0 +1,354 @@
+"""Keeping compiled and analyzed patterns on disk, so a new process doesn't redo the work"""
+import contextlib
+import mmap
+import os
+import pickle
+import re
+import struct
+import sys
+import tempfile
+import threading
+
+import backtracking
+import dfa
+import multiliteral
+import nfa
+import prefilter
+import reparse
+
+try:
+    import fcntl
+except (
+    ImportError
+):  # not on Windows: there save() only keeps out the threads of this process, see below
+    fcntl = None
+
+# re.compile() parses the pattern and compiles it to the bytecode of the _sre engine in Python code
+# (see reparse.py). For a pattern like the VERBOSE phone number regex of flags.py that takes tens of
+# microseconds. A worker that compiles thousands of patterns at startup spends seconds on it,
+# and every new process starts over because recache only lives in memory.
+# DiskCache keeps the results in one file that every process can open:
+#   - the _sre bytecode of the pattern (reparse.sre_code()). compile() turns it into the same re.Pattern that
+#     re.compile() returns, without parsing or compiling anything.
+#   - the required literals of prefilter.py and the NFA program of nfa.py, or the fact that the NFA engine
+#     can't run the pattern
+#   - the Aho-Corasick automaton of multiliteral.py, or the fact that the pattern isn't a literal alternation
+#   - whether dfa.compile() builds a DFA for the pattern, and the states and transitions that the
+#     LazyDFAs of validator() had found when save() ran (LazyDFA.table()). A new process starts
+#     validating with them instead of an empty DFA.
+# Entries are keyed on (type of pattern, pattern, flags) like in recache. The file also records the
+# Python version, the bytecode version of _sre and CACHE_FORMAT: a file written by anything else is ignored
+# and replaced on the next save().
+# Opening the file only reads its index. The file is mapped with mmap and an entry is unpickled on the first
+# request for it, so a process that needs 10 of 10000 patterns only touches the pages of those 10.
+# New entries stay in memory until save(), which merges them with what other processes have saved in
+# the meantime and replaces the file in one step (os.replace), readers never see half a file.
+# Two processes saving at the same time would each merge what was there before and the last replace would
+# drop the entries of the other, so save() holds an fcntl.flock() on <name>.cache.lock from reading the file
+# until replacing it. Without fcntl (Windows) only one process at a time may save to a directory.
+# Pickles can run code when loaded: the directory must only be writable by whoever is trusted to run code.
+#
+#     cache = diskcache.DiskCache("/var/cache/myapp/regex")
+#     patterns = recache.PatternCache(compiler=cache.compile)
+#     ...
+#     cache.save()
+
+# Bump when the layout of the entries, or of the nfa.py programs in them, changes
+CACHE_FORMAT = 5
+
+VERSION = (CACHE_FORMAT, sys.version, reparse._sre.MAGIC)
+
+MAGIC = b"RXCACHE\x00"
+# MAGIC, then the offset and length of the pickled (VERSION, index) at the end of the file
+HEADER = struct.Struct("<8sQQ")
+
+
+def _read_index(mapped):
+    """The {key: (offset, length)} index of a mapped cache file, None if it's not a usable one"""
+    if len(mapped) < HEADER.size:
+        return None
+    magic, offset, length = HEADER.unpack_from(mapped)
+    if magic != MAGIC or offset + length > len(mapped):
+        return None
+    try:
+        version, index = pickle.loads(mapped[offset : offset + length])
+    except Exception:
+        return None
+    return index if version == VERSION else None
+
+
+def _map(path):
+    """(mmap, index) of the cache file at path, (None, {}) when there is no usable one"""
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # ValueError: the file is empty
+        return None, {}
+    index = _read_index(mapped)
+    if index is None:
+        mapped.close()
+        return None, {}
+    return mapped, index
+
+
+class DiskCache:
+    """Parsed and compiled forms of patterns, stored in directory/name.cache"""
+
+    def __init__(self, directory, name="patterns"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, name + ".cache")
+        self._lock = threading.Lock()
+        self._mapped, self._index = _map(self.path)
+        # Entries unpickled or built by this process: {key: {"code": ..., "literals": ..., "program": ...}}
+        self._entries = {}
+        self._unsaved = set()
+        self._patterns = {}
+        # {key: LazyDFA} handed out by validator(), their tables are stored at save()
+        self._automata = {}
+        self._validators = {}
+        self.hits = self.misses = 0
+
+    def _entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            if key in self._index:
+                offset, length = self._index[key]
+                entry = pickle.loads(self._mapped[offset : offset + length])
+            else:
+                entry = {}
+            self._entries[key] = entry
+        return entry
+
+    def _get(self, pattern, flags, name, build):
+        key = (type(pattern), pattern, flags)
+        with self._lock:
+            entry = self._entry(key)
+            if name in entry:
+                self.hits += 1
+                return entry[name]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            entry[name] = value
+            self._unsaved.add(key)
+        return value
+
+    def compile(self, pattern, flags=0):
+        """The re.Pattern that re.compile(pattern, flags) returns, rebuilt from the stored bytecode"""
+        if isinstance(pattern, re.Pattern):
+            if flags:
+                raise ValueError(
+                    "cannot process flags argument with a compiled pattern"
+                )
+            return pattern
+        # re.DEBUG prints the parse tree while compiling, a stored pattern wouldn't print anything
+        if flags & re.DEBUG:
+            return re.compile(pattern, flags)
+        key = (type(pattern), pattern, flags)
+        regex = self._patterns.get(key)
+        if regex is None:
+            code = self._get(
+                pattern,
+                flags,
+                "code",
+                lambda: reparse.sre_code(reparse.parse(pattern, flags)),
+            )
+            regex = self._patterns[key] = reparse.from_sre_code(pattern, code)
+        return regex
+
+    def literals(self, pattern, flags=0):
+        """prefilter.required_literals(pattern, flags)"""
+        return self._get(
+            pattern,
+            flags,
+            "literals",
+            lambda: prefilter.required_literals(pattern, flags),
+        )
+
+    def prefiltered(self, pattern, flags=0):
+        """What prefilter.compile(pattern, flags) returns, from the stored bytecode and literals"""
+        regex = self.compile(pattern, flags)
+        if isinstance(pattern, re.Pattern):
+            pattern, flags = regex.pattern, regex.flags
+        # Keyed like compile(): regex.flags has re.UNICODE added, the same literals would be stored twice
+        literal = prefilter.best_literal(self.literals(pattern, flags))
+        return (
+            regex if literal is None else prefilter.PrefilteredPattern(regex, literal)
+        )
+
+    def program(self, pattern, flags=0):
+        """nfa.compile_program(pattern, flags), raising nfa.Unsupported again for patterns it refused"""
+
+        def build():
+            try:
+                return nfa.compile_program(pattern, flags)
+            except nfa.Unsupported as e:
+                return e
+
+        program = self._get(pattern, flags, "program", build)
+        if isinstance(program, nfa.Unsupported):
+            raise nfa.Unsupported(*program.args)
+        return program
+
+    def nfa(self, pattern, flags=0, max_steps=None, timeout=None):
+        """nfa.compile(pattern, flags, max_steps, timeout) with the stored program"""
+        return nfa.NFAPattern(
+            pattern, flags, max_steps, timeout, self.program(pattern, flags)
+        )
+
+    def multiliteral(self, pattern, flags=0):
+        """What multiliteral.compile(pattern, flags) returns, with the stored automaton"""
+        if isinstance(pattern, re.Pattern):
+            return self.compile(pattern, flags)
+        alternation = self._get(
+            pattern,
+            flags,
+            "alternation",
+            lambda: multiliteral.automaton(pattern, flags),
+        )
+        return self.compile(pattern, flags) if alternation is None else alternation
+
+    def validator(self, pattern, flags=0, engine="auto"):
+        """dfa.compile(pattern, flags, engine=engine) with the stored program and DFA states"""
+        if engine not in dfa.ENGINES:
+            raise ValueError(f"engine must be one of {dfa.ENGINES}, not {engine!r}")
+        key = (type(pattern), pattern, flags)
+        validator = self._validators.get((key, engine))
+        if validator is not None:
+            return validator
+        automaton = None
+        if self._uses_dfa(pattern, flags, engine):
+            automaton = self._automata.get(key)
+            if automaton is None:
+                try:
+                    program = self.program(pattern, flags)
+                    with self._lock:
+                        table = self._entry(key).get("dfa")
+                    automaton = self._automata[key] = dfa.LazyDFA(program, table=table)
+                except nfa.Unsupported:
+                    pass
+        # Without an automaton the pattern goes through re, the Validator needn't analyze it again
+        validator = self._validators[(key, engine)] = dfa.Validator(
+            pattern,
+            flags,
+            engine="re" if automaton is None else engine,
+            automaton=automaton,
+        )
+        return validator
+
+    def _uses_dfa(self, pattern, flags, engine):
+        if engine == "auto":
+            return self._get(
+                pattern,
+                flags,
+                "exponential",
+                lambda: backtracking.analyze(pattern, flags).risk
+                in backtracking.NFA_RISKS,
+            )
+        return engine == "dfa"
+
+    def _store_tables(self):
+        for key, automaton in list(self._automata.items()):
+            table = automaton.table()
+            entry = self._entry(key)
+            if entry.get("dfa") != table:
+                entry["dfa"] = table
+                self._unsaved.add(key)
+
+    def save(self):
+        """Write the entries built since the last save to disk, together with those already there"""
+        with self._lock:
+            self._store_tables()
+            if not self._unsaved:
+                return
+            with self._file_lock():
+                self._save()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _save(self):
+        # Called with self._lock and the file lock held
+        # Another process may have saved since this one opened the file
+        mapped, index = _map(self.path)
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, 0, 0))
+                offsets = {}
+                for key, (offset, length) in index.items():
+                    if key not in self._entries:
+                        offsets[key] = (f.tell(), length)
+                        f.write(mapped[offset : offset + length])
+                        continue
+                    # The other process may have stored parts this one doesn't have, e.g. the
+                    # program of a pattern this one only compiled. The dict is updated in place,
+                    # _get() may be about to add to it.
+                    entry = self._entries[key]
+                    stored = pickle.loads(mapped[offset : offset + length])
+                    for name, value in stored.items():
+                        entry.setdefault(name, value)
+                for key, entry in self._entries.items():
+                    if entry:
+                        data = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+                        offsets[key] = (f.tell(), len(data))
+                        f.write(data)
+                data = pickle.dumps((VERSION, offsets), pickle.HIGHEST_PROTOCOL)
+                offset = f.tell()
+                f.write(data)
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, offset, len(data)))
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        finally:
+            if mapped is not None:
+                mapped.close()
+        if self._mapped is not None:
+            self._mapped.close()
+        self._mapped, self._index = _map(self.path)
+        self._unsaved.clear()
+
+    def close(self):
+        """Unmap the file, entries already loaded stay usable"""
+        with self._lock:
+            if self._mapped is not None:
+                self._mapped.close()
+            self._mapped, self._index = None, {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.save()
+        self.close()
+
+    def __len__(self):
+        return len(self._index.keys() | self._entries.keys())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": len(self._index.keys() | self._entries.keys()),
+                "loaded": len(self._entries),
+                "unsaved": len(self._unsaved),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __repr__(self):
+        return f"diskcache.DiskCache({self.directory!r})"
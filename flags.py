@@ -1,28 +1,36 @@
 import re
 
+# The flags themselves still come from the re module, the patterns are compiled through recache
+import recache
+
 # Modified Regular expression matching with flags
 #
 # re.I
 # re.IGNORECASE
 # Makes matching case insensitive
-print(re.search(r"a+", "aaaAAA"), re.search(r"a+", "aaaaAAA", re.IGNORECASE))
-print(re.search(r"[a-z]+", "aBcDeF"), re.search(r"[a-z]+", "aBcDeF", re.IGNORECASE))
+print(recache.search(r"a+", "aaaAAA"), recache.search(r"a+", "aaaaAAA", re.IGNORECASE))
+print(
+    recache.search(r"[a-z]+", "aBcDeF"),
+    recache.search(r"[a-z]+", "aBcDeF", re.IGNORECASE),
+)
 #
 # re.M
 # re.MULTILINE
 s = "foo\nbar\nbaz"
-print(re.search("^foo", s), re.search("^bar", s), re.search("^baz", s))
-print(re.search(r"foo$", s), re.search(r"bar$", s), re.search(r"baz$", s))
+print(recache.search("^foo", s), recache.search("^bar", s), recache.search("^baz", s))
+print(
+    recache.search(r"foo$", s), recache.search(r"bar$", s), recache.search(r"baz$", s)
+)
 # With the MULTILINE flag set the ^ and $ anchor metacharacters match internal lines as well
 print(
-    re.search("^foo", s, re.MULTILINE),
-    re.search("^bar", s, re.MULTILINE),
-    re.search("^baz", s, re.MULTILINE),
+    recache.search("^foo", s, re.MULTILINE),
+    recache.search("^bar", s, re.MULTILINE),
+    recache.search("^baz", s, re.MULTILINE),
 )
 print(
-    re.search("foo$", s, re.MULTILINE),
-    re.search("bar$", s, re.MULTILINE),
-    re.search("baz$", s, re.MULTILINE),
+    recache.search("foo$", s, re.MULTILINE),
+    recache.search("bar$", s, re.MULTILINE),
+    recache.search("baz$", s, re.MULTILINE),
 )
 # The MULTILINE flag only modifies the ^ and $ anchors in this way. It doesn’t have any effect on the \A and \Z anchors
 #
@@ -30,8 +38,8 @@ print(
 # re.DOTALL
 # Causes the dot(.) metacharacter to match a newline.
 # By default the dot metacharacter match any character except the newline character. The DOTALL flag lifts this restriction
-print(re.search(r"foo.bar", "foo\nbar"))
-print(re.search(r"foo.bar", "foo\nbar", re.DOTALL))
+print(recache.search(r"foo.bar", "foo\nbar"))
+print(recache.search(r"foo.bar", "foo\nbar", re.DOTALL))
 #
 # re.X
 # re.VERBOSE
@@ -45,7 +53,7 @@ print(re.search(r"foo.bar", "foo\nbar", re.DOTALL))
 #    - Four digit line number
 
 regex = r"^(\(\d{3}\))?\s?\d{3}[-.]\d{4}$"
-print(re.search(regex, "414.9229"))
+print(recache.search(regex, "414.9229"))
 # More readable with the verbose flag
 regex = r"""^               # Start of string
             (\(\d{3}\))?    # Optional area code
@@ -56,29 +64,29 @@ regex = r"""^               # Start of string
             $               # Anchor at the end of the string
             """
 print(
-    re.search(regex, "414.9229", re.VERBOSE),
-    re.search(regex, "414-9229", re.VERBOSE),
-    re.search(regex, "(712)414-9229", re.X),
-    re.search(regex, "(712) 414-9229", re.X),
+    recache.search(regex, "414.9229", re.VERBOSE),
+    recache.search(regex, "414-9229", re.VERBOSE),
+    recache.search(regex, "(712)414-9229", re.X),
+    recache.search(regex, "(712) 414-9229", re.X),
 )
 
 # Significant whitespace when using the VERBOSE flag
 print(
-    re.search(r"foo bar", "foo bar", re.VERBOSE),
-    re.search(r"foo\ bar", "foo bar", re.VERBOSE),
+    recache.search(r"foo bar", "foo bar", re.VERBOSE),
+    recache.search(r"foo\ bar", "foo bar", re.VERBOSE),
 )
 #
 # re.DEBUG
 # Displays debugging information
 # The DEBUG flag causes the regex parser in Python to display debugging information about the parsing process to the console
-re.search(r"foo.bar", "foozbar", re.DEBUG)
+recache.search(r"foo.bar", "foozbar", re.DEBUG)
 # More complicated example
 regex = r"^(\(\d{3}\))?\s?\d{3}[-.]\d{4}$"
-print(re.search(regex, "414.9229", re.DEBUG))
+print(recache.search(regex, "414.9229", re.DEBUG))
 #
 # Combining <flags> Arguments in a regex function call
 # Using the bitwise OR (|) operator.
-print(re.search(r"^bar", "FOO\nBAR\nbaz", re.IGNORECASE | re.MULTILINE))
+print(recache.search(r"^bar", "FOO\nBAR\nbaz", re.IGNORECASE | re.MULTILINE))
 # Setting and Clearing Flags within a regular expression
 # There are two regex metacharacter sequences that provide this capability.
 # (?<flags>)
@@ -88,13 +96,13 @@ print(re.search(r"^bar", "FOO\nBAR\nbaz", re.IGNORECASE | re.MULTILINE))
 # The (?<flags>) metacharacter sequence as a whole matches the empty string. It always matches successfully and doesn’t consume any of the search string.
 print(
     # Equivalent ways of setting the IGNORECASE and MULTILINE flags
-    re.search(r"^bar", "FOO\nBAR\nbaz\n", re.IGNORECASE | re.MULTILINE),
-    re.search(r"(?im)^bar", "FOO\nBAR\nbaz\n"),
+    recache.search(r"^bar", "FOO\nBAR\nbaz\n", re.IGNORECASE | re.MULTILINE),
+    recache.search(r"(?im)^bar", "FOO\nBAR\nbaz\n"),
 )
 # Note that a (?<flags>) metacharacter sequence sets the given flag(s) for the entire regex no matter where you place it in the expression:
 print(
-    re.search(r"foo.bar(?s).baz", "foo\nbar\nbaz"),
-    re.search(r"foo.bar.baz(?s)", "foo\nbar\nbaz"),
+    recache.search(r"foo.bar(?s).baz", "foo\nbar\nbaz"),
+    recache.search(r"foo.bar.baz(?s)", "foo\nbar\nbaz"),
 )
 # As of Python 3.7, it’s deprecated to specify (?<flags>) anywhere in a regex other than at the beginning
 # It still produces the appropriate match, but you’ll get a warning message.
@@ -105,8 +113,8 @@ print(
 # the regex parser sets any flags specified in <set_flags> and clears any flags specified in <remove_flags>.
 # Values for <set_flags> and <remove_flags> are most commonly i, m, s or x.
 # Example: set IGNORECASE for a specified group
-print(re.search(r"(?i:foo)bar", "FOObar"), re.search("(?i:foo)bar", "FOOBAR"))
+print(recache.search(r"(?i:foo)bar", "FOObar"), recache.search("(?i:foo)bar", "FOOBAR"))
 # Turn a flag off for a group
-print(re.search(r"(?-i:foo)bar", "FOOBAR", re.IGNORECASE))
-# Although re.IGNORECASE enables case-insensitive matching for the entire call, 
+print(recache.search(r"(?-i:foo)bar", "FOOBAR", re.IGNORECASE))
+# Although re.IGNORECASE enables case-insensitive matching for the entire call,
 # the metacharacter sequence (?-i:foo) turns off IGNORECASE for the duration of that group, so the match against 'FOO' fails.
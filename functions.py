@@ -1,5 +1,7 @@
 import re
 
+import recache
+
 # In addition to re.search(), the re module contains several other functions to help you perform regex-related tasks.
 # The available regex functions in the Python re module fall into the following three categories:
 #   1. Searching functions ->
@@ -11,9 +13,9 @@ import re
 # re.split() -> Splits a string into substrings using a regex as a delimiter
 # re.escape() -> Escapes characters in a regex
 # Example: splits the specified string into substrings delimited by a comma (,), semicolon (;), or slash (/) character, surrounded by any amount of whitespace:
-print(re.split(r"\s*[,;/]\s*", "foo,bar ; baz / qux"))
+print(recache.split(r"\s*[,;/]\s*", "foo,bar ; baz / qux"))
 # If the <regex> contains capturing groups then the return list includes the mathching delimiter strings as well:
-print(re.split(r"(\s*[\;,]\s*)", "foo,bar ; baz / qux"))
+print(recache.split(r"(\s*[\;,]\s*)", "foo,bar ; baz / qux"))
 
 
 # Compiled Regex objects
@@ -28,15 +30,23 @@ print(re.split(r"(\s*[\;,]\s*)", "foo,bar ; baz / qux"))
 # re_obj = re.compile(<regex>, <flags>)
 # result = re_obj.search(<string>)
 
-re_obj = re.compile(r"\d+")
-print(re.search(re_obj, "foo123bar"), re_obj.search("foo123bar"))
-re_obj = re.compile(r"ba[rz]", flags=re.IGNORECASE)
-print(re.search(re_obj, "FOOBARBAZ"), re_obj.search("FOOBAZBAR"))
+re_obj = recache.compile(r"\d+")
+print(recache.search(re_obj, "foo123bar"), re_obj.search("foo123bar"))
+re_obj = recache.compile(r"ba[rz]", flags=re.IGNORECASE)
+print(recache.search(re_obj, "FOOBARBAZ"), re_obj.search("FOOBAZBAR"))
 
 # Why bother compiling a regex?
 # If you use a particular regex in your Python code frequently, then precompiling allows you to separate out the regex definition from its uses.
 # Enhancing modularity
 s1, s2, s3, s4 = "foo.bar", "foo123bar", "baz99", "qux & grault"
-re_obj = re.compile(r"\d+")
+re_obj = recache.compile(r"\d+")
 print(re_obj.search(s1), re_obj.search(s2), re_obj.search(s3), re_obj.search(s4))
 
+
+# Sharing compiled regexes through a cache
+# The re module caches compiled patterns internally, but the cache is hidden and limited in size.
+# recache.compile(<regex>, <flags>) keeps compiled objects in an explicit cache keyed on (<regex>, <flags>),
+# so asking for r"\d+" a second time (like above) returns the object compiled the first time.
+# recache.stats() shows the hits, misses, evictions and how long compiling took:
+print(recache.stats())
+# The cache size and eviction policy ("lru" or "lfu") can be changed with recache.configure(maxsize=, policy=)
@@ -0,0 +1,193 @@
+"""Keeping the matches of a pattern up to date while the document they were found in is edited"""
+import bisect
+
+import recache
+import reparse
+
+# metacharacters.py runs patterns like r"(?<=foo)bar", r"(?<!foo)bar", r"foo(?=[a-z])" and r"\bfoo\b".
+# After a small edit of a large document, running finditer() over all of it again redoes work for text that
+# didn't change. A MatchIndex keeps the match spans and redoes only the part an edit can affect:
+#   - every attempt to match at position p only reads the characters p - behind ... p + ahead - 1, where
+#     ahead is the longest match plus what the lookaheads read, and behind what the lookbehinds read (reach()).
+#     Both get one extra character for \b, \B, ^ and $, which look at the character next to them.
+#   - matches starting more than ahead characters before the edit stay as they are, the search resumes
+#     where the last of them ends
+#   - past the edit the old matches come back, shifted by the change in length. As soon as the new search is
+#     where the old one was too (same position, both just after an empty match or both not), behind characters
+#     after the edit, the rest of the old matches is reused and the search stops. finditer() only depends on
+#     the text and on where the search is, so from there on both searches do the same.
+#   - the search after the edit goes through the text in growing windows (pos/endpos), so a document
+#     without matches after the edit isn't searched to its end
+# A pattern whose reach is unbounded (r"foo.*bar", r"(?=.*x)") can depend on any distance: every edit
+# rescans the whole document, unless max_reach promises that no match and no lookaround spans more characters.
+
+# First window searched after an edit, it doubles each time it isn't enough
+WINDOW = 4096
+
+# Opcodes with nested nodes in their argument
+_REPEATS = (reparse.MAX_REPEAT, reparse.MIN_REPEAT, reparse.POSSESSIVE_REPEAT)
+
+
+def _lookarounds(items):
+    """Yield (direction, nodes) for every lookahead (1) and lookbehind (-1), nested ones included"""
+    for op, av in items:
+        if op in (reparse.ASSERT, reparse.ASSERT_NOT):
+            yield av
+            yield from _lookarounds(av[1])
+        elif op is reparse.SUBPATTERN:
+            yield from _lookarounds(av[3])
+        elif op is reparse.BRANCH:
+            for alternative in av[1]:
+                yield from _lookarounds(alternative)
+        elif op in _REPEATS:
+            yield from _lookarounds(av[2])
+        elif op is reparse.ATOMIC_GROUP:
+            yield from _lookarounds(av)
+        elif op is reparse.GROUPREF_EXISTS:
+            yield from _lookarounds(av[1])
+            if av[2] is not None:
+                yield from _lookarounds(av[2])
+
+
+def reach(pattern, flags=0):
+    """(behind, ahead): an attempt at position p reads at most string[p - behind : p + ahead]
+
+    None when a match or a lookahead can be arbitrarily long.
+    """
+    parsed = reparse.parse(pattern, flags)
+    _, ahead = reparse.width(parsed)
+    behind = 0
+    for direction, nodes in _lookarounds(parsed):
+        _, width = reparse.width(parsed, nodes)
+        if width is None or ahead is None:
+            return None
+        if direction < 0:
+            behind = max(behind, width)
+        else:
+            # A lookahead starts at most ahead characters into the match
+            ahead += width
+    if ahead is None:
+        return None
+    return behind + 1, ahead + 1
+
+
+class MatchIndex:
+    """The spans of finditer(pattern, text), updated by edit() without searching all of the text again"""
+
+    def __init__(self, pattern, text, flags=0, max_reach=None):
+        self.regex = recache.compile(pattern, flags)
+        self.text = text
+        self.max_reach = max_reach
+        self.reach = reach(self.regex.pattern, self.regex.flags)
+        if max_reach is not None:
+            behind, ahead = self.reach or (max_reach + 1, max_reach + 1)
+            self.reach = min(behind, max_reach + 1), min(ahead, max_reach + 1)
+        self._starts, self._ends = [], []
+        self._scan_all()
+        self.edits = self.full_rescans = 0
+        self.searched = 0
+
+    def _scan_all(self):
+        self._starts, self._ends = [], []
+        for m in self.regex.finditer(self.text):
+            self._starts.append(m.start())
+            self._ends.append(m.end())
+
+    @property
+    def spans(self):
+        return list(zip(self._starts, self._ends))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _gap(self, old):
+        """The first position >= old that the old search went through, old matches are jumped over"""
+        i = bisect.bisect_left(self._starts, old) - 1
+        if i >= 0 and self._ends[i] > old:
+            return self._ends[i]
+        return old
+
+    def _tail(self, start, end, delta):
+        """Index of the first old match the new search finds too after finding start..end, or -1"""
+        old = end - delta
+        if start < end:
+            # Both searches continue at old, if the old one got there
+            return (
+                bisect.bisect_left(self._starts, old) if self._gap(old) == old else -1
+            )
+        # After an empty match the search has to move on: the old one must have had it too
+        i = bisect.bisect_left(self._starts, old)
+        if i < len(self._starts) and self._starts[i] == self._ends[i] == old:
+            return i + 1
+        return -1
+
+    def edit(self, offset, deleted, inserted):
+        """Replace text[offset:offset + deleted] with inserted and return the updated spans"""
+        text = self.text
+        if not 0 <= offset <= offset + deleted <= len(text):
+            raise ValueError("the edit is outside the text")
+        self.text = new = text[:offset] + inserted + text[offset + deleted :]
+        self.edits += 1
+        if self.reach is None:
+            self.full_rescans += 1
+            self.searched += len(new)
+            self._scan_all()
+            return self.spans
+        behind, ahead = self.reach
+        delta = len(inserted) - deleted
+        starts, ends = self._starts, self._ends
+        # Matches starting before low were found by attempts that didn't read the edited text
+        low = max(0, offset - ahead)
+        kept = bisect.bisect_left(starts, low)
+        position = max(low, ends[kept - 1]) if kept else low
+        must_advance = False
+        # Attempts from settled on don't read the edited text
+        settled = offset + len(inserted) + behind
+        new_starts, new_ends = starts[:kept], ends[:kept]
+        window = WINDOW
+        tail = -1
+        while True:
+            endpos = min(len(new), max(position, settled) + window)
+            # Attempts before exact don't reach endpos, a search without endpos finds the same there
+            exact = endpos + 1 if endpos == len(new) else endpos - ahead
+            self.searched += endpos - position
+            for m in self.regex.finditer(new, position, endpos):
+                start, end = m.span()
+                if must_advance and start == end == position:
+                    continue
+                if start >= exact:
+                    break
+                new_starts.append(start)
+                new_ends.append(end)
+                position, must_advance = end, start == end
+                if end >= settled:
+                    tail = self._tail(start, end, delta)
+                    if tail != -1:
+                        break
+            if tail != -1 or endpos == len(new):
+                break
+            # No match starts between position and exact, the search went through all of those positions
+            resync = self._gap(max(settled, position + must_advance) - delta) + delta
+            if resync <= exact:
+                tail = bisect.bisect_left(starts, resync - delta)
+                break
+            if exact > position:
+                position, must_advance = exact, False
+            window *= 2
+        if tail != -1:
+            new_starts.extend(start + delta for start in starts[tail:])
+            new_ends.extend(end + delta for end in ends[tail:])
+        self._starts, self._ends = new_starts, new_ends
+        return self.spans
+
+    def stats(self):
+        return {
+            "matches": len(self._starts),
+            "reach": self.reach,
+            "edits": self.edits,
+            "full_rescans": self.full_rescans,
+            "searched": self.searched,
+        }
+
+    def __repr__(self):
+        return f"incremental.MatchIndex({self.regex.pattern!r}, {len(self)} matches)"
@@ -0,0 +1,49 @@
+"""re.split() one field at a time, over input that doesn't fit in memory"""
+import streaming
+
+# recache.split(r"\s*[,;/]\s*", <string>) returns a list with every field of <string>, see functions.py.
+# isplit() yields the same items one after the other instead, reading <source> in chunks
+# (a str/bytes object, a file object or an iterable of chunks, like streaming.finditer()):
+#   - a delimiter that straddles two chunks is found by streaming.StreamScanner, which searches the end of
+#     every chunk again together with the next one
+#   - only the text of the current field and the scanner's window are held in memory, never the whole input
+#   - like re.split(), the text of capturing groups in the delimiter is yielded between the fields:
+#     isplit(r"(\s*[\;,]\s*)", "foo,bar ; baz") yields "foo", ",", "bar", " ; ", "baz"
+#   - after maxsplit delimiters the rest of the input is the last field, it is not searched at all
+
+
+def isplit(
+    pattern,
+    source,
+    maxsplit=0,
+    flags=0,
+    chunk_size=streaming.DEFAULT_CHUNK_SIZE,
+    overlap=streaming.DEFAULT_OVERLAP,
+):
+    """Yield the items of re.split(pattern, <all of source>, maxsplit, flags) one at a time"""
+    scanner = streaming.StreamScanner(pattern, flags, overlap)
+    empty = scanner.regex.pattern[:0]
+    chunks = streaming.chunks(source, chunk_size)
+    # The current field starts at absolute offset start. Its text up to offset released has been copied
+    # into field, the rest is still in the scanner's buffer.
+    field, start, released = [], 0, 0
+    splits = 0
+    for buffer, base, item in streaming.events(scanner, chunks):
+        if isinstance(item, int):
+            end = base + item
+            if end > released:
+                field.append(buffer[max(start, released) - base : item])
+                released = end
+            continue
+        field.append(buffer[max(start, released) - base : item.start()])
+        yield empty.join(field)
+        yield from item.groups()
+        field, start = [], base + item.end()
+        released = max(released, start)
+        splits += 1
+        if splits == maxsplit:
+            # The rest of the input is the last field as it is: what the scanner holds and the unread chunks
+            field.append(buffer[start - base :])
+            field.extend(chunks)
+            break
+    yield empty.join(field)
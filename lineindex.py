@@ -0,0 +1,326 @@
+"""MULTILINE searches over huge line-oriented files, reporting line numbers from a saved index of the lines"""
+import bisect
+import mmap
+import os
+import re
+import struct
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import zerocopy
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, bytes.split() builds the index without it
+    numpy = None
+
+# flags.py searches "foo\nbar\nbaz" for ^bar and bar$ with re.MULTILINE. For a file of millions of lines
+# the questions become "on which line, in which column?" and "can it use more than one core?".
+# A LineIndex answers both with the offsets where the lines of a file start:
+#   - the offsets are found once, in blocks of the memory mapped file, and saved next to it (<path>.lines)
+#     together with the size and modification time of the file. Opening the file again maps the saved
+#     offsets instead of finding them again, as long as the file didn't change.
+#   - finditer() splits the lines into shards of about the same size and searches each shard with pos/endpos
+#     over the mapped file (see zerocopy.py), in worker processes by default: re holds the GIL while it
+#     matches, threads only help when the pattern is cheap compared to everything else.
+#     The workers map the file and the index themselves, only the shard boundaries and the results travel.
+#   - the line of a match is a bisect in the offsets, the column is the distance to the start of its line.
+#     A shard collects its spans first and looks up all their lines at once (with NumPy's searchsorted()
+#     when it is installed), the work per match stays close to that of a plain finditer().
+# A shard ends just before the newline of its last line, so ^ and $ (with re.MULTILINE, which finditer()
+# always adds) find what they would find in the whole file. Matches can't span shards:
+# the results are those of the whole file for patterns that don't match across a newline.
+# \A and \Z refer to the start and end of a shard, use ^ and $ instead.
+# Line numbers start at 1, columns at 0 (like the ast module), both count bytes.
+
+MAGIC = b"LINEIDX1"
+# magic, size of the indexed file, its st_mtime_ns
+HEADER = struct.Struct("<8sQq")
+# Bytes of the file looked at per step while building the index
+BLOCK = 1 << 24
+# Shards smaller than this aren't worth sending to a worker
+MIN_SHARD = 1 << 20
+# Shards per worker, so that a slow shard doesn't leave the other workers idle
+SHARDS_PER_WORKER = 4
+EXECUTORS = ("process", "thread")
+
+
+def line_starts(buffer):
+    """array("q") with 0 and the offset after every newline of buffer"""
+    starts = array("q", [0])
+    length = len(buffer)
+    for block in range(0, length, BLOCK):
+        end = min(block + BLOCK, length)
+        if numpy is not None:
+            data = numpy.frombuffer(buffer, numpy.uint8, end - block, block)
+            starts.frombytes((numpy.flatnonzero(data == 10) + (block + 1)).tobytes())
+        else:
+            offset = block
+            for piece in buffer[block:end].split(b"\n")[:-1]:
+                offset += len(piece) + 1
+                starts.append(offset)
+    return starts
+
+
+def _identity(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _map_index(index_path, identity):
+    """(mmap, memoryview of the offsets) of a saved index that matches identity, (None, None) otherwise"""
+    try:
+        with open(index_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # ValueError: the file is empty
+        return None, None
+    if len(mapped) < HEADER.size or (len(mapped) - HEADER.size) % 8:
+        mapped.close()
+        return None, None
+    magic, size, mtime = HEADER.unpack_from(mapped)
+    if magic != MAGIC or (size, mtime) != identity:
+        mapped.close()
+        return None, None
+    return mapped, memoryview(mapped)[HEADER.size :].cast("q")
+
+
+def _lines(starts, spans):
+    """Flat array("q") of (line, column, start, end) for a flat array("q") of (start, end) spans"""
+    if numpy is not None:
+        offsets = numpy.frombuffer(starts, numpy.int64)
+        spans = numpy.frombuffer(spans, numpy.int64).reshape(-1, 2)
+        lines = numpy.searchsorted(offsets, spans[:, 0], "right")
+        result = numpy.empty((len(spans), 4), numpy.int64)
+        result[:, 0] = lines
+        result[:, 1] = spans[:, 0] - offsets[lines - 1]
+        result[:, 2:] = spans
+        return array("q", result.tobytes())
+    result = array("q")
+    line = 0
+    for i in range(0, len(spans), 2):
+        start = spans[i]
+        line = bisect.bisect_right(starts, start, line)
+        result.extend((line, start - starts[line - 1], start, spans[i + 1]))
+    return result
+
+
+def _search(regex, buffer, starts, pos, endpos):
+    """Flat array("q") of (line, column, start, end) for every match between pos and endpos"""
+    spans = array("q")
+    for m in regex.finditer(buffer, pos, endpos):
+        spans.extend(m.span())
+    # The lines are looked up afterwards, all at once
+    return _lines(starts, spans)
+
+
+# The file and the index, as mapped by a worker process
+_worker_buffer = _worker_starts = None
+
+
+def _init_worker(path, index_path, starts):
+    global _worker_buffer, _worker_starts
+    with open(path, "rb") as f:
+        _worker_buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if starts is None:
+        _, _worker_starts = _map_index(index_path, _identity(path))
+        if _worker_starts is None:  # the file changed since the index was saved
+            _worker_starts = line_starts(_worker_buffer)
+    else:
+        _worker_starts = starts
+
+
+def _work(pattern, flags, pos, endpos):
+    regex = zerocopy.compile(pattern, flags)
+    return _search(regex, _worker_buffer, _worker_starts, pos, endpos)
+
+
+class LineIndex:
+    """A file mapped read-only with the offsets of its lines, for line-numbered MULTILINE searches
+
+    index_path defaults to <path>.lines, save=False keeps a newly built index in memory only.
+    """
+
+    def __init__(
+        self, path, index_path=None, save=True, workers=None, executor="process"
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}, not {executor!r}")
+        self.path = path
+        self.index_path = path + ".lines" if index_path is None else index_path
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self._pool = None
+        self._identity = _identity(path)
+        with open(path, "rb") as f:
+            # An empty file can't be mapped
+            self.buffer = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if self._identity[0]
+                else b""
+            )
+        self._index_map, self.starts = _map_index(self.index_path, self._identity)
+        self.loaded = self.starts is not None
+        self.saved = self.loaded
+        if not self.loaded:
+            self.starts = line_starts(self.buffer)
+            if save:
+                self.save()
+        # A final newline ends the last line, the offset after it doesn't start another one
+        self.lines = len(self.starts) - (self.starts[-1] == len(self.buffer))
+
+    def save(self):
+        """Write the offsets to index_path, False when that isn't possible (e.g. a read-only directory)"""
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        try:
+            fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, *self._identity))
+                f.write(self.starts)
+            os.replace(temporary, self.index_path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.saved = True
+        return True
+
+    def __len__(self):
+        return self.lines
+
+    def span(self, line):
+        """(start, end) of line (from 1), without its newline"""
+        if not 1 <= line <= self.lines:
+            raise IndexError("line number out of range")
+        if line < len(self.starts):
+            return self.starts[line - 1], self.starts[line] - 1
+        return self.starts[line - 1], len(self.buffer)
+
+    def line(self, line):
+        """The bytes of line (from 1), without its newline"""
+        start, end = self.span(line)
+        return self.buffer[start:end]
+
+    def locate(self, offset):
+        """(line, column) of a byte offset"""
+        if not 0 <= offset <= len(self.buffer):
+            raise IndexError("offset out of range")
+        line = bisect.bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1]
+
+    def shards(self, first_line=1, last_line=None, count=None):
+        """(pos, endpos) of shards of whole lines covering first_line ... last_line"""
+        last_line = self.lines if last_line is None else min(last_line, self.lines)
+        if first_line < 1:
+            raise ValueError("line numbers start at 1")
+        if first_line > last_line:
+            # An empty file has no lines, but ^ and $ still match at its start
+            if self.lines or first_line != 1:
+                return []
+        pos = self.starts[first_line - 1]
+        # The shard with the last line goes on to the end, ^ and $ match after a final newline too
+        endpos = (
+            len(self.buffer) if last_line == self.lines else self.span(last_line)[1]
+        )
+        if count is None:
+            count = self.workers * SHARDS_PER_WORKER
+        count = max(1, min(count, (endpos - pos) // MIN_SHARD))
+        shards = []
+        for i in range(1, count + 1):
+            if i == count:
+                end = endpos
+            else:
+                # The shard ends before the newline of the line that target falls in
+                target = pos + (endpos - pos) * i // count
+                line = bisect.bisect_right(self.starts, target, first_line)
+                if line >= last_line:
+                    continue
+                end = self.starts[line] - 1
+            start = shards[-1][1] + 1 if shards else pos
+            if end >= start:
+                shards.append((start, end))
+        return shards
+
+    def _executor(self):
+        if self._pool is None:
+            if self.executor == "thread":
+                self._pool = ThreadPoolExecutor(self.workers)
+            else:
+                # Workers map the saved index, an unsaved one has to be sent to each of them
+                starts = None if self.saved else self.starts
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.path, self.index_path, starts),
+                )
+        return self._pool
+
+    def finditer_flat(self, pattern, flags=0, first_line=1, last_line=None):
+        """Yield a flat array("q") of (line, column, start, end) per shard, in file order"""
+        flags |= re.MULTILINE
+        regex = zerocopy.compile(pattern, flags)
+        pattern = regex.pattern
+        shards = self.shards(first_line, last_line)
+        if self.workers == 1 or len(shards) == 1:
+            for pos, endpos in shards:
+                yield _search(regex, self.buffer, self.starts, pos, endpos)
+            return
+        executor = self._executor()
+        if self.executor == "thread":
+            futures = [
+                executor.submit(_search, regex, self.buffer, self.starts, pos, endpos)
+                for pos, endpos in shards
+            ]
+        else:
+            futures = [
+                executor.submit(_work, pattern, regex.flags, pos, endpos)
+                for pos, endpos in shards
+            ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def finditer(self, pattern, flags=0, first_line=1, last_line=None):
+        """Yield (line, column, (start, end)) for every match of pattern, searched with re.MULTILINE"""
+        for result in self.finditer_flat(pattern, flags, first_line, last_line):
+            for i in range(0, len(result), 4):
+                yield result[i], result[i + 1], (result[i + 2], result[i + 3])
+
+    def count(self, pattern, flags=0, first_line=1, last_line=None):
+        return sum(
+            len(result) // 4
+            for result in self.finditer_flat(pattern, flags, first_line, last_line)
+        )
+
+    def close(self):
+        """Stop the workers and unmap the file and the index"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._index_map is not None:
+            self.starts.release()
+            self._index_map.close()
+            self._index_map = None
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "built"
+        return f"lineindex.LineIndex({self.path!r}, {len(self)} lines, {state})"
+
+
+def finditer(pattern, path, flags=0, workers=None):
+    """Yield (line, column, (start, end)) for every match of pattern in the file at path"""
+    with LineIndex(path, workers=workers) as index:
+        yield from index.finditer(pattern, flags)
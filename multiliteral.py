@@ -0,0 +1,314 @@
+"""One-pass matching of alternations of plain literals, e.g. foo|bar|baz"""
+import re
+
+import recache
+import reparse
+
+# re.search(r"foo|bar|baz", <string>) tries every alternative at every position of <string>,
+# so the work grows with (number of alternatives x length of string).
+# When every alternative is a plain literal the alternation can be turned into an Aho-Corasick automaton:
+# a trie of the literals plus "failure" links that say where to continue when the next character doesn't fit.
+# The string is then scanned once, whatever the number of alternatives.
+#
+# Alternation is not greedy (see metacharacters.py): re.search(r"foo|graull", "foograull") returns 'foo'.
+# The automaton keeps that leftmost-first behaviour:
+#   1. the match that starts first in the string wins
+#   2. of the alternatives matching at that position, the one listed first wins, even if another one is longer
+
+# Below this many alternatives the re module is faster than the automaton (see benchmarks/alternation.py)
+MIN_ALTERNATIVES = 128
+
+# Characters that make an alternative something other than a plain literal
+_METACHARACTERS = set("()[]{}.^$*+?")
+
+
+def literal_alternatives(pattern, flags=0):
+    """Return the alternatives of pattern as a list of literals, or None if it isn't a pure literal alternation"""
+    if flags & (re.IGNORECASE | re.VERBOSE | re.DEBUG | re.LOCALE):
+        return None
+    text = pattern.decode("latin-1") if isinstance(pattern, bytes) else pattern
+    pieces, start, i = [], 0, 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch in _METACHARACTERS:
+            return None
+        if ch == "|":
+            pieces.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    pieces.append(pattern[start:])
+    literals = []
+    for piece in pieces:
+        # Let the re parser deal with escapes like \. or \x41, anything else such as \d isn't a literal
+        try:
+            parsed = reparse.parse(piece, flags)
+        except re.error:
+            return None
+        if not parsed or any(op is not reparse.LITERAL for op, _ in parsed):
+            return None
+        codes = [av for _, av in parsed]
+        if isinstance(pattern, bytes):
+            literals.append(bytes(codes))
+        else:
+            literals.append("".join(map(chr, codes)))
+    return literals
+
+
+class LiteralMatch:
+    """The parts of re.Match that make sense for a match without groups"""
+
+    __slots__ = ("re", "string", "pos", "endpos", "_start", "_end")
+
+    lastindex = lastgroup = None
+
+    def __init__(self, matcher, string, pos, endpos, start, end):
+        self.re = matcher
+        self.string = string
+        self.pos = pos
+        self.endpos = endpos
+        self._start = start
+        self._end = end
+
+    def group(self, *groups):
+        if groups not in ((), (0,)):
+            raise IndexError("no such group")
+        return self.string[self._start : self._end]
+
+    def __getitem__(self, group):
+        return self.group(group)
+
+    def groups(self, default=None):
+        return ()
+
+    def groupdict(self, default=None):
+        return {}
+
+    def start(self, group=0):
+        return self._start
+
+    def end(self, group=0):
+        return self._end
+
+    def span(self, group=0):
+        return self._start, self._end
+
+    @property
+    def regs(self):
+        return ((self._start, self._end),)
+
+    def __repr__(self):
+        return f"<multiliteral.LiteralMatch object; span={self.span()!r}, match={self.group()!r}>"
+
+
+class LiteralAlternation:
+    """Aho-Corasick automaton for literal_1|literal_2|...|literal_n with the semantics of re alternation"""
+
+    groups = 0
+    groupindex = {}
+
+    def __init__(self, literals, pattern=None, flags=0):
+        if not literals or not all(literals):
+            raise ValueError("literals must be a non-empty list of non-empty strings")
+        self.literals = list(literals)
+        self.pattern = pattern
+        self.flags = flags
+        self.maxlen = max(map(len, self.literals))
+        # Node 0 is the root of the trie. For every node:
+        #   goto     -> child node for each next character
+        #   terminal -> index of the first listed literal that ends exactly here, or -1
+        #   fail     -> longest proper suffix of this node's path that is also in the trie
+        #   output   -> nearest node on the fail chain that is terminal (0 if none)
+        goto, terminal = [{}], [-1]
+        for index, literal in enumerate(self.literals):
+            node = 0
+            for ch in literal:
+                child = goto[node].get(ch)
+                if child is None:
+                    child = len(goto)
+                    goto[node][ch] = child
+                    goto.append({})
+                    terminal.append(-1)
+                node = child
+            if terminal[node] == -1:
+                terminal[node] = index
+        fail, output = [0] * len(goto), [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:  # breadth first, queue grows while iterating
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                output[child] = (
+                    fail[child] if terminal[fail[child]] != -1 else output[fail[child]]
+                )
+        self._goto, self._terminal, self._fail, self._output = (
+            goto,
+            terminal,
+            fail,
+            output,
+        )
+        self._lengths = [len(literal) for literal in self.literals]
+        self._literal_set = set(self.literals)
+        # From the root only the first characters of the literals can start a match, a character class
+        # search for them lets the C regex engine skip the uninteresting stretches of the string.
+        first = sorted(goto[0])
+        if isinstance(self.literals[0], bytes):
+            self._skip = re.compile(
+                b"[" + b"".join(re.escape(bytes([c])) for c in first) + b"]"
+            )
+        else:
+            self._skip = re.compile("[" + "".join(map(re.escape, first)) + "]")
+
+    def _find(self, string, pos, endpos):
+        goto, terminal, fail, output = (
+            self._goto,
+            self._terminal,
+            self._fail,
+            self._output,
+        )
+        lengths, maxlen, skip = self._lengths, self.maxlen, self._skip.search
+        best_start, best_index = -1, -1
+        state, i = 0, pos
+        while i < endpos:
+            if state == 0:
+                if best_start != -1:
+                    break
+                m = skip(string, i, endpos)
+                if m is None:
+                    break
+                i = m.start()
+            ch = string[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            i += 1
+            node = state if terminal[state] != -1 else output[state]
+            while node:
+                index = terminal[node]
+                start = i - lengths[index]
+                if (
+                    best_start == -1
+                    or start < best_start
+                    or (start == best_start and index < best_index)
+                ):
+                    best_start, best_index = start, index
+                node = output[node]
+            # No later match can start at or before best_start once we are maxlen characters past it
+            if best_start != -1 and i >= best_start + maxlen:
+                break
+        if best_start == -1:
+            return None
+        return best_start, best_start + lengths[best_index]
+
+    def occurring(self, string, pos=0, endpos=None):
+        """Set of the indices of the literals that occur in string[pos:endpos], overlapping occurrences included"""
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        goto, terminal, fail, output = (
+            self._goto,
+            self._terminal,
+            self._fail,
+            self._output,
+        )
+        skip = self._skip.search
+        found = set()
+        state, i = 0, pos
+        while i < endpos:
+            if state == 0:
+                m = skip(string, i, endpos)
+                if m is None:
+                    break
+                i = m.start()
+            ch = string[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            i += 1
+            node = state if terminal[state] != -1 else output[state]
+            while node:
+                found.add(terminal[node])
+                node = output[node]
+        return found
+
+    def search(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        found = self._find(string, pos, endpos)
+        if found is None:
+            return None
+        return LiteralMatch(self, string, pos, endpos, *found)
+
+    def match(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        node, index = 0, -1
+        for i in range(pos, endpos):
+            node = self._goto[node].get(string[i])
+            if node is None:
+                break
+            if self._terminal[node] != -1 and (
+                index == -1 or self._terminal[node] < index
+            ):
+                index = self._terminal[node]
+        if index == -1:
+            return None
+        return LiteralMatch(self, string, pos, endpos, pos, pos + self._lengths[index])
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        # Unlike match() the first listed alternative doesn't win here, re backtracks into a later
+        # alternative when an earlier one only matches a prefix
+        if string[pos:endpos] in self._literal_set:
+            return LiteralMatch(self, string, pos, endpos, pos, endpos)
+        return None
+
+    def finditer(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        while True:
+            found = self._find(string, pos, endpos)
+            if found is None:
+                return
+            yield LiteralMatch(self, string, pos, endpos, *found)
+            pos = found[1]
+
+    def findall(self, string, pos=0, endpos=None):
+        return [m.group() for m in self.finditer(string, pos, endpos)]
+
+    def __repr__(self):
+        return f"multiliteral.LiteralAlternation({len(self.literals)} literals)"
+
+
+def automaton(pattern, flags=0):
+    """The LiteralAlternation compile() uses for pattern, None when it uses the re engine"""
+    literals = literal_alternatives(pattern, flags)
+    if literals is not None and len(literals) >= MIN_ALTERNATIVES:
+        return LiteralAlternation(literals, pattern, flags)
+    return None
+
+
+def _compile(pattern, flags):
+    alternation = automaton(pattern, flags)
+    return recache.compile(pattern, flags) if alternation is None else alternation
+
+
+_cache = recache.PatternCache(maxsize=64, compiler=_compile)
+
+
+def compile(pattern, flags=0):
+    """Compile pattern, using an automaton instead of the re engine for large pure literal alternations"""
+    return _cache.compile(pattern, flags)
+
+
+def search(pattern, string, flags=0):
+    return _cache.compile(pattern, flags).search(string)
+
+
+def finditer(pattern, string, flags=0):
+    return _cache.compile(pattern, flags).finditer(string)
+
+
+def findall(pattern, string, flags=0):
+    return _cache.compile(pattern, flags).findall(string)
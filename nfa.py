@@ -0,0 +1,664 @@
+"""A regex engine that runs in time linear in the length of the string"""
+import re
+import sys
+import time
+from functools import cached_property, lru_cache
+
+import reparse
+
+# The re module is a backtracking engine: on failure it goes back and tries the next alternative, the next
+# repetition count, ... For patterns like (a+)+$ that can mean trying exponentially many ways before giving up.
+# This module compiles the same parse tree into a Thompson NFA, a small program of instructions, and runs it
+# with the Pike VM algorithm: all the ways a match could go are followed at the same time, one string position
+# after the other, and two ways that reach the same instruction at the same position are merged.
+# So every character is looked at once per instruction at most: O(len(string) x len(program)).
+# The ways are kept in priority order, which gives exactly the match re would return (leftmost, then the
+# alternative/repetition count a backtracking engine would have tried first), captures included.
+#
+# Like re, a loop doesn't start another iteration right after one that matched nothing, and a counted repeat
+# {m,n} (compiled into n copies of its body) has no copy after an empty optional one. The paths through
+# them remember which iterations they started at the current position (see _closure()).
+#
+# What can't be done without backtracking isn't supported and raises Unsupported:
+# backreferences \1 (?P=name), conditionals (?(1)...), lookahead/lookbehind, atomic groups and possessive repeats.
+#
+# Linear time can still be a lot of time on untrusted input. compile(pattern, max_steps=..., timeout=...) puts
+# a budget on every call (search, match, finditer, ...): once the call has executed max_steps instructions or
+# run for timeout seconds it raises StepLimitExceeded or MatchTimeout. The checks are plain Python in the
+# matching loop, so they work the same in any thread or worker process, no signals involved.
+
+# Instruction opcodes, an instruction is a tuple (opcode, arguments...)
+CHAR = 0  # (CHAR, code)              consume the character with that code point
+CLASS = 1  # (CLASS, CharClass)       consume a character in the class
+ANY = 2  # (ANY,)                     consume anything but a newline
+ANY_ALL = 3  # (ANY_ALL,)             consume anything (DOTALL)
+SPLIT = 4  # (SPLIT, first, second)   continue at both, first has priority
+JMP = 5  # (JMP, target)
+SAVE = 6  # (SAVE, slot)              record the position in a capture slot
+ASSERT = 7  # (ASSERT, at_code, flags) zero-width anchor: ^ $ \A \Z \b \B
+MATCH = 8  # (MATCH, id)              a match of pattern number id ends here
+LOOP = 9  # (LOOP, split, exit, next) end of an iteration started at split: to exit when it was empty, else to next
+
+_NO_LOOPS = frozenset()
+
+# Refuse to expand counted repeats such as (\w{100}){100} into programs bigger than this
+MAX_PROGRAM_SIZE = 100_000
+# The clock is looked at once every this many positions, not at every character
+DEADLINE_INTERVAL = 64
+
+
+class Unsupported(ValueError):
+    """The pattern uses a construct that the NFA engine can't run in linear time"""
+
+
+class MatchBudgetExceeded(RuntimeError):
+    """A call ran past its step budget or deadline, steps is the number of instructions it executed"""
+
+    def __init__(self, message, steps):
+        super().__init__(message, steps)
+        self.steps = steps
+
+    def __str__(self):
+        return self.args[0]
+
+
+class StepLimitExceeded(MatchBudgetExceeded):
+    """More than max_steps instructions executed"""
+
+
+class MatchTimeout(MatchBudgetExceeded):
+    """The deadline passed before the call finished"""
+
+
+def _is_word(code, ascii):
+    if ascii:
+        return code < 128 and (chr(code).isalnum() or code == 95)
+    return chr(code).isalnum() or code == 95
+
+
+def _in_category(category, code, ascii):
+    if category is reparse.CATEGORY_DIGIT:
+        return 48 <= code <= 57 if ascii else chr(code).isdecimal()
+    if category is reparse.CATEGORY_NOT_DIGIT:
+        return not _in_category(reparse.CATEGORY_DIGIT, code, ascii)
+    if category is reparse.CATEGORY_SPACE:
+        return code in (9, 10, 11, 12, 13, 32) if ascii else chr(code).isspace()
+    if category is reparse.CATEGORY_NOT_SPACE:
+        return not _in_category(reparse.CATEGORY_SPACE, code, ascii)
+    if category is reparse.CATEGORY_WORD:
+        return _is_word(code, ascii)
+    if category is reparse.CATEGORY_NOT_WORD:
+        return not _is_word(code, ascii)
+    raise Unsupported(f"character category {category} is not supported")
+
+
+class CharClass:
+    """Set of characters described by the items of an IN node: LITERAL, RANGE, CATEGORY and NEGATE
+
+    Instances are plain data (so programs can be pickled), membership answers are memoized per code point.
+    """
+
+    def __init__(self, items, ignorecase=False, ascii=False):
+        self.negate = bool(items) and items[0][0] is reparse.NEGATE
+        self.items = [(op, av) for op, av in items if op is not reparse.NEGATE]
+        self.ignorecase = ignorecase
+        self.ascii = ascii
+        self._memo = {}
+        for op, av in self.items:
+            if op is reparse.CATEGORY:
+                _in_category(av, 48, ascii)  # raises Unsupported for unknown categories
+
+    def _contains(self, code):
+        for op, av in self.items:
+            if op is reparse.LITERAL:
+                if code == av:
+                    return True
+            elif op is reparse.RANGE:
+                if av[0] <= code <= av[1]:
+                    return True
+            elif op is reparse.CATEGORY:
+                if _in_category(av, code, self.ascii):
+                    return True
+            else:
+                raise Unsupported(f"{op} inside a character class is not supported")
+        return False
+
+    def __contains__(self, code):
+        found = self._memo.get(code)
+        if found is None:
+            found = self._contains(code)
+            if not found and self.ignorecase:
+                found = any(
+                    self._contains(other) for other in _case_variants(code, self.ascii)
+                )
+            found = found != self.negate
+            self._memo[code] = found
+        return found
+
+    def __getstate__(self):
+        return {
+            "negate": self.negate,
+            "items": self.items,
+            "ignorecase": self.ignorecase,
+            "ascii": self.ascii,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._memo = {}
+
+
+@lru_cache(maxsize=None)
+def _lowered_from():
+    """{lower case: [characters with that lower case]}, for the characters that aren't their own lower case"""
+    tolower = reparse._sre.unicode_tolower
+    lowered = {}
+    for code in range(sys.maxunicode + 1):
+        lower = tolower(code)
+        if lower != code:
+            lowered.setdefault(lower, []).append(code)
+    return lowered
+
+
+def _case_variants(code, ascii):
+    """The other characters IGNORECASE matches code with, as re decides it
+
+    Unicode patterns compare the simple lower case of _sre (İ and the Kelvin sign K lower to i and k,
+    where str.lower() gives two characters or nothing re uses) plus reparse.IGNORECASE_FIXES (ſ is an s).
+    """
+    if ascii:
+        if 65 <= code <= 90:
+            return (code + 32,)
+        if 97 <= code <= 122:
+            return (code - 32,)
+        return ()
+    if not reparse._sre.unicode_iscased(code):
+        return ()
+    lower = reparse._sre.unicode_tolower(code)
+    lowers = (lower, *reparse.IGNORECASE_FIXES.get(lower, ()))
+    lowered_from = _lowered_from()
+    variants = set(lowers)
+    for other in lowers:
+        variants.update(lowered_from.get(other, ()))
+    variants.discard(code)
+    return variants
+
+
+class Program:
+    """Compiled instructions plus what is needed to build match objects"""
+
+    def __init__(self, instructions, groups, groupindex, is_bytes):
+        self.instructions = instructions
+        self.groups = groups
+        self.groupindex = groupindex
+        self.is_bytes = is_bytes
+
+    @cached_property
+    def loops(self):
+        """The SPLIT instructions that start an iteration of a loop or a counted repeat, the body is at split + 1"""
+        return frozenset(
+            instruction[1]
+            for instruction in self.instructions
+            if instruction[0] == LOOP
+        )
+
+    def __len__(self):
+        return len(self.instructions)
+
+
+class _Compiler:
+    def __init__(self, ascii):
+        self.ascii = ascii
+        self.instructions = []
+
+    def emit(self, instruction):
+        self.instructions.append(instruction)
+        if len(self.instructions) > MAX_PROGRAM_SIZE:
+            raise Unsupported("pattern is too big for the NFA engine")
+        return len(self.instructions) - 1
+
+    def patch(self, index, instruction):
+        self.instructions[index] = instruction
+
+    def sequence(self, items, flags):
+        for op, av in items:
+            self.node(op, av, flags)
+
+    def node(self, op, av, flags):
+        ignorecase = bool(flags & re.IGNORECASE)
+        if op is reparse.LITERAL:
+            if ignorecase and _case_variants(av, self.ascii):
+                self.emit((CLASS, CharClass([(op, av)], True, self.ascii)))
+            else:
+                self.emit((CHAR, av))
+        elif op is reparse.NOT_LITERAL:
+            self.emit(
+                (
+                    CLASS,
+                    CharClass(
+                        [(reparse.NEGATE, None), (reparse.LITERAL, av)],
+                        ignorecase,
+                        self.ascii,
+                    ),
+                )
+            )
+        elif op is reparse.IN:
+            self.emit((CLASS, CharClass(av, ignorecase, self.ascii)))
+        elif op is reparse.ANY:
+            self.emit((ANY_ALL,) if flags & re.DOTALL else (ANY,))
+        elif op is reparse.AT:
+            # \b and \w follow the pattern, not the string: a bytes pattern searching an mmap or a
+            # memoryview uses ASCII rules like with bytes
+            self.emit((ASSERT, av, flags | re.ASCII if self.ascii else flags))
+        elif op is reparse.SUBPATTERN:
+            group, add_flags, del_flags, sub = av
+            sub_flags = (flags | add_flags) & ~del_flags
+            if group:
+                self.emit((SAVE, 2 * group))
+            self.sequence(sub, sub_flags)
+            if group:
+                self.emit((SAVE, 2 * group + 1))
+        elif op is reparse.BRANCH:
+            alternatives = av[1]
+            jumps = []
+            for alternative in alternatives[:-1]:
+                split = self.emit(None)
+                self.sequence(alternative, flags)
+                jumps.append(self.emit(None))
+                self.patch(split, (SPLIT, split + 1, len(self.instructions)))
+            self.sequence(alternatives[-1], flags)
+            for jump in jumps:
+                self.patch(jump, (JMP, len(self.instructions)))
+        elif op in (reparse.MAX_REPEAT, reparse.MIN_REPEAT):
+            self.repeat(av, flags, greedy=op is reparse.MAX_REPEAT)
+        else:
+            raise Unsupported(f"{op} is not supported by the NFA engine")
+
+    def repeat(self, av, flags, greedy):
+        lo, hi, sub = av
+        for _ in range(lo):
+            self.sequence(sub, flags)
+        if hi is reparse.MAXREPEAT:
+            loop = self.emit(None)
+            self.sequence(sub, flags)
+            self.emit((LOOP, loop, len(self.instructions) + 1, loop))
+            end = len(self.instructions)
+            self.patch(
+                loop, (SPLIT, loop + 1, end) if greedy else (SPLIT, end, loop + 1)
+            )
+            return
+        # Optional copies: like re, a copy that matched nothing is the last one
+        splits, loops = [], []
+        for copy in range(hi - lo):
+            if copy:
+                loops.append(self.emit(None))
+            splits.append(self.emit(None))
+            self.sequence(sub, flags)
+        end = len(self.instructions)
+        for split in splits:
+            self.patch(
+                split, (SPLIT, split + 1, end) if greedy else (SPLIT, end, split + 1)
+            )
+        for loop, split in zip(loops, splits):
+            self.patch(loop, (LOOP, split, end, loop + 1))
+
+
+def compile_program(pattern, flags=0, match_id=0, compiler=None):
+    """Compile pattern into a Program, appending to compiler's instructions when one is given"""
+    parsed = reparse.parse(pattern, flags)
+    flags = parsed.state.flags
+    if flags & re.LOCALE:
+        raise Unsupported("re.LOCALE is not supported by the NFA engine")
+    is_bytes = isinstance(pattern, bytes)
+    ascii = is_bytes or bool(flags & re.ASCII)
+    if compiler is None:
+        compiler = _Compiler(ascii)
+    else:
+        # Patterns sharing a compiler (see regexset.py) can each have their own ASCII flag
+        compiler.ascii = ascii
+    compiler.emit((SAVE, 0))
+    compiler.sequence(parsed, flags)
+    compiler.emit((SAVE, 1))
+    compiler.emit((MATCH, match_id))
+    return Program(
+        compiler.instructions,
+        parsed.state.groups - 1,
+        dict(parsed.state.groupdict),
+        is_bytes,
+    )
+
+
+def check_assertion(at, flags, codes, i, endpos):
+    """Whether the anchor at holds at position i; codes(j) gives the code point of string[j]"""
+    if at is reparse.AT_BEGINNING_STRING:
+        return i == 0
+    if at is reparse.AT_END_STRING:
+        return i == endpos
+    multiline = flags & re.MULTILINE
+    if at is reparse.AT_BEGINNING:
+        return i == 0 or (multiline and i <= endpos and codes(i - 1) == 10)
+    if at is reparse.AT_END:
+        if i == endpos:
+            return True
+        if i < endpos and codes(i) == 10:
+            return bool(multiline) or i == endpos - 1
+        return False
+    if at in (reparse.AT_BOUNDARY, reparse.AT_NON_BOUNDARY):
+        if endpos == 0:
+            return False
+        # The compiler adds re.ASCII for bytes patterns, see _Compiler.node()
+        ascii = bool(flags & re.ASCII)
+        before = i > 0 and _is_word(codes(i - 1), ascii)
+        after = i < endpos and _is_word(codes(i), ascii)
+        return (before != after) == (at is reparse.AT_BOUNDARY)
+    raise Unsupported(f"anchor {at} is not supported")
+
+
+def run(
+    program,
+    string,
+    pos=0,
+    endpos=None,
+    anchored=False,
+    full=False,
+    not_empty_at=-1,
+    max_steps=None,
+    deadline=None,
+):
+    """Run program over string[pos:endpos] and return (capture slots, steps) for the best match
+
+    capture slots is None when there is no match, otherwise a list with the start and end of every group
+    (-1 for groups that didn't take part) followed by the lastindex. steps counts instructions executed.
+    anchored -> the match must start at pos, full -> it must also end at endpos,
+    not_empty_at -> an empty match at that position doesn't count (finditer after an empty match).
+    max_steps -> raise StepLimitExceeded after that many steps, deadline -> raise MatchTimeout once
+    time.monotonic() is past it.
+    """
+    endpos = len(string) if endpos is None else min(endpos, len(string))
+    instructions = program.instructions
+    loops = program.loops
+    nslots = 2 * (program.groups + 1)
+    if isinstance(string, str):
+        codes = lambda j: ord(string[j])
+    else:
+        codes = string.__getitem__
+    empty = [-1] * nslots + [None]
+    matched = None
+    steps = 0
+    current = []
+    for i in range(pos, endpos + 1):
+        if max_steps is not None and steps > max_steps:
+            raise StepLimitExceeded("step budget exceeded", steps)
+        if (
+            deadline is not None
+            and not (i - pos) % DEADLINE_INTERVAL
+            and time.monotonic() > deadline
+        ):
+            raise MatchTimeout(f"deadline passed at position {i}", steps)
+        if matched is None and (not anchored or i == pos):
+            # A new thread starting here has the lowest priority of all
+            current.append((0, empty))
+        if not current:
+            if matched is not None or anchored:
+                break
+            continue
+        current, added = _closure(
+            instructions, loops, current, string, codes, i, endpos
+        )
+        steps += added
+        code = codes(i) if i < endpos else None
+        following = []
+        for pc, slots in current:
+            steps += 1
+            instruction = instructions[pc]
+            opcode = instruction[0]
+            if opcode == MATCH:
+                if full and i != endpos:
+                    continue
+                if i == not_empty_at and slots[0] == i:
+                    continue
+                matched = slots
+                # Everything after this thread in the list has a lower priority
+                break
+            if code is None:
+                continue
+            if opcode == CHAR:
+                ok = code == instruction[1]
+            elif opcode == CLASS:
+                ok = code in instruction[1]
+            elif opcode == ANY:
+                ok = code != 10
+            else:
+                ok = True
+            if ok:
+                following.append((pc + 1, slots))
+        current = following
+    return matched, steps
+
+
+def _closure(instructions, loops, threads, string, codes, i, endpos):
+    """Follow the zero-width instructions of threads at position i, keeping priority order and dropping duplicates
+
+    Along the way each path carries the loops whose current iteration started at i (entered). When one of
+    them comes to its LOOP, the iteration consumed nothing and the loop ends, like it does in re.
+    Two paths only lead to the same place when they are at the same instruction with the same loops entered.
+    """
+    result = []
+    seen = set()
+    consuming = set()
+    added = 0
+    for pc, slots in threads:
+        stack = [(pc, slots, _NO_LOOPS)]
+        while stack:
+            pc, slots, entered = stack.pop()
+            instruction = instructions[pc]
+            opcode = instruction[0]
+            added += 1
+            if opcode == LOOP:
+                split = instruction[1]
+                if split in entered:
+                    stack.append((instruction[2], slots, entered - {split}))
+                else:
+                    stack.append((instruction[3], slots, entered))
+                continue
+            key = (pc, entered) if entered else pc
+            if key in seen:
+                continue
+            seen.add(key)
+            if opcode == JMP:
+                stack.append((instruction[1], slots, entered))
+            elif opcode == SPLIT:
+                if pc in loops:
+                    # Into the body a new iteration starts here, the way out leaves the loop behind
+                    inside, outside = entered | {pc}, entered - {pc}
+                    first = inside if instruction[1] == pc + 1 else outside
+                    second = inside if instruction[2] == pc + 1 else outside
+                else:
+                    first = second = entered
+                stack.append((instruction[2], slots, second))
+                stack.append((instruction[1], slots, first))
+            elif opcode == SAVE:
+                slot = instruction[1]
+                slots = slots[:]
+                slots[slot] = i
+                if slot > 1 and slot % 2:
+                    slots[-1] = slot // 2
+                stack.append((pc + 1, slots, entered))
+            elif opcode == ASSERT:
+                if check_assertion(instruction[1], instruction[2], codes, i, endpos):
+                    stack.append((pc + 1, slots, entered))
+            elif pc not in consuming:
+                # After consuming a character (or matching) the entered loops no longer matter
+                consuming.add(pc)
+                result.append((pc, slots))
+    return result, added
+
+
+class NFAMatch:
+    """re.Match lookalike for matches found by NFAPattern"""
+
+    def __init__(self, pattern, string, pos, endpos, slots):
+        self.re = pattern
+        self.string = string
+        self.pos = pos
+        self.endpos = endpos
+        self._slots = slots
+        self.lastindex = slots[-1]
+        names = {index: name for name, index in pattern.groupindex.items()}
+        self.lastgroup = names.get(self.lastindex)
+
+    def _index(self, group):
+        if isinstance(group, str):
+            group = self.re.groupindex.get(group, -1)
+        if not 0 <= group <= self.re.groups:
+            raise IndexError("no such group")
+        return group
+
+    def span(self, group=0):
+        index = self._index(group)
+        return self._slots[2 * index], self._slots[2 * index + 1]
+
+    def start(self, group=0):
+        return self.span(group)[0]
+
+    def end(self, group=0):
+        return self.span(group)[1]
+
+    def _group(self, group, default=None):
+        start, end = self.span(group)
+        return default if start == -1 else self.string[start:end]
+
+    def group(self, *groups):
+        if not groups:
+            return self._group(0)
+        if len(groups) == 1:
+            return self._group(groups[0])
+        return tuple(self._group(group) for group in groups)
+
+    def __getitem__(self, group):
+        return self._group(group)
+
+    def groups(self, default=None):
+        return tuple(
+            self._group(index, default) for index in range(1, self.re.groups + 1)
+        )
+
+    def groupdict(self, default=None):
+        return {
+            name: self._group(index, default)
+            for name, index in self.re.groupindex.items()
+        }
+
+    @property
+    def regs(self):
+        return tuple(self.span(index) for index in range(self.re.groups + 1))
+
+    def expand(self, template):
+        return reparse.expand(template, self)
+
+    def __repr__(self):
+        return f"<nfa.NFAMatch object; span={self.span()!r}, match={self.group()!r}>"
+
+
+class NFAPattern:
+    """re.Pattern lookalike backed by the linear-time NFA engine
+
+    max_steps and timeout (seconds) limit every call, a finditer() included, see MatchBudgetExceeded.
+    """
+
+    def __init__(self, pattern, flags=0, max_steps=None, timeout=None, program=None):
+        # program can be one compiled earlier for the same pattern and flags (see diskcache.py)
+        self.program = compile_program(pattern, flags) if program is None else program
+        self.pattern = pattern
+        self.flags = flags
+        self.groups = self.program.groups
+        self.groupindex = self.program.groupindex
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.steps = 0
+
+    def _budget(self):
+        # [steps left, deadline, steps used so far] for one call
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        return [self.max_steps, deadline, 0]
+
+    def _run(self, string, pos, endpos, budget=None, **kwargs):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        budget = budget or self._budget()
+        try:
+            slots, steps = run(
+                self.program,
+                string,
+                pos,
+                endpos,
+                max_steps=budget[0],
+                deadline=budget[1],
+                **kwargs,
+            )
+        except MatchBudgetExceeded as e:
+            self.steps += e.steps
+            # Report the steps of the whole call, a finditer() runs the program many times
+            e.steps += budget[2]
+            e.args = (e.args[0], e.steps)
+            raise
+        self.steps += steps
+        budget[2] += steps
+        if budget[0] is not None:
+            budget[0] -= steps
+        return None if slots is None else NFAMatch(self, string, pos, endpos, slots)
+
+    def search(self, string, pos=0, endpos=None):
+        return self._run(string, pos, endpos)
+
+    def match(self, string, pos=0, endpos=None):
+        return self._run(string, pos, endpos, anchored=True)
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        return self._run(string, pos, endpos, anchored=True, full=True)
+
+    def finditer(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        not_empty_at = -1
+        budget = self._budget()
+        while pos <= endpos:
+            m = self._run(string, pos, endpos, budget, not_empty_at=not_empty_at)
+            if m is None:
+                return
+            yield m
+            pos = m.end()
+            not_empty_at = pos if m.start() == m.end() else -1
+
+    def findall(self, string, pos=0, endpos=None):
+        matches, empty = self.finditer(string, pos, endpos), self.pattern[:0]
+        if self.groups == 0:
+            return [m.group() for m in matches]
+        if self.groups == 1:
+            return [m.groups(empty)[0] for m in matches]
+        return [m.groups(empty) for m in matches]
+
+    def subn(self, repl, string, count=0):
+        """(new string, number of substitutions), repl being a template or a function of the match"""
+        pieces, last, done = [], 0, 0
+        for m in self.finditer(string):
+            if count and done == count:
+                break
+            pieces.append(string[last : m.start()])
+            pieces.append(repl(m) if callable(repl) else m.expand(repl))
+            last = m.end()
+            done += 1
+        pieces.append(string[last:])
+        return string[:0].join(pieces), done
+
+    def sub(self, repl, string, count=0):
+        return self.subn(repl, string, count)[0]
+
+    def __repr__(self):
+        return f"nfa.compile({self.pattern!r})"
+
+
+def compile(pattern, flags=0, max_steps=None, timeout=None):
+    """Compile pattern for the NFA engine, raising Unsupported for constructs that need backtracking
+
+    With max_steps or timeout every call raises a MatchBudgetExceeded once it goes past them.
+    """
+    return NFAPattern(pattern, flags, max_steps, timeout)
@@ -0,0 +1,294 @@
+"""Skipping ahead with str.find before running the regex engine"""
+import re
+
+import recache
+import reparse
+
+# Patterns like r"foo.*bar", r"(?<=foo)bar", r"\bfoo\b" and r"x-{1,4}x" can only match where a fixed
+# piece of text occurs: "foo", "bar", "x"... The regex engine still starts an attempt at every position of
+# the string. str.find() and bytes.find() look for a fixed piece of text much faster, so:
+#   1. required_literals() walks the parse tree (the one re.DEBUG prints, see flags.py) and collects the
+#      literal runs every match must contain, together with how far from the start of the match they can be.
+#   2. PrefilteredPattern finds the literal first and only starts the engine where a match is possible:
+#        - the literal doesn't occur at all    -> no match, the engine never runs
+#        - it is between lo and hi characters into every match -> the engine starts hi characters before it
+#        - its distance from the match start is unbounded      -> the engine starts where it would have anyway
+# Searches still go through re, so the results are identical to the unfiltered pattern.
+#
+# With re.IGNORECASE (or inside (?i:...)) the re module compares every character in its case-folded form and
+# can't skip ahead to a literal prefix, which makes r"timeout" about 10 times slower with re.I than without.
+# Most case-insensitive literals are plain ASCII though: "timeout" with re.I matches TIMEOUT, Timeout, ...
+# So such runs become Literals with ignorecase=True, their text folded to lower case, and find_folded()
+# looks for them in a copy of the string with only A-Z folded to a-z (bytes.translate() with a 256 byte table,
+# str.lower() for ASCII strings): the copy has the same length, so positions in it are positions in the string.
+#   - scoped flags are followed exactly: in (?i:foo)bar only foo is case-insensitive, (?-i:...) turns it off
+#   - for str patterns without re.ASCII, i, k and s also match non-ASCII characters (İ ı, the Kelvin sign K,
+#     ſ) that ASCII folding doesn't know about: they end a literal run instead of being part of it
+#   - digits and punctuation are the same in every case, they can be part of either kind of run
+
+
+# ASCII letters that match a non-ASCII character too under re.IGNORECASE, unless re.ASCII is set
+_UNICODE_FOLDS = frozenset(b"IKSiks")
+
+_UPPER = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_LOWER = b"abcdefghijklmnopqrstuvwxyz"
+_FOLD_BYTES = bytes.maketrans(_UPPER, _LOWER)
+_FOLD_STR = str.maketrans(_UPPER.decode(), _LOWER.decode())
+
+# find_folded() folds the string one block at a time, starting small so a nearby literal is found cheaply
+FOLD_BLOCK = 256
+MAX_FOLD_BLOCK = 64 * 1024
+
+
+class Literal:
+    """A run of characters that every match contains, lo..hi characters after the start of the match
+
+    With ignorecase the run matches in any ASCII case, text is its lower case form.
+    """
+
+    __slots__ = ("text", "lo", "hi", "ignorecase")
+
+    def __init__(self, text, lo, hi, ignorecase=False):
+        self.text = text
+        self.lo = lo
+        self.hi = hi
+        self.ignorecase = ignorecase
+
+    def __repr__(self):
+        ignorecase = ", ignorecase=True" if self.ignorecase else ""
+        return f"Literal({self.text!r}, lo={self.lo}, hi={self.hi}{ignorecase})"
+
+
+def fold(string):
+    """Copy of string with A-Z turned into a-z and everything else left alone, of the same length"""
+    if isinstance(string, str):
+        # lower() is faster, but only keeps the length on ASCII strings ("İ".lower() is 2 characters)
+        return string.lower() if string.isascii() else string.translate(_FOLD_STR)
+    return bytes(string).translate(_FOLD_BYTES)
+
+
+def find_folded(string, text, start=0, end=None):
+    """Lowest index of text (in lower case) in fold(string[start:end]), or -1"""
+    end = len(string) if end is None else min(end, len(string))
+    block = FOLD_BLOCK
+    while start < end:
+        # Consecutive blocks overlap by len(text) - 1, so an occurrence across a block boundary is found
+        stop = min(end, start + block + len(text) - 1)
+        found = fold(string[start:stop]).find(text)
+        if found != -1:
+            return start + found
+        if stop == end:
+            break
+        start += block
+        block = min(2 * block, MAX_FOLD_BLOCK)
+    return -1
+
+
+def _flatten(items, flags):
+    # Groups don't consume anything themselves, so a group without alternatives is the same as its contents.
+    # Every node comes out with the flags in effect for it, scoped flags like (?i:...) included.
+    for op, av in items:
+        if op is reparse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            yield from _flatten(sub, (flags | add_flags) & ~del_flags)
+        else:
+            yield op, av, flags
+
+
+def _literal_code(code, flags, is_bytes):
+    """(code, ignorecase) for a LITERAL that can be part of a Literal run, None if it can't
+
+    ignorecase is None for characters that find() and find_folded() both look for as they are.
+    """
+    if not flags & re.IGNORECASE:
+        return code, False if code < 128 and chr(code).isalpha() else None
+    if code >= 128 or flags & re.LOCALE:
+        return None
+    if not chr(code).isalpha():
+        return code, None
+    if not (is_bytes or flags & re.ASCII) and code in _UNICODE_FOLDS:
+        return None
+    return code | 0x20, True
+
+
+def required_literals(pattern, flags=0):
+    """Return the Literal runs that every match of pattern must contain, in pattern order"""
+    parsed = (
+        pattern
+        if isinstance(pattern, reparse.sre_parse.SubPattern)
+        else reparse.parse(pattern, flags)
+    )
+    is_bytes = isinstance(parsed.state.str, bytes)
+    to_text = bytes if is_bytes else lambda codes: "".join(map(chr, codes))
+    literals = []
+    # run_ignorecase is None while the run only has characters that are the same in every case
+    run, run_lo, run_hi, run_ignorecase = [], 0, 0, None
+    lo, hi = 0, 0
+    for op, av, item_flags in _flatten(parsed, parsed.state.flags):
+        literal = (
+            _literal_code(av, item_flags, is_bytes) if op is reparse.LITERAL else None
+        )
+        if literal is not None:
+            code, ignorecase = literal
+            if (
+                run
+                and ignorecase is not None
+                and run_ignorecase not in (None, ignorecase)
+            ):
+                literals.append(Literal(to_text(run), run_lo, run_hi, run_ignorecase))
+                run = []
+            if not run:
+                run_lo, run_hi, run_ignorecase = lo, hi, None
+            run.append(code)
+            if ignorecase is not None:
+                run_ignorecase = ignorecase
+            lo += 1
+            hi = None if hi is None else hi + 1
+            continue
+        if run:
+            literals.append(Literal(to_text(run), run_lo, run_hi, bool(run_ignorecase)))
+            run = []
+        if op in (reparse.AT, reparse.ASSERT, reparse.ASSERT_NOT):
+            continue
+        item_lo, item_hi = reparse.width(parsed, [(op, av)])
+        lo += item_lo
+        hi = None if hi is None or item_hi is None else hi + item_hi
+    if run:
+        literals.append(Literal(to_text(run), run_lo, run_hi, bool(run_ignorecase)))
+    return literals
+
+
+def best_literal(literals):
+    """Pick the literal that lets the search skip the most: a bounded position first, then the longest
+
+    Of equally long ones a case-sensitive literal wins, find() doesn't have to fold the string.
+    """
+    if not literals:
+        return None
+    return max(
+        literals,
+        key=lambda lit: (
+            lit.hi is not None,
+            len(lit.text),
+            not lit.ignorecase,
+            -(lit.hi or 0),
+        ),
+    )
+
+
+class PrefilteredPattern:
+    """A compiled regex that looks for its required literal with find() before each search"""
+
+    def __init__(self, regex, literal):
+        self.regex = regex
+        self.literal = literal
+        self.pattern = regex.pattern
+        self.flags = regex.flags
+        self.groups = regex.groups
+        self.groupindex = regex.groupindex
+        self.calls = 0
+        self.rejected = 0
+        self.scanned = 0
+        self.skipped = 0
+
+    def _candidate(self, string, pos, endpos):
+        """Position where the engine has to start, or -1 if no match is possible in string[pos:endpos]"""
+        literal = self.literal
+        if literal.ignorecase:
+            found = find_folded(string, literal.text, pos + literal.lo, endpos)
+        else:
+            found = string.find(literal.text, pos + literal.lo, endpos)
+        if found == -1:
+            return -1
+        if literal.hi is None:
+            return pos
+        return max(pos, found - literal.hi)
+
+    def _bounds(self, string, pos, endpos):
+        self.calls += 1
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        self.scanned += max(0, endpos - pos)
+        return endpos
+
+    def search(self, string, pos=0, endpos=None):
+        endpos = self._bounds(string, pos, endpos)
+        start = self._candidate(string, pos, endpos)
+        if start == -1:
+            self.rejected += 1
+            self.skipped += max(0, endpos - pos)
+            return None
+        self.skipped += start - pos
+        return self.regex.search(string, start, endpos)
+
+    def match(self, string, pos=0, endpos=None):
+        endpos = self._bounds(string, pos, endpos)
+        if self._candidate(string, pos, endpos) == -1:
+            self.rejected += 1
+            self.skipped += max(0, endpos - pos)
+            return None
+        return self.regex.match(string, pos, endpos)
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        endpos = self._bounds(string, pos, endpos)
+        if self._candidate(string, pos, endpos) == -1:
+            self.rejected += 1
+            self.skipped += max(0, endpos - pos)
+            return None
+        return self.regex.fullmatch(string, pos, endpos)
+
+    def finditer(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        # Every match contains the literal, so none of them is empty and each search resumes at the previous end
+        while True:
+            m = self.search(string, pos, endpos)
+            if m is None:
+                return
+            yield m
+            pos = m.end()
+
+    def findall(self, string, pos=0, endpos=None):
+        # Same shape as re.findall(): the whole match, the only group, or a tuple of all groups
+        matches, empty = self.finditer(string, pos, endpos), self.pattern[:0]
+        if self.groups == 0:
+            return [m.group() for m in matches]
+        if self.groups == 1:
+            return [m.groups(empty)[0] for m in matches]
+        return [m.groups(empty) for m in matches]
+
+    def stats(self):
+        return {
+            "literal": self.literal.text,
+            "ignorecase": self.literal.ignorecase,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "scanned": self.scanned,
+            "skipped": self.skipped,
+            "skipped_ratio": self.skipped / self.scanned if self.scanned else 0.0,
+        }
+
+    def __repr__(self):
+        return f"prefilter.PrefilteredPattern({self.pattern!r}, {self.literal!r})"
+
+
+def _compile(pattern, flags):
+    regex = recache.compile(pattern, flags)
+    literal = best_literal(required_literals(regex.pattern, regex.flags))
+    if literal is None:
+        return regex
+    return PrefilteredPattern(regex, literal)
+
+
+_cache = recache.PatternCache(compiler=_compile)
+
+
+def compile(pattern, flags=0):
+    """Compile pattern, wrapped in a PrefilteredPattern when it has a required literal"""
+    return _cache.compile(pattern, flags)
+
+
+def search(pattern, string, flags=0):
+    return _cache.compile(pattern, flags).search(string)
+
+
+def finditer(pattern, string, flags=0):
+    return _cache.compile(pattern, flags).finditer(string)
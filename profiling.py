@@ -0,0 +1,295 @@
+"""Finding the expensive regexes of a running program"""
+import random
+import threading
+import time
+
+import nfa
+import recache
+
+# re.DEBUG (see flags.py) shows how a pattern is parsed, but not how much work it does once a program runs.
+# A Profiler wraps compiled patterns and records for every (pattern, flags):
+#   - calls per method (search, match, finditer, sub, ...)
+#   - characters scanned: the length of the string between pos and endpos handed to each call
+#   - wall time: the total plus percentiles computed from a bounded random sample of the call durations
+#   - engine steps for patterns running on the NFA engine (nfa.py, used by backtracking.compile()):
+#     it never backtracks, the number of instructions it executed is its measure of work
+#   - errors per method: calls that raised, like those stopped by a step budget or deadline of nfa.py.
+#     Their time and steps count like those of any other call, they are often the most expensive ones.
+# snapshot() returns everything as a plain dict (for a metrics endpoint or a log line),
+# report() a text report and folded() the "pattern;method microseconds" lines flame graph tools read.
+# No profiler needs to be attached, the wrapped patterns can stay in a live service.
+
+# Call durations kept per pattern for the percentiles
+SAMPLE_SIZE = 1024
+
+
+class PatternProfile:
+    """Counters for one (pattern, flags)"""
+
+    def __init__(self, pattern, flags):
+        self.pattern = pattern
+        self.flags = flags
+        self.calls = {}
+        self.seconds = {}
+        self.errors = {}
+        self.scanned = 0
+        self.steps = 0
+        self.matches = 0
+        self._samples = []
+        self._seen = 0
+        self._random = random.Random(0)
+
+    def record(self, method, elapsed, scanned, steps, matches, failed=False):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if failed:
+            self.errors[method] = self.errors.get(method, 0) + 1
+        self.seconds[method] = self.seconds.get(method, 0.0) + elapsed
+        self.scanned += scanned
+        self.steps += steps
+        self.matches += matches
+        # Reservoir sampling: every call has the same chance of being among the SAMPLE_SIZE kept
+        self._seen += 1
+        if len(self._samples) < SAMPLE_SIZE:
+            self._samples.append(elapsed)
+        else:
+            slot = self._random.randrange(self._seen)
+            if slot < SAMPLE_SIZE:
+                self._samples[slot] = elapsed
+
+    def percentile(self, fraction):
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self):
+        total_calls = sum(self.calls.values())
+        total_seconds = sum(self.seconds.values())
+        return {
+            "pattern": self.pattern,
+            "flags": self.flags,
+            "calls": dict(self.calls),
+            "seconds": dict(self.seconds),
+            "errors": dict(self.errors),
+            "total_calls": total_calls,
+            "total_seconds": total_seconds,
+            "scanned": self.scanned,
+            "ns_per_char": total_seconds * 1e9 / self.scanned if self.scanned else 0.0,
+            "matches": self.matches,
+            "steps": self.steps,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+            "max": max(self._samples, default=0.0),
+        }
+
+
+def _per_call(regex):
+    # NFAPattern.steps adds up the steps of every call, from any thread. A copy sharing the compiled program
+    # counts those of one call.
+    if isinstance(regex, nfa.NFAPattern):
+        return nfa.NFAPattern(
+            regex.pattern, regex.flags, regex.max_steps, regex.timeout, regex.program
+        )
+    return regex
+
+
+def _scanned(string, pos, endpos):
+    end = len(string) if endpos is None else min(endpos, len(string))
+    return max(0, end - pos)
+
+
+class ProfiledPattern:
+    """Wrapper around a compiled pattern that reports every call to a PatternProfile"""
+
+    def __init__(self, regex, profile, lock):
+        self.regex = regex
+        self.profile = profile
+        self._lock = lock
+        self.pattern = regex.pattern
+        self.flags = regex.flags
+        self.groups = regex.groups
+        self.groupindex = regex.groupindex
+
+    def __getattr__(self, name):
+        # Only the wrapped pattern's own methods: nfa.NFAPattern has no split(), prefilter.PrefilteredPattern
+        # and multiliteral.LiteralAlternation have none of the three
+        if name in ("sub", "subn", "split") and hasattr(self.regex, name):
+            return getattr(self, "_" + name)
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
+
+    def _record(self, method, elapsed, scanned, regex, matches, failed):
+        steps = getattr(regex, "steps", 0)
+        with self._lock:
+            if regex is not self.regex:
+                self.regex.steps += steps
+            self.profile.record(method, elapsed, scanned, steps, matches, failed)
+
+    def _call(self, method, scanned, *args):
+        regex = _per_call(self.regex)
+        result, failed = None, True
+        start = time.perf_counter()
+        try:
+            result = getattr(regex, method)(*args)
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - start
+            if failed:
+                matches = 0
+            elif method == "findall":
+                matches = len(result)
+            elif method == "subn":
+                matches = result[1]
+            elif method in ("sub", "split"):
+                matches = 0
+            else:
+                matches = result is not None
+            self._record(method, elapsed, scanned, regex, matches, failed)
+        return result
+
+    def search(self, string, pos=0, endpos=None):
+        return self._call(
+            "search", _scanned(string, pos, endpos), string, pos, *_endpos(endpos)
+        )
+
+    def match(self, string, pos=0, endpos=None):
+        return self._call(
+            "match", _scanned(string, pos, endpos), string, pos, *_endpos(endpos)
+        )
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        return self._call(
+            "fullmatch", _scanned(string, pos, endpos), string, pos, *_endpos(endpos)
+        )
+
+    def findall(self, string, pos=0, endpos=None):
+        return self._call(
+            "findall", _scanned(string, pos, endpos), string, pos, *_endpos(endpos)
+        )
+
+    def _sub(self, repl, string, count=0):
+        return self._call("sub", len(string), repl, string, count)
+
+    def _subn(self, repl, string, count=0):
+        return self._call("subn", len(string), repl, string, count)
+
+    def _split(self, string, maxsplit=0):
+        return self._call("split", len(string), string, maxsplit)
+
+    def finditer(self, string, pos=0, endpos=None):
+        # Only the time spent producing matches counts, not what the caller does between them
+        regex = _per_call(self.regex)
+        iterator = regex.finditer(string, pos, *_endpos(endpos))
+        elapsed, matches, failed = 0.0, 0, False
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    m = next(iterator, None)
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    elapsed += time.perf_counter() - start
+                if m is None:
+                    break
+                matches += 1
+                yield m
+        finally:
+            self._record(
+                "finditer",
+                elapsed,
+                _scanned(string, pos, endpos),
+                regex,
+                matches,
+                failed,
+            )
+
+    def __repr__(self):
+        return f"profiling.ProfiledPattern({self.regex!r})"
+
+
+def _endpos(endpos):
+    # re's methods don't accept endpos=None
+    return () if endpos is None else (endpos,)
+
+
+class Profiler:
+    """Registry of PatternProfiles, one per (pattern, flags)"""
+
+    def __init__(self, compiler=recache.compile):
+        self.compiler = compiler
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, regex):
+        """Profile an already compiled pattern (re, nfa, prefilter, multiliteral...)"""
+        key = (regex.pattern, regex.flags)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = PatternProfile(*key)
+        return ProfiledPattern(regex, profile, self._lock)
+
+    def compile(self, pattern, flags=0):
+        return self.wrap(self.compiler(pattern, flags))
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def snapshot(self):
+        """Every profile as a dict, the most expensive (total wall time) first"""
+        with self._lock:
+            snapshots = [profile.snapshot() for profile in self._profiles.values()]
+        return sorted(snapshots, key=lambda s: s["total_seconds"], reverse=True)
+
+    def folded(self):
+        """Folded stack lines "pattern;method microseconds", the input format of flamegraph.pl and speedscope"""
+        lines = []
+        for s in self.snapshot():
+            name = repr(s["pattern"]).replace(";", "\\x3b")
+            for method, seconds in s["seconds"].items():
+                lines.append(f"{name};{method} {round(seconds * 1e6)}")
+        return "\n".join(lines)
+
+    def report(self, top=20, width=40):
+        """Text report of the top patterns with a bar proportional to their share of the total time"""
+        snapshots = self.snapshot()[:top]
+        total = sum(s["total_seconds"] for s in snapshots) or 1.0
+        lines = [
+            f"{'share':>6} {'calls':>8} {'total s':>9} {'p50 us':>8} {'p99 us':>8} {'ns/char':>8}  pattern"
+        ]
+        for s in snapshots:
+            share = s["total_seconds"] / total
+            lines.append(
+                f"{share:>6.1%} {s['total_calls']:>8} {s['total_seconds']:>9.4f} {s['p50'] * 1e6:>8.1f}"
+                f" {s['p99'] * 1e6:>8.1f} {s['ns_per_char']:>8.1f}  {'#' * round(share * width)} {s['pattern']!r}"
+            )
+        return "\n".join(lines)
+
+
+_default = Profiler()
+
+
+def default_profiler():
+    return _default
+
+
+def compile(pattern, flags=0):
+    """Compile pattern through recache and profile it with the default profiler"""
+    return _default.compile(pattern, flags)
+
+
+def wrap(regex):
+    return _default.wrap(regex)
+
+
+def snapshot():
+    return _default.snapshot()
+
+
+def report(top=20):
+    return _default.report(top)
@@ -0,0 +1,206 @@
+"""A bounded, instrumented cache of compiled regular expressions"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# The re module keeps its own hidden cache of compiled patterns (512 entries in CPython).
+# Once a program uses more distinct patterns than that the cache thrashes and every call to
+# re.search(<regex>, <string>) silently recompiles <regex>.
+# PatternCache is an explicit replacement that we can size, pick an eviction policy for and observe:
+#   - Entries are keyed on (type of pattern, pattern, flags) just like the re module does it,
+#     so r"foo" and b"foo" or r"foo" and (r"foo", re.I) are separate entries.
+#   - policy="lru" evicts the least recently used pattern, policy="lfu" the least frequently used one
+#     (ties are broken by recency).
+#   - stats() returns hit/miss/eviction counters and a histogram of compile times.
+#   - compiler is the function used on a miss, re.compile by default. Other matchers with the same
+#     (pattern, flags) signature can reuse the cache by passing their own compile function.
+
+POLICIES = ("lru", "lfu")
+
+# Upper bounds (in seconds) of the compile-time histogram buckets, the last bucket catches everything else
+HISTOGRAM_BOUNDS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1)
+
+
+class PatternCache:
+    """Compile-once registry of regular expression objects keyed on (pattern, flags)"""
+
+    def __init__(self, maxsize=512, policy="lru", compiler=re.compile):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.compiler = compiler
+        self._entries = OrderedDict()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.compile_seconds = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def compile(self, pattern, flags=0):
+        """Return the compiled form of pattern, compiling it only on the first request"""
+        if isinstance(pattern, re.Pattern):
+            if flags:
+                raise ValueError(
+                    "cannot process flags argument with a compiled pattern"
+                )
+            return pattern
+        # re.DEBUG prints the parse tree while compiling, the re module never caches it either
+        if flags & re.DEBUG:
+            return self.compiler(pattern, flags)
+        key = (type(pattern), pattern, flags)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self._uses[key] += 1
+                return compiled
+            self.misses += 1
+        start = time.perf_counter()
+        compiled = self.compiler(pattern, flags)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._record(elapsed)
+            if key not in self._entries:
+                while len(self._entries) >= self.maxsize:
+                    self._evict()
+                self._entries[key] = compiled
+                self._uses[key] = 1
+        return compiled
+
+    def _record(self, elapsed):
+        self.compile_seconds += elapsed
+        for i, bound in enumerate(HISTOGRAM_BOUNDS):
+            if elapsed <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def _evict(self):
+        if self.policy == "lru":
+            key = next(iter(self._entries))
+        else:
+            # min() returns the first of equally used keys, which is the least recently used one
+            key = min(self._entries, key=self._uses.__getitem__)
+        del self._entries[key]
+        del self._uses[key]
+        self.evictions += 1
+
+    def resize(self, maxsize):
+        """Change the capacity, evicting entries if the cache is now too big"""
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize:
+                self._evict()
+
+    def set_policy(self, policy):
+        """Switch the eviction policy, the entries stay: recency and use counts are tracked under both"""
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+        with self._lock:
+            self.policy = policy
+
+    def clear(self):
+        """Drop every cached pattern and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._uses.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.compile_seconds = 0.0
+            self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        pattern, flags = key
+        return (type(pattern), pattern, flags) in self._entries
+
+    def stats(self):
+        """Snapshot of the cache counters as a plain dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            labels = [f"<={bound:g}s" for bound in HISTOGRAM_BOUNDS]
+            labels.append(f">{HISTOGRAM_BOUNDS[-1]:g}s")
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "compile_seconds": self.compile_seconds,
+                "compile_histogram": dict(zip(labels, self.histogram)),
+            }
+
+
+# Shared default cache, used by the module level functions below.
+# They mirror the signatures of the functions in the re module so that
+#   re.search(<regex>, <string>, <flags>)
+# can be replaced with
+#   recache.search(<regex>, <string>, <flags>)
+_default = PatternCache()
+
+
+def configure(maxsize=None, policy=None):
+    """Resize the default cache or switch its eviction policy
+
+    The cache is changed in place, whoever holds on to default_cache() sees the new settings.
+    """
+    if policy is not None:
+        _default.set_policy(policy)
+    if maxsize is not None:
+        _default.resize(maxsize)
+    return _default
+
+
+def default_cache():
+    return _default
+
+
+def compile(pattern, flags=0):
+    return _default.compile(pattern, flags)
+
+
+def search(pattern, string, flags=0):
+    return _default.compile(pattern, flags).search(string)
+
+
+def match(pattern, string, flags=0):
+    return _default.compile(pattern, flags).match(string)
+
+
+def fullmatch(pattern, string, flags=0):
+    return _default.compile(pattern, flags).fullmatch(string)
+
+
+def findall(pattern, string, flags=0):
+    return _default.compile(pattern, flags).findall(string)
+
+
+def finditer(pattern, string, flags=0):
+    return _default.compile(pattern, flags).finditer(string)
+
+
+def split(pattern, string, maxsplit=0, flags=0):
+    return _default.compile(pattern, flags).split(string, maxsplit)
+
+
+def sub(pattern, repl, string, count=0, flags=0):
+    return _default.compile(pattern, flags).sub(repl, string, count)
+
+
+def subn(pattern, repl, string, count=0, flags=0):
+    return _default.compile(pattern, flags).subn(repl, string, count)
+
+
+def stats():
+    return _default.stats()
@@ -0,0 +1,224 @@
+"""Which of many patterns match a string, found in one pass over the string"""
+import re
+
+import backtracking
+import multiliteral
+import nfa
+import prefilter
+import recache
+
+# Checking a line against hundreds of patterns with one recache.search(<regex>, <line>) per pattern
+# walks over the line hundreds of times. A RegexSet walks over it once to find out which patterns can match:
+#   - most patterns contain a piece of plain text every match must contain (see prefilter.py): "foo" in r"\bfoo\b".
+#     Those pieces of all the patterns go into one Aho-Corasick automaton (see multiliteral.py) and a single
+#     pass over the string tells which of them occur. Case-insensitive ASCII pieces, "foo" in r"(?i)\bfoo\b",
+#     go into a second automaton that runs over a copy of the string folded to lower case (prefilter.fold())
+#   - only the patterns whose piece occurs, plus the ones without such a piece, are then searched for,
+#     so a line that none of the patterns match typically costs one pass and no regex search at all
+#   - patterns on which re could backtrack exponentially (see backtracking.py) are compiled together into one
+#     NFA program (see nfa.py), each ending in its own MATCH instruction, and are run in one linear-time pass
+#     that stops as soon as all of them matched
+# The threads of that pass carry no capture slots, only whether a pattern matches is needed,
+# so two threads at the same instruction are always merged.
+# benchmarks/regexset.py compares a RegexSet with the one-search-per-pattern loop.
+
+
+def _normalize(patterns, flags):
+    # Every entry is a pattern (using flags), a (pattern, flags) pair or a compiled pattern
+    result = []
+    for entry in patterns:
+        if isinstance(entry, tuple):
+            pattern, pattern_flags = entry
+        elif isinstance(entry, re.Pattern):
+            pattern, pattern_flags = entry.pattern, entry.flags
+        else:
+            pattern, pattern_flags = entry, flags
+        result.append((pattern, pattern_flags))
+    return result
+
+
+class RegexSet:
+    """A set of patterns searched together, matches() returns the indices of the ones found in a string"""
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = _normalize(patterns, flags)
+        if len({isinstance(pattern, bytes) for pattern, _ in self.patterns}) > 1:
+            raise TypeError("cannot mix str and bytes patterns in a RegexSet")
+        # For every pattern the regex confirming it matches, None for the ones run on the NFA program
+        self._regexes = []
+        compiler = nfa._Compiler(ascii=False)
+        self._starts = {}
+        self._owner = []
+        # Patterns by the literal every match of theirs contains (case-sensitive and folded to lower case),
+        # and the ones without one
+        by_literal, by_folded = {}, {}
+        self._always = []
+        for index, (pattern, pattern_flags) in enumerate(self.patterns):
+            literals = prefilter.required_literals(pattern, pattern_flags)
+            if literals:
+                literal = max(
+                    literals, key=lambda lit: (len(lit.text), not lit.ignorecase)
+                )
+                group = by_folded if literal.ignorecase else by_literal
+                group.setdefault(literal.text, []).append(index)
+            else:
+                self._always.append(index)
+            regex = None
+            risk = backtracking.analyze(pattern, pattern_flags).risk
+            if risk == backtracking.EXPONENTIAL:
+                start = len(compiler.instructions)
+                try:
+                    program = nfa.compile_program(
+                        pattern, pattern_flags, index, compiler
+                    )
+                except nfa.Unsupported:
+                    del compiler.instructions[start:]
+                    regex = recache.compile(pattern, pattern_flags)
+                else:
+                    self._starts[index] = start
+                    self._owner += [index] * (len(program.instructions) - start)
+            else:
+                regex = recache.compile(pattern, pattern_flags)
+            self._regexes.append(regex)
+        self._instructions = compiler.instructions
+        self._literals = (
+            multiliteral.LiteralAlternation(list(by_literal)) if by_literal else None
+        )
+        self._owners = list(by_literal.values())
+        self._folded = (
+            multiliteral.LiteralAlternation(list(by_folded)) if by_folded else None
+        )
+        self._folded_owners = list(by_folded.values())
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _scan(self, string, pos, endpos, found, entries):
+        """Run the NFA program for entries, (start pc, pattern index) pairs, adding the matching ones to found"""
+        instructions, owner = self._instructions, self._owner
+        if isinstance(string, str):
+            codes = lambda j: ord(string[j])
+        else:
+            codes = string.__getitem__
+        total = len(entries) + len(found)
+        starts = [pc for pc, _ in entries]
+        current = []
+        for i in range(pos, endpos + 1):
+            # Threads of every pattern not matched yet start again at every position
+            stack = current + starts
+            seen = set()
+            consuming = []
+            matched = False
+            while stack:
+                pc = stack.pop()
+                if pc in seen:
+                    continue
+                seen.add(pc)
+                instruction = instructions[pc]
+                opcode = instruction[0]
+                if opcode == nfa.JMP:
+                    stack.append(instruction[1])
+                elif opcode == nfa.SPLIT:
+                    stack.append(instruction[1])
+                    stack.append(instruction[2])
+                elif opcode == nfa.LOOP:
+                    # Without priorities an empty iteration adds nothing: the exit is reachable from next too
+                    stack.append(instruction[3])
+                elif opcode == nfa.SAVE:
+                    stack.append(pc + 1)
+                elif opcode == nfa.ASSERT:
+                    if nfa.check_assertion(
+                        instruction[1], instruction[2], codes, i, endpos
+                    ):
+                        stack.append(pc + 1)
+                elif opcode == nfa.MATCH:
+                    found.add(instruction[1])
+                    matched = True
+                else:
+                    consuming.append(pc)
+            if matched:
+                if len(found) == total:
+                    break
+                starts = [pc for pc, index in entries if index not in found]
+            if i == endpos:
+                break
+            code = codes(i)
+            current = []
+            for pc in consuming:
+                if owner[pc] in found:
+                    continue
+                instruction = instructions[pc]
+                opcode = instruction[0]
+                if opcode == nfa.CHAR:
+                    ok = code == instruction[1]
+                elif opcode == nfa.CLASS:
+                    ok = code in instruction[1]
+                elif opcode == nfa.ANY:
+                    ok = code != 10
+                else:
+                    ok = True
+                if ok:
+                    current.append(pc + 1)
+        return found
+
+    def _candidates(self, string, pos, endpos):
+        """Indices of the patterns that can match: the ones whose literal doesn't occur are left out"""
+        yield from self._always
+        if self._literals is not None:
+            for literal in self._literals.occurring(string, pos, endpos):
+                yield from self._owners[literal]
+        if self._folded is not None:
+            folded = prefilter.fold(string[pos:endpos])
+            for literal in self._folded.occurring(folded):
+                yield from self._folded_owners[literal]
+
+    def matches(self, string, pos=0, endpos=None):
+        """Set of the indices of the patterns that match somewhere in string[pos:endpos]"""
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        found = set()
+        entries = []
+        for index in self._candidates(string, pos, endpos):
+            regex = self._regexes[index]
+            if regex is None:
+                entries.append((self._starts[index], index))
+            elif regex.search(string, pos, endpos) is not None:
+                found.add(index)
+        if entries:
+            self._scan(string, pos, endpos, found, entries)
+        return found
+
+    def is_match(self, string, pos=0, endpos=None):
+        """Whether any of the patterns matches, stopping at the first one found"""
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        entries = []
+        for index in self._candidates(string, pos, endpos):
+            regex = self._regexes[index]
+            if regex is None:
+                entries.append((self._starts[index], index))
+            elif regex.search(string, pos, endpos) is not None:
+                return True
+        return bool(entries) and bool(self._scan(string, pos, endpos, set(), entries))
+
+    def matches_many(self, strings):
+        """matches() for every string of strings, as a list"""
+        return [self.matches(string) for string in strings]
+
+    def iter_matches(self, lines):
+        """Yield (line number, indices) for every line of lines (e.g. a file object) that a pattern matches
+
+        A trailing newline is not part of the line, so $ and \\Z match before it.
+        """
+        for number, line in enumerate(lines):
+            if line[-1:] in ("\n", b"\n"):
+                line = line[:-1]
+            found = self.matches(line)
+            if found:
+                yield number, found
+
+    def __repr__(self):
+        return f"regexset.RegexSet({len(self.patterns)} patterns)"
+
+
+def compile(patterns, flags=0):
+    """Compile patterns (each a pattern, a (pattern, flags) pair or a compiled pattern) into a RegexSet"""
+    return RegexSet(patterns, flags)
@@ -0,0 +1,105 @@
+"""Access to the parse tree that re.DEBUG prints"""
+# The re module turns a regex into a tree of (opcode, argument) pairs before compiling it.
+# flags.py shows that tree with re.DEBUG, the helpers here hand it to Python code instead.
+# The parser moved to re._parser in Python 3.11 (and the compiler to re._compiler), older versions
+# ship them as sre_parse and sre_compile.
+import _sre
+import copyreg
+
+try:
+    from re import _compiler as sre_compile
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_compile
+    import sre_constants
+    import sre_parse
+
+try:
+    from re._casefix import _EXTRA_CASES as IGNORECASE_FIXES
+except ImportError:  # Python < 3.11
+    IGNORECASE_FIXES = sre_compile._ignorecase_fixes
+
+# Re-export the opcode names (LITERAL, BRANCH, MAX_REPEAT, AT_BOUNDARY, CATEGORY_DIGIT, ...) and MAXREPEAT
+globals().update(
+    (name, value) for name, value in vars(sre_constants).items() if name.isupper()
+)
+
+
+def _constant(name):
+    return getattr(sre_constants, name)
+
+
+def _reduce_constant(constant):
+    return _constant, (constant.name,)
+
+
+# The opcode constants refuse to be pickled, which would make parse trees and everything built from them
+# (the programs of nfa.py, see diskcache.py) unpicklable. They are pickled by name instead.
+copyreg.pickle(sre_constants._NamedIntConstant, _reduce_constant)
+
+# IGNORECASE_FIXES: {lower case: (other lower cases)} of the characters IGNORECASE treats as the same although
+# their lower cases differ, like s and the long s (ſ) or the two Greek sigmas. re adds them to the characters
+# a literal or class matches, the NFA engine does the same (see nfa._case_variants()).
+
+
+def parse(pattern, flags=0):
+    """Return the parsed form of pattern: a SubPattern, which behaves like a list of (opcode, argument)"""
+    return sre_parse.parse(pattern, flags)
+
+
+def width(parsed, items=None):
+    """(min, max) number of characters matched by parsed, or by items (a list of its nodes); max is None if unbounded"""
+    if items is not None:
+        parsed = sre_parse.SubPattern(parsed.state, list(items))
+    lo, hi = parsed.getwidth()
+    return lo, (None if hi >= MAXREPEAT else hi)
+
+
+def expand(template, match):
+    """template with its group references (\\1, \\g<name>, ...) replaced by the groups of match, like Match.expand()
+
+    match only needs .re (with groups and groupindex), .string and .group(), so the match objects of other
+    engines (nfa.py) can expand templates without re matching again.
+    """
+    parsed = sre_parse.parse_template(template, match.re)
+    if isinstance(parsed, tuple):  # Python < 3.12: (groups, literals)
+        return sre_parse.expand_template(parsed, match)
+    # Literals alternate with group indexes
+    empty = match.string[:0]
+    return empty.join(
+        item if isinstance(item, (str, bytes)) else match.group(item) or empty
+        for item in parsed
+    )
+
+
+def sre_code(parsed):
+    """What _sre.compile() builds an re.Pattern from, besides the pattern text
+
+    A tuple (flags, code, groups, groupindex, indexgroup) of ints, lists, dicts and tuples, so it can be
+    pickled and turned into an re.Pattern again later by from_sre_code() (see diskcache.py).
+    """
+    code = sre_compile._code(parsed, parsed.state.flags)
+    indexgroup = [None] * parsed.state.groups
+    for name, index in parsed.state.groupdict.items():
+        indexgroup[index] = name
+    return (
+        parsed.state.flags,
+        code,
+        parsed.state.groups - 1,
+        dict(parsed.state.groupdict),
+        tuple(indexgroup),
+    )
+
+
+def from_sre_code(pattern, code):
+    """The re.Pattern for pattern with the sre_code() computed earlier, nothing is parsed or compiled"""
+    return _sre.compile(pattern, *code)
+
+
+def compile_tree(parsed, pattern):
+    """Compile a parse tree into an re.Pattern, pattern is the text its .pattern attribute shows
+
+    This is what re.compile() does after parsing, for trees built or rewritten in Python (see rewriter.py).
+    """
+    return from_sre_code(pattern, sre_code(parsed))
@@ -0,0 +1,227 @@
+"""Applying many re.sub() rules in a single pass over the text"""
+import io
+import re
+
+import reparse
+import streaming
+
+# functions.py lists re.sub() and re.subn(). Applying a list of rewrite rules one after the other,
+#     for pattern, replacement in rules: text = recache.sub(pattern, replacement, text)
+# walks over the whole text and copies all of it once per rule. A Rewriter combines the rules into one regex,
+# rule_1|rule_2|...|rule_n, and walks over the text once, writing to a single output buffer:
+#   - at every position the rules are tried in order, the first one that matches is applied
+#     (the same leftmost-first choice an alternation makes, see metacharacters.py)
+#   - replaced text is not looked at again, so one rule never rewrites the output of another.
+#     That is the difference from applying the rules one after the other.
+#   - replacements are what re.sub() accepts: a template with \1, \g<1> or \g<name> referring to the groups of
+#     the rule's own pattern, or a function that gets the match object of the rule's own pattern
+#   - backreferences inside the patterns, \1 or (?P=name), keep working: the combined regex is built from the
+#     parse trees of the rules (see reparse.py) with every group renumbered, not by pasting the patterns together
+# iter_sub() and sub_file() do the same over files too big for memory, with the chunking of streaming.py.
+
+# Opcodes whose argument holds a group number or nested nodes
+_REPEATS = (reparse.MAX_REPEAT, reparse.MIN_REPEAT, reparse.POSSESSIVE_REPEAT)
+
+
+class Rule:
+    """One pattern with its replacement and the regex compiled from it"""
+
+    def __init__(self, pattern, replacement, flags=0):
+        if isinstance(pattern, re.Pattern):
+            pattern, flags = pattern.pattern, pattern.flags
+        self.pattern = pattern
+        self.replacement = replacement
+        self.flags = flags
+        self.regex = re.compile(pattern, flags)
+        # A template without a backslash is copied as is, no match object needed
+        backslash = b"\\" if isinstance(pattern, bytes) else "\\"
+        self.literal = (
+            None if callable(replacement) or backslash in replacement else replacement
+        )
+
+    def __repr__(self):
+        return f"Rule({self.pattern!r}, {self.replacement!r}, {self.flags!r})"
+
+
+def _renumber(items, state, offset):
+    """Copy of the nodes in items with every group number moved up by offset, on the combined state"""
+    result = []
+    for op, av in items:
+        if op is reparse.SUBPATTERN:
+            group, add_flags, del_flags, sub = av
+            av = (
+                group + offset if group else group,
+                add_flags,
+                del_flags,
+                _renumber(sub, state, offset),
+            )
+        elif op is reparse.GROUPREF:
+            av = av + offset
+        elif op is reparse.GROUPREF_EXISTS:
+            group, yes, no = av
+            av = (
+                group + offset,
+                _renumber(yes, state, offset),
+                no if no is None else _renumber(no, state, offset),
+            )
+        elif op is reparse.BRANCH:
+            av = (av[0], [_renumber(sub, state, offset) for sub in av[1]])
+        elif op in _REPEATS:
+            av = (av[0], av[1], _renumber(av[2], state, offset))
+        elif op in (reparse.ASSERT, reparse.ASSERT_NOT):
+            av = (av[0], _renumber(av[1], state, offset))
+        elif op is reparse.ATOMIC_GROUP:
+            av = _renumber(av, state, offset)
+        result.append((op, av))
+    return reparse.sre_parse.SubPattern(state, result)
+
+
+def combine(rules, names=None):
+    """One re.Pattern matching rule_1|rule_2|...; rule i matched when lastindex is the group combine returns for it
+
+    Returns (regex, groups) where groups[i] is the number of the group wrapping the pattern of rules[i].
+    With names, the group wrapping rules[i] is named names[i] and lastgroup tells the rules apart too.
+    """
+    state = reparse.sre_parse.State()
+    is_bytes = isinstance(rules[0].pattern, bytes)
+    state.flags = 0 if is_bytes else re.UNICODE
+    alternatives, groups = [], []
+    for i, rule in enumerate(rules):
+        parsed = reparse.parse(rule.pattern, rule.flags)
+        group = state.opengroup(None if names is None else names[i])
+        # The rule's groups follow the group wrapping it, their widths are needed for lookbehinds
+        state.groupwidths.extend(parsed.state.groupwidths[1:])
+        body = _renumber(parsed, state, group)
+        state.closegroup(group, body)
+        # The rule's flags only apply to its own alternative, like (?i:...) would
+        flags = parsed.state.flags & ~(re.VERBOSE | re.DEBUG)
+        alternatives.append(
+            reparse.sre_parse.SubPattern(
+                state, [(reparse.SUBPATTERN, (group, flags, 0, body))]
+            )
+        )
+        groups.append(group)
+    if len(alternatives) == 1:
+        tree = alternatives[0]
+    else:
+        tree = reparse.sre_parse.SubPattern(
+            state, [(reparse.BRANCH, (None, alternatives))]
+        )
+    separator = b"|" if is_bytes else "|"
+    return reparse.compile_tree(tree, separator.join(r.pattern for r in rules)), groups
+
+
+class Rewriter:
+    """Ordered (pattern, replacement[, flags]) rules applied together in one left to right pass"""
+
+    def __init__(self, rules, flags=0):
+        self.rules = [
+            rule
+            if isinstance(rule, Rule)
+            else Rule(*rule)
+            if len(rule) == 3
+            else Rule(*rule, flags)
+            for rule in rules
+        ]
+        if not self.rules:
+            raise ValueError("a Rewriter needs at least one rule")
+        if len({isinstance(rule.pattern, bytes) for rule in self.rules}) > 1:
+            raise TypeError("cannot mix str and bytes patterns in a Rewriter")
+        self.regex, groups = combine(self.rules)
+        self._rule_of_group = {group: rule for group, rule in zip(groups, self.rules)}
+
+    def _replacement(self, m, string):
+        rule = self._rule_of_group[m.lastindex]
+        if rule.literal is not None:
+            return rule.literal
+        # The rule's own pattern matches the same text at the same place, with the rule's group numbers
+        own = rule.regex.match(string, m.start())
+        if callable(rule.replacement):
+            return rule.replacement(own)
+        return own.expand(rule.replacement)
+
+    def subn(self, string, count=0):
+        """Return (new string, number of replacements made), like re.subn()"""
+        if isinstance(string, str):
+            out = io.StringIO()
+            write = out.write
+        else:
+            out = bytearray()
+            write = out.extend
+        last = replaced = 0
+        for m in self.regex.finditer(string):
+            write(string[last : m.start()])
+            write(self._replacement(m, string))
+            last = m.end()
+            replaced += 1
+            if replaced == count:
+                break
+        write(string[last:])
+        return (
+            out.getvalue() if isinstance(out, io.StringIO) else bytes(out)
+        ), replaced
+
+    def sub(self, string, count=0):
+        """Return string with the rules applied, like re.sub()"""
+        return self.subn(string, count)[0]
+
+    def iter_sub(
+        self,
+        source,
+        count=0,
+        chunk_size=streaming.DEFAULT_CHUNK_SIZE,
+        overlap=streaming.DEFAULT_OVERLAP,
+    ):
+        """Yield the rewritten text of source (a str/bytes object, file object or iterable of chunks) piece by piece
+
+        Matches, including what their lookarounds look at, must not be longer than overlap (see streaming.py).
+        """
+        scanner = streaming.StreamScanner(self.regex, overlap=overlap)
+        chunks = streaming.chunks(source, chunk_size)
+        # Text before offset written has been written out, the current stretch of text starts at start
+        start = written = replaced = 0
+        for buffer, base, item in streaming.events(scanner, chunks):
+            if isinstance(item, int):
+                if base + item > written:
+                    yield buffer[max(start, written) - base : item]
+                    written = base + item
+                continue
+            yield buffer[max(start, written) - base : item.start()]
+            yield self._replacement(item, buffer)
+            start = base + item.end()
+            written = max(written, start)
+            replaced += 1
+            if replaced == count:
+                # No more replacements: the rest is copied, not searched
+                yield buffer[start - base :]
+                yield from chunks
+                return
+
+    def sub_file(
+        self,
+        source,
+        destination,
+        count=0,
+        chunk_size=streaming.DEFAULT_CHUNK_SIZE,
+        overlap=streaming.DEFAULT_OVERLAP,
+    ):
+        """Write the rewritten text of source to the file object destination"""
+        for piece in self.iter_sub(source, count, chunk_size, overlap):
+            if piece:
+                destination.write(piece)
+
+    def __repr__(self):
+        return f"rewriter.Rewriter({len(self.rules)} rules)"
+
+
+def compile(rules, flags=0):
+    """Build a Rewriter from (pattern, replacement) or (pattern, replacement, flags) rules"""
+    return Rewriter(rules, flags)
+
+
+def sub(rules, string, count=0, flags=0):
+    return Rewriter(rules, flags).sub(string, count)
+
+
+def subn(rules, string, count=0, flags=0):
+    return Rewriter(rules, flags).subn(string, count)
@@ -0,0 +1,155 @@
+"""Splitting a document into tokens with one regex made of ordered, named rules"""
+import re
+
+import reparse
+import rewriter
+import streaming
+
+# metacharacters.py names groups with (?P<name>...) and picks between patterns with alternation (|).
+# Together they make a tokenizer, the first step of parsing documents like the KPLC PDFs of README.md:
+#     (?P<DATE>\d{2}/\d{2}/\d{4})|(?P<NUMBER>\d+(?:\.\d+)?)|(?P<WORD>[A-Za-z]+)|...
+#   - every rule becomes a named group of one master pattern, so each position is looked at by one regex.
+#     Trying the rules one by one at every position runs as many searches as there are rules.
+#   - at every position the rules are tried in the order they are given, the first one that matches wins
+#     (put DATE before NUMBER), and m.lastgroup is the name of the rule that matched: no second lookup
+#   - the master pattern is built from the parse trees of the rules (rewriter.combine()), so the rules can
+#     have groups and backreferences of their own
+#   - tokens are compact (kind, start, end) tuples with absolute offsets, the kind being the rule's name.
+#     Tokens of the rules in skip (whitespace, comments) aren't yielded at all.
+#   - text that no rule matches comes out as one ERROR token per stretch, scanning carries on after it
+#   - the input is read in chunks through streaming.StreamScanner: a file of hundreds of MB is tokenized
+#     without being read into memory. Like there, a token must not be longer than overlap.
+# A rule must not match the empty string, it would produce a token at every position without moving on.
+
+ERROR = "ERROR"
+
+
+class Rule:
+    """A token kind with its pattern"""
+
+    def __init__(self, kind, pattern, flags=0):
+        if isinstance(pattern, re.Pattern):
+            pattern, flags = pattern.pattern, pattern.flags
+        if not kind.isidentifier() or kind == ERROR:
+            raise ValueError(f"{kind!r} can't be the kind of a token")
+        if reparse.width(reparse.parse(pattern, flags))[0] == 0:
+            raise ValueError(f"the {kind} rule can match the empty string")
+        self.kind = kind
+        self.pattern = pattern
+        self.flags = flags
+
+    def __repr__(self):
+        return f"Rule({self.kind!r}, {self.pattern!r}, {self.flags!r})"
+
+
+class Scanner:
+    """Ordered (kind, pattern[, flags]) rules compiled into one master pattern"""
+
+    def __init__(self, rules, flags=0, skip=()):
+        self.rules = [
+            rule
+            if isinstance(rule, Rule)
+            else Rule(*rule)
+            if len(rule) == 3
+            else Rule(*rule, flags)
+            for rule in rules
+        ]
+        if not self.rules:
+            raise ValueError("a Scanner needs at least one rule")
+        if len({isinstance(rule.pattern, bytes) for rule in self.rules}) > 1:
+            raise TypeError("cannot mix str and bytes patterns in a Scanner")
+        kinds = [rule.kind for rule in self.rules]
+        if len(set(kinds)) < len(kinds):
+            raise ValueError("every rule needs a kind of its own")
+        self.skip = frozenset(skip)
+        if not self.skip <= set(kinds):
+            raise ValueError(
+                f"skip names kinds without a rule: {self.skip - set(kinds)}"
+            )
+        self.regex, _ = rewriter.combine(self.rules, kinds)
+
+    def tokens(
+        self,
+        source,
+        text=False,
+        chunk_size=streaming.DEFAULT_CHUNK_SIZE,
+        overlap=streaming.DEFAULT_OVERLAP,
+    ):
+        """Yield (kind, start, end) for every token of source (a str/bytes object, file object or iterable of chunks)
+
+        With text=True the tokens are (kind, start, end, text).
+        """
+        scanner = streaming.StreamScanner(self.regex, overlap=overlap)
+        chunks = streaming.chunks(source, chunk_size)
+        skip = self.skip
+        empty = self.regex.pattern[:0]
+        # The text from offset last on isn't part of a token yet. With text=True what the scanner let go of is
+        # copied into gap, up to offset released.
+        last = released = length = 0
+        gap = []
+        for buffer, base, item in streaming.events(scanner, chunks):
+            if isinstance(item, int):
+                length = base + item
+                if text and length > max(last, released):
+                    gap.append(buffer[max(last, released) - base : item])
+                    released = length
+                continue
+            start, end = item.span()
+            start += base
+            if start > last:
+                if text:
+                    gap.append(buffer[max(last, released) - base : start - base])
+                    yield ERROR, last, start, empty.join(gap)
+                    gap = []
+                else:
+                    yield ERROR, last, start
+            last = end + base
+            kind = item.lastgroup
+            if kind not in skip:
+                if text:
+                    yield kind, start, last, item.group()
+                else:
+                    yield kind, start, last
+        if length > last:
+            if text:
+                yield ERROR, last, length, empty.join(gap)
+            else:
+                yield ERROR, last, length
+
+    def tokenize(self, string, pos=0, endpos=None):
+        """Yield (kind, start, end) for the tokens of string in memory, without the chunking of tokens()"""
+        if endpos is None:
+            endpos = len(string)
+        skip = self.skip
+        last = pos
+        for m in self.regex.finditer(string, pos, endpos):
+            start, end = m.span()
+            if start > last:
+                yield ERROR, last, start
+            last = end
+            kind = m.lastgroup
+            if kind not in skip:
+                yield kind, start, end
+        if endpos > last:
+            yield ERROR, last, endpos
+
+    def __repr__(self):
+        return f"scanner.Scanner({len(self.rules)} rules)"
+
+
+def compile(rules, flags=0, skip=()):
+    """Build a Scanner from (kind, pattern) or (kind, pattern, flags) rules"""
+    return Scanner(rules, flags, skip)
+
+
+def tokens(
+    rules,
+    source,
+    flags=0,
+    skip=(),
+    chunk_size=streaming.DEFAULT_CHUNK_SIZE,
+    overlap=streaming.DEFAULT_OVERLAP,
+):
+    return Scanner(rules, flags, skip).tokens(
+        source, chunk_size=chunk_size, overlap=overlap
+    )
@@ -0,0 +1,169 @@
+"""Regex searches over input that doesn't fit in memory"""
+import recache
+
+# recache.finditer(<regex>, <string>) needs the whole <string> in memory.
+# The functions here read the input in chunks instead: a file object (text or binary), an mmap.mmap
+# or any iterable of str/bytes chunks, and only ever hold one chunk plus a small window around it.
+#
+# A match can straddle two chunks, so the last <overlap> characters of every chunk are searched again
+# together with the next chunk, and a match that ends inside that window is only reported once
+# the following chunk confirms it can't grow any further (r"foo.*bar" can, r"\bfoo\b" needs the next character).
+# <overlap> characters are also kept in front of the search position, which is what lookbehinds and \b look at.
+# The results are exactly those of re.finditer() on the whole input as long as no match, including what its
+# lookahead and lookbehind assertions inspect, is longer than <overlap>.
+# tests/test_streaming.py compares chunked and unchunked results.
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_OVERLAP = 4096
+
+
+def chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Iterate over source in pieces: a str/bytes object, anything with a read() method, or an iterable of pieces"""
+    if isinstance(source, (str, bytes, bytearray, memoryview)):
+        for start in range(0, len(source), chunk_size):
+            yield source[start : start + chunk_size]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+class StreamScanner:
+    """Incremental regex search, fed one chunk at a time
+
+    Each chunk must be fed after the events of the previous one have been consumed.
+    feed() and finish() yield events (buffer, base, item) where base is the absolute offset of buffer[0]:
+      - item is an re.Match on buffer for every match, in order. Its absolute span is base + match.span().
+      - item is an int n when buffer[:n] won't be searched again: the text up to absolute offset base + n
+        is final, which lets callers that also need the text between matches (split, sub) release it.
+    """
+
+    def __init__(self, pattern, flags=0, overlap=DEFAULT_OVERLAP):
+        if overlap < 1:
+            raise ValueError("overlap must be at least 1")
+        self.regex = recache.compile(pattern, flags)
+        self.overlap = overlap
+        self._buffer = self.regex.pattern[:0]
+        self._base = 0
+        self._pos = 0
+        self._empty_at = -1
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        return self._scan(final=False)
+
+    def finish(self):
+        return self._scan(final=True)
+
+    def _scan(self, final):
+        buffer, base, pos = self._buffer, self._base, self._pos
+        limit = len(buffer) if final else len(buffer) - self.overlap
+        resume = None
+        for m in self.regex.finditer(buffer, pos):
+            if m.start() == m.end() == self._empty_at - base:
+                # Already reported before the buffer was cut, re.finditer() never reports it twice
+                continue
+            if m.end() > limit and m.start() >= limit - self.overlap:
+                # The match touches the end of what we have read so far and could still change.
+                # Positions from limit on may only have failed for lack of text, they are searched again too.
+                resume = max(pos, min(m.start(), limit))
+                break
+            yield buffer, base, m
+            if m.start() == m.end():
+                self._empty_at = base + m.end()
+            pos = m.end()
+        if final:
+            yield buffer, base, len(buffer)
+            self._buffer, self._base, self._pos = buffer[:0], base + len(buffer), 0
+            return
+        if resume is None:
+            resume = max(pos, limit)
+        yield buffer, base, resume
+        # Keep <overlap> characters of context in front of the next search position
+        keep = max(0, resume - self.overlap)
+        self._buffer, self._base, self._pos = buffer[keep:], base + keep, resume - keep
+
+
+def events(scanner, chunks):
+    """Feed every chunk of the iterator chunks to scanner, then finish it, yielding all the events"""
+    for chunk in chunks:
+        yield from scanner.feed(chunk)
+    yield from scanner.finish()
+
+
+class StreamMatch:
+    """re.Match lookalike whose positions are offsets into the whole stream"""
+
+    __slots__ = ("match", "base")
+
+    def __init__(self, match, base):
+        self.match = match
+        self.base = base
+
+    @property
+    def re(self):
+        return self.match.re
+
+    @property
+    def lastindex(self):
+        return self.match.lastindex
+
+    @property
+    def lastgroup(self):
+        return self.match.lastgroup
+
+    def group(self, *groups):
+        return self.match.group(*groups)
+
+    def __getitem__(self, group):
+        return self.match[group]
+
+    def groups(self, default=None):
+        return self.match.groups(default)
+
+    def groupdict(self, default=None):
+        return self.match.groupdict(default)
+
+    def expand(self, template):
+        return self.match.expand(template)
+
+    def start(self, group=0):
+        start = self.match.start(group)
+        return start if start == -1 else start + self.base
+
+    def end(self, group=0):
+        end = self.match.end(group)
+        return end if end == -1 else end + self.base
+
+    def span(self, group=0):
+        return self.start(group), self.end(group)
+
+    def __repr__(self):
+        return f"<streaming.StreamMatch object; span={self.span()!r}, match={self.group()!r}>"
+
+
+def finditer(
+    pattern, source, flags=0, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP
+):
+    """Like re.finditer() but over a file, mmap or iterable of chunks, with positions relative to the whole input"""
+    scanner = StreamScanner(pattern, flags, overlap)
+    for chunk in chunks(source, chunk_size):
+        for _, base, m in scanner.feed(chunk):
+            if not isinstance(m, int):
+                yield StreamMatch(m, base)
+    for _, base, m in scanner.finish():
+        if not isinstance(m, int):
+            yield StreamMatch(m, base)
+
+
+def search(
+    pattern, source, flags=0, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP
+):
+    """Return the first StreamMatch in source, reading no further than needed, or None"""
+    return next(finditer(pattern, source, flags, chunk_size, overlap), None)
@@ -0,0 +1,46 @@
+"""Shared setup of the tests"""
+import os
+import random
+import re
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Small alphabets make the random patterns and strings run into each other often:
+# empty alternatives, nested repeats and lazy quantifiers are where engines disagree with re
+ATOMS = ("a", "b", ".", "[ab]", "", "x")
+QUANTIFIERS = ("*", "+", "?", "*?", "+?", "??", "{0,2}", "{1,2}?", "{2}")
+
+
+def _pattern(rng, atoms, depth=0):
+    r = rng.random()
+    if depth > 2 or r < 0.35:
+        return rng.choice(atoms)
+    if r < 0.55:
+        return f"({_pattern(rng, atoms, depth + 1)}|{_pattern(rng, atoms, depth + 1)})"
+    if r < 0.75:
+        return f"({_pattern(rng, atoms, depth + 1)}){rng.choice(QUANTIFIERS)}"
+    return _pattern(rng, atoms, depth + 1) + _pattern(rng, atoms, depth + 1)
+
+
+@pytest.fixture
+def random_cases():
+    """random_cases(count, seed, atoms=ATOMS, alphabet="abx") yields (pattern, string) pairs re accepts"""
+
+    def cases(count, seed, atoms=ATOMS, alphabet="abx", max_length=6):
+        rng = random.Random(seed)
+        produced = 0
+        while produced < count:
+            pattern = _pattern(rng, atoms)
+            try:
+                re.compile(pattern)
+            except re.error:
+                continue
+            length = rng.randint(0, max_length)
+            yield pattern, "".join(rng.choice(alphabet) for _ in range(length))
+            produced += 1
+
+    return cases
@@ -0,0 +1,73 @@
+import random
+import re
+
+import pytest
+
+import dfa
+import nfa
+
+PHONE = r"^(\(\d{3}\))?\s?\d{3}[-.]\d{4}$"
+# The anchors the DFA supports, next to the atoms of conftest.py
+ATOMS = ("a", "b", ".", "[ab]", "", "x", "^", "$", r"\A", r"\Z")
+
+
+def test_fullmatch_bool_matches_re(random_cases):
+    for pattern, string in random_cases(3000, seed=3, atoms=ATOMS):
+        validator = dfa.compile(pattern, engine="dfa")
+        assert validator.fullmatch_bool(string) == (
+            re.fullmatch(pattern, string) is not None
+        ), (pattern, string)
+
+
+def test_pos_and_endpos_match_re():
+    regex = re.compile(r"^a+b?$")
+    validator = dfa.compile(regex.pattern, engine="dfa")
+    string = "xaab\n"
+    for pos in range(len(string) + 1):
+        for endpos in range(len(string) + 1):
+            assert validator.fullmatch_bool(string, pos, endpos) == (
+                regex.fullmatch(string, pos, endpos) is not None
+            ), (pos, endpos)
+
+
+def test_small_cache_flushes_and_stays_correct():
+    pattern = r"(a|b)*a(a|b){6}"
+    validator = dfa.compile(pattern, max_states=8, engine="dfa")
+    rng = random.Random(5)
+    for _ in range(300):
+        string = "".join(rng.choice("ab") for _ in range(rng.randint(0, 20)))
+        assert validator.fullmatch_bool(string) == (
+            re.fullmatch(pattern, string) is not None
+        )
+    assert validator.stats()["flushes"] > 0
+
+
+def test_table_restores_the_states():
+    pattern = r"(a|b)*a(a|b){3}"
+    program = nfa.compile_program(pattern)
+    automaton = dfa.LazyDFA(program)
+    strings = ["abab", "aaaa", "bbbabbb", "ab" * 10, ""]
+    for string in strings:
+        automaton.fullmatch(string)
+    restored = dfa.LazyDFA(program, table=automaton.table())
+    for string in strings:
+        assert restored.fullmatch(string) == automaton.fullmatch(string)
+    assert restored.stats()["states_built"] == 0
+
+
+@pytest.mark.parametrize(
+    "pattern, engine",
+    [
+        (PHONE, "re"),
+        (r"(a|aa)*b", "dfa"),
+        (r"(a+)+$", "dfa"),
+        (r"(\w+)\s\1", "re"),  # the DFA can't run backreferences
+    ],
+)
+def test_auto_uses_the_dfa_only_for_exponential_patterns(pattern, engine):
+    assert repr(dfa.compile(pattern)).endswith(f"[{engine}]")
+
+
+def test_engine_is_checked():
+    with pytest.raises(ValueError):
+        dfa.compile("a", engine="nfa")
@@ -0,0 +1,90 @@
+import multiprocessing
+import re
+
+import pytest
+
+import diskcache
+import multiliteral
+import nfa
+
+PHONE = r"""(?x)
+    ^(\(\d{3}\))?   # area code
+    \s?\d{3}[-.]\d{4}$
+"""
+
+
+def test_compile_round_trip(tmp_path):
+    with diskcache.DiskCache(tmp_path) as cache:
+        regex = cache.compile(PHONE)
+        assert cache.stats()["misses"] == 1
+    cache = diskcache.DiskCache(tmp_path)
+    loaded = cache.compile(PHONE)
+    assert cache.stats()["hits"] == 1
+    assert loaded.pattern == regex.pattern and loaded.flags == regex.flags
+    for string in ["(555) 123-4567", "555.1234", "555-12345", ""]:
+        assert (loaded.search(string) is None) == (re.search(PHONE, string) is None)
+
+
+def test_program_and_unsupported(tmp_path):
+    with diskcache.DiskCache(tmp_path) as cache:
+        cache.program(r"(a|b)*c")
+        with pytest.raises(nfa.Unsupported):
+            cache.program(r"(a)\1")
+    cache = diskcache.DiskCache(tmp_path)
+    assert cache.nfa(r"(a|b)*c").search("xxababc").span() == (2, 7)
+    with pytest.raises(nfa.Unsupported):
+        cache.program(r"(a)\1")
+    assert cache.stats()["misses"] == 0
+
+
+def test_validator_keeps_the_dfa_states(tmp_path):
+    with diskcache.DiskCache(tmp_path) as cache:
+        validator = cache.validator(r"(a|aa)*b")
+        assert validator.fullmatch_bool("aaab")
+        built = validator.stats()["states"]
+    validator = diskcache.DiskCache(tmp_path).validator(r"(a|aa)*b")
+    assert validator.stats()["states"] == built
+    assert validator.stats()["states_built"] == 0
+    assert validator.fullmatch_bool("aaab") and not validator.fullmatch_bool("aaa")
+    assert validator.stats()["misses"] == 0
+
+
+def test_multiliteral_keeps_the_automaton(tmp_path):
+    pattern = "|".join(f"w{i}x" for i in range(200))
+    with diskcache.DiskCache(tmp_path) as cache:
+        cache.multiliteral(pattern)
+        assert isinstance(cache.multiliteral("a|b"), re.Pattern)
+    cache = diskcache.DiskCache(tmp_path)
+    compiled = cache.multiliteral(pattern)
+    assert isinstance(compiled, multiliteral.LiteralAlternation)
+    assert compiled.search("..w17x").span() == (2, 6)
+    assert cache.stats()["misses"] == 0
+
+
+def _save_patterns(directory, worker):
+    for i in range(20):
+        cache = diskcache.DiskCache(directory)
+        cache.compile(f"p{worker}_{i}")
+        cache.save()
+        cache.close()
+
+
+def test_concurrent_saves_keep_every_entry(tmp_path):
+    workers = [
+        multiprocessing.Process(target=_save_patterns, args=(str(tmp_path), worker))
+        for worker in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    assert len(diskcache.DiskCache(tmp_path)) == 80
+
+
+def test_unusable_file_is_replaced(tmp_path):
+    (tmp_path / "patterns.cache").write_bytes(b"not a cache")
+    with diskcache.DiskCache(tmp_path) as cache:
+        assert len(cache) == 0
+        cache.compile("a+")
+    assert len(diskcache.DiskCache(tmp_path)) == 1
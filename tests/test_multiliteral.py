@@ -0,0 +1,48 @@
+import random
+import re
+
+import multiliteral
+
+
+def _words(count, seed):
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice("abcd") for _ in range(rng.randint(1, 5)))
+        for _ in range(count)
+    ]
+
+
+def test_finditer_matches_re():
+    rng = random.Random(1)
+    for seed in range(20):
+        words = _words(multiliteral.MIN_ALTERNATIVES + 20, seed)
+        pattern = "|".join(words)
+        compiled = multiliteral.compile(pattern)
+        assert isinstance(compiled, multiliteral.LiteralAlternation)
+        for _ in range(20):
+            string = "".join(rng.choice("abcdx") for _ in range(40))
+            assert [m.span() for m in compiled.finditer(string)] == [
+                m.span() for m in re.finditer(pattern, string)
+            ], string
+            expected = re.match(pattern, string)
+            found = compiled.match(string)
+            assert (found and found.span()) == (expected and expected.span())
+
+
+def test_leftmost_first_like_re():
+    words = ["foo", "foograull", "graull"] + [f"w{i}x" for i in range(200)]
+    compiled = multiliteral.compile("|".join(words))
+    assert compiled.search("foograull").group() == "foo"
+    assert compiled.findall("xfoograull graull") == ["foo", "graull", "graull"]
+
+
+def test_bytes():
+    words = [f"w{i}x".encode() for i in range(200)]
+    compiled = multiliteral.compile(b"|".join(words))
+    assert [m.span() for m in compiled.finditer(b"..w17x w199x")] == [(2, 6), (7, 12)]
+
+
+def test_small_and_non_literal_alternations_use_re():
+    assert multiliteral.automaton("foo|bar") is None
+    assert multiliteral.automaton("|".join(f"w{i}+" for i in range(200))) is None
+    assert isinstance(multiliteral.compile("foo|bar"), re.Pattern)
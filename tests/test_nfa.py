@@ -0,0 +1,89 @@
+import mmap
+import re
+
+import pytest
+
+import nfa
+
+
+def _found(regex, string):
+    return [(m.span(), m.groups()) for m in regex.finditer(string)]
+
+
+def test_finditer_matches_re(random_cases):
+    for pattern, string in random_cases(3000, seed=21):
+        assert _found(nfa.compile(pattern), string) == _found(
+            re.compile(pattern), string
+        ), (pattern, string)
+
+
+@pytest.mark.parametrize("method", ["search", "match", "fullmatch"])
+def test_methods_match_re(random_cases, method):
+    for pattern, string in random_cases(1000, seed=7):
+        expected = getattr(re.compile(pattern), method)(string)
+        found = getattr(nfa.compile(pattern), method)(string)
+        assert (found and found.span()) == (expected and expected.span()), (
+            pattern,
+            string,
+        )
+
+
+@pytest.mark.parametrize(
+    "pattern, string",
+    [
+        (r"(a|ab)(c|bcd)(d*)", "abcd"),
+        (r"(a*)*b", "aaab"),
+        (r"(a*)+", "b"),
+        (r"(?:a|())*?b", "aab"),
+        (r"(?P<word>\w+)\s(?P<other>x)?", "foo foo"),
+    ],
+)
+def test_groups(pattern, string):
+    assert _found(nfa.compile(pattern), string) == _found(re.compile(pattern), string)
+
+
+def test_sub_matches_re():
+    for pattern, string in [(r"a|b*", "abcbba"), (r"(\d+)-(\d+)", "1-2 33-44")]:
+        assert nfa.compile(pattern).sub(r"<\g<0>>", string) == re.sub(
+            pattern, r"<\g<0>>", string
+        )
+
+
+@pytest.mark.parametrize(
+    "pattern", ["(?i)s", "(?i)k", "(?i)i", "(?i)ı", "(?i)σ", "(?i)µ", "(?i)[a-z]"]
+)
+def test_ignorecase_folds_like_re(pattern):
+    for character in "sSſkKKiIİıσςΣµμΜ":
+        assert (nfa.compile(pattern).fullmatch(character) is None) == (
+            re.fullmatch(pattern, character) is None
+        ), character
+
+
+def test_bytes_pattern_uses_ascii_rules_on_any_buffer(tmp_path):
+    data = "é a\xe9b".encode("latin-1")
+    path = tmp_path / "data"
+    path.write_bytes(data)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        for pattern in [rb"\b", rb"\w+", rb"\Ba"]:
+            expected = [match.span() for match in re.finditer(pattern, data)]
+            for buffer in (data, m, memoryview(data), bytearray(data)):
+                found = [
+                    match.span() for match in nfa.compile(pattern).finditer(buffer)
+                ]
+                assert found == expected, (pattern, type(buffer))
+
+
+def test_linear_time_on_catastrophic_pattern():
+    assert nfa.compile(r"(a+)+$").search("a" * 5000 + "b") is None
+
+
+def test_step_budget():
+    regex = nfa.compile(r"(a|aa)*c", max_steps=1000)
+    with pytest.raises(nfa.MatchBudgetExceeded):
+        regex.search("a" * 10000)
+
+
+@pytest.mark.parametrize("pattern", [r"(a)\1", r"(?=a)", r"(?<=a)b", r"(?>a)"])
+def test_unsupported(pattern):
+    with pytest.raises(nfa.Unsupported):
+        nfa.compile(pattern)
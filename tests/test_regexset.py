@@ -0,0 +1,64 @@
+import random
+import re
+
+import pytest
+
+import regexset
+
+
+def _expected(patterns, string):
+    """The indices re.search() finds for patterns, each a pattern or a (pattern, flags) pair"""
+    entries = [entry if isinstance(entry, tuple) else (entry, 0) for entry in patterns]
+    return {
+        index
+        for index, (pattern, flags) in enumerate(entries)
+        if re.search(pattern, string, flags) is not None
+    }
+
+
+def test_matches_agrees_with_re(random_cases):
+    cases = list(random_cases(2000, seed=11, max_length=10))
+    rng = random.Random(11)
+    for _ in range(200):
+        patterns = [pattern for pattern, _ in rng.sample(cases, rng.randint(1, 12))]
+        compiled = regexset.compile(patterns)
+        for _, string in rng.sample(cases, 10):
+            expected = _expected(patterns, string)
+            assert compiled.matches(string) == expected, (patterns, string)
+            assert compiled.is_match(string) == bool(expected)
+
+
+def test_literals_flags_and_anchors():
+    patterns = [
+        r"error \d+",
+        (r"WARNING", re.IGNORECASE),
+        r"^start",
+        r"end$",
+        r"\bword\b",
+        r"(a|aa)*b",
+        r"x(?=y)",  # not runnable on the NFA, confirmed with re
+    ]
+    compiled = regexset.compile(patterns)
+    strings = [
+        "error 42",
+        "a warning here",
+        "start and end",
+        "no start",
+        "swordfish",
+        "a word",
+        "aaaab",
+        "xy",
+        "",
+    ]
+    for string in strings:
+        assert compiled.matches(string) == _expected(patterns, string), string
+
+
+def test_iter_matches_strips_newlines():
+    compiled = regexset.compile([r"b$", r"^a"])
+    assert list(compiled.iter_matches(["ab\n", "c\n", "a"])) == [(0, {0, 1}), (2, {1})]
+
+
+def test_mixing_str_and_bytes_is_refused():
+    with pytest.raises(TypeError):
+        regexset.compile(["a", b"b"])
@@ -0,0 +1,98 @@
+import io
+import mmap
+import re
+
+import pytest
+
+import streaming
+
+CHUNK_SIZES = (1, 2, 3, 5, 8)
+
+# Alternations where a later position in the tail of a chunk needs text from the next chunk before it matches:
+# the positions before it that failed for lack of text have to be searched again
+REGRESSIONS = (
+    (r'"\w*"|\d', '"22" x'),
+    (r"ab*c|b", "z zxabcobz 1xx"),
+    (r"foo\b|o", "xfoo fo foox foo"),
+)
+
+
+def mismatches(pattern, string, flags=0, chunk_sizes=CHUNK_SIZES, overlap=8):
+    """The chunk sizes for which streaming.finditer() doesn't find what re.finditer() finds in the whole string"""
+    expected = [m.span() for m in re.finditer(pattern, string, flags)]
+    return [
+        chunk_size
+        for chunk_size in chunk_sizes
+        if [
+            m.span()
+            for m in streaming.finditer(pattern, string, flags, chunk_size, overlap)
+        ]
+        != expected
+    ]
+
+
+@pytest.mark.parametrize("pattern, string", REGRESSIONS)
+def test_regressions(pattern, string):
+    assert mismatches(pattern, string) == []
+
+
+@pytest.mark.parametrize(
+    "pattern, string",
+    [
+        (r"foo.*bar", "xx foo12bar\nfoobar"),
+        (r"\bfoo\b", "foo xfoo foo foox foo"),
+        (r"(?<=a)b", "abab bab"),
+        (r"b(?=a)", "abab bab"),
+        (r"a*", "baaab"),
+        (r"^\w+$", "one\ntwo\nthree"),
+        (r"(?m)^\w+$", "one\ntwo\nthree"),
+        (r"\d+", "1 22 333 4444"),
+    ],
+)
+def test_chunking_finds_what_re_finds(pattern, string):
+    assert mismatches(pattern, string) == []
+
+
+def test_random_cases(random_cases):
+    for pattern, string in random_cases(1000, seed=5, max_length=12):
+        assert mismatches(pattern, string) == [], (pattern, string)
+
+
+def test_groups_and_offsets():
+    found = list(streaming.finditer(r"(\w+)=(\d+)", "a=1 bb=22 ccc=333", chunk_size=4))
+    assert [(m.span(), m.groups(), m.span(2)) for m in found] == [
+        ((0, 3), ("a", "1"), (2, 3)),
+        ((4, 9), ("bb", "22"), (7, 9)),
+        ((10, 17), ("ccc", "333"), (14, 17)),
+    ]
+
+
+def test_sources(tmp_path):
+    text = "foo bar\n" * 1000 + "foo"
+    expected = [m.span() for m in re.finditer(r"\bfoo\b", text)]
+    path = tmp_path / "input.txt"
+    path.write_text(text)
+
+    def spans(pattern, source):
+        return [m.span() for m in streaming.finditer(pattern, source, chunk_size=100)]
+
+    with open(path) as f:
+        assert spans(r"\bfoo\b", f) == expected
+    with open(path, "rb") as f:
+        assert spans(rb"\bfoo\b", f) == expected
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            assert spans(rb"\bfoo\b", m) == expected
+    assert spans(r"\bfoo\b", io.StringIO(text)) == expected
+    pieces = [text[i : i + 7].encode() for i in range(0, len(text), 7)]
+    assert spans(rb"\bfoo\b", iter(pieces)) == expected
+
+
+def test_search_stops_at_the_first_match():
+    def pieces():
+        yield "xx foo"
+        yield " yy"
+        raise AssertionError("search() read past the first match")
+
+    # A match is final once <overlap> characters after it have been read
+    match = streaming.search(r"foo\b", pieces(), overlap=3)
+    assert match.span() == (3, 6)
@@ -0,0 +1,204 @@
+"""Finding every match of a character class pattern in a byte buffer with NumPy array operations"""
+import bisect
+import re
+from array import array
+
+import nfa
+import reparse
+import zerocopy
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, without it find_spans() falls back to re
+    numpy = None
+
+# The character classes of metacharacters.py ([0-9], [a-z], \d, \W, [\d\w\s], ...) only ever look at one byte.
+# For a byte buffer a class is a 256-entry table saying which byte values belong to it, and
+# table[buffer] answers the question for every byte of the buffer in one NumPy operation.
+# Patterns made of such classes with greedy quantifiers ([0-9][0-9][0-9], \d+, x-{1,4}x) are matched the same way:
+#   - for every class, an array holding at every position the length of the run of bytes in the class starting there
+#   - every position is a candidate start, each item moves all the candidates forward at once:
+#       a fixed item {n} needs a run of n, a variable item {m,n} takes min(run, n) bytes and needs at least m
+#   - the leftmost, non-overlapping matches are picked from the candidates that made it to the end
+# Taking as many bytes as possible is what re does too, as long as re can't be forced to give some back:
+# vectorizable() only accepts patterns where a variable item can't match the first byte of the item after it,
+# nor of the items after that as long as the ones in between can match nothing (\d?x*\d+ is left to re).
+# Everything else (and everything when NumPy isn't installed) goes through re.
+
+
+class Item:
+    """One class of the pattern with its repeat bounds, hi is None for an unbounded repeat"""
+
+    def __init__(self, table, lo, hi):
+        self.table = table
+        self.lo = lo
+        self.hi = hi
+
+    def __repr__(self):
+        return f"Item({sum(self.table)} bytes, {self.lo}, {self.hi})"
+
+
+def _table(op, av, flags):
+    ignorecase = bool(flags & re.IGNORECASE)
+    if op is reparse.LITERAL:
+        cls = nfa.CharClass([(op, av)], ignorecase, ascii=True)
+    elif op is reparse.NOT_LITERAL:
+        cls = nfa.CharClass(
+            [(reparse.NEGATE, None), (reparse.LITERAL, av)], ignorecase, ascii=True
+        )
+    elif op is reparse.IN:
+        cls = nfa.CharClass(av, ignorecase, ascii=True)
+    elif op is reparse.ANY:
+        return [bool(flags & re.DOTALL) or code != 10 for code in range(256)]
+    else:
+        return None
+    return [code in cls for code in range(256)]
+
+
+def vectorizable(pattern, flags=0):
+    """The Items pattern is made of, or None when it can't be matched by vectorized()"""
+    pattern = zerocopy._bytes_pattern(pattern)
+    try:
+        parsed = reparse.parse(pattern, flags)
+    except re.error:
+        return None
+    flags = parsed.state.flags
+    items = []
+    for op, av in parsed:
+        lo = hi = 1
+        if op is reparse.MAX_REPEAT:
+            lo, hi, body = av
+            if len(body) != 1:
+                return None
+            op, av = body[0]
+            hi = None if hi is reparse.MAXREPEAT else hi
+        try:
+            table = _table(op, av, flags)
+        except nfa.Unsupported:
+            return None
+        if table is None:
+            return None
+        items.append(Item(table, lo, hi))
+    if not items or all(item.lo == 0 for item in items):
+        # Patterns that can match the empty string produce empty matches between the bytes, leave them to re
+        return None
+    for i, item in enumerate(items):
+        if item.lo == item.hi:
+            continue
+        # Every later item the bytes after item can belong to: the next one, and past it as long as the items
+        # in between can match nothing
+        for following in items[i + 1 :]:
+            if any(a and b for a, b in zip(item.table, following.table)):
+                return None
+            if following.lo > 0:
+                break
+    return items
+
+
+def _run_lengths(mask):
+    """For every position the number of consecutive True values of mask starting there (one extra 0 at the end)"""
+    size = len(mask)
+    positions = numpy.arange(size + 1)
+    # Index of the first False at or after every position, found by a reversed running minimum
+    stops = numpy.where(numpy.append(mask, False), size + 1, positions)
+    stops = numpy.minimum.accumulate(stops[::-1])[::-1]
+    return stops - positions
+
+
+def _select(starts, ends):
+    """Leftmost non-overlapping matches among candidates sorted by start, as an (n, 2) array"""
+    # Candidates ending at the same place (e.g. every start inside a run of \d+) are only needed from
+    # the leftmost one on, unless an earlier match ends in the middle of them: then they overlap
+    _, first = numpy.unique(ends, return_index=True)
+    first.sort()
+    if numpy.all(ends[first[:-1]] <= starts[first[1:]]):
+        return numpy.stack((starts[first], ends[first]), axis=1)
+    # Otherwise walk from match to match, this loop runs once per match and not once per byte
+    start_list, end_list = starts.tolist(), ends.tolist()
+    chosen = []
+    index, count = 0, len(start_list)
+    while index < count:
+        chosen.append(index)
+        index = bisect.bisect_left(start_list, end_list[index], index + 1)
+    chosen = numpy.asarray(chosen, dtype=numpy.int64)
+    return numpy.stack((starts[chosen], ends[chosen]), axis=1)
+
+
+def _single(item, data):
+    # One repeated class: every run is cut in pieces of hi bytes, plus the rest if it is at least lo long
+    mask = numpy.asarray(item.table, dtype=bool)[data]
+    edges = numpy.diff(numpy.concatenate(([0], mask.view(numpy.int8), [0])))
+    starts = numpy.flatnonzero(edges == 1)
+    lengths = numpy.flatnonzero(edges == -1) - starts
+    if item.hi is None:
+        keep = lengths >= item.lo
+        return numpy.stack((starts[keep], starts[keep] + lengths[keep]), axis=1)
+    full, rest = numpy.divmod(lengths, item.hi)
+    pieces = full + (rest >= item.lo)
+    run = numpy.repeat(numpy.arange(len(starts)), pieces)
+    first = numpy.repeat(numpy.cumsum(pieces) - pieces, pieces)
+    offset = (numpy.arange(len(run)) - first) * item.hi
+    piece_starts = starts[run] + offset
+    piece_ends = numpy.minimum(piece_starts + item.hi, starts[run] + lengths[run])
+    return numpy.stack((piece_starts, piece_ends), axis=1)
+
+
+def _sequence(items, data):
+    size = len(data)
+    alive = numpy.ones(size + 1, dtype=bool)
+    # While the items are single bytes every candidate has moved by the same offset: a shifted mask will do
+    offset, positions = 0, None
+    for item in items:
+        mask = numpy.asarray(item.table, dtype=bool)[data]
+        if positions is None and item.lo == item.hi == 1:
+            end = max(0, size - offset)
+            alive[end:] = False
+            alive[:end] &= mask[offset:]
+            offset += 1
+            continue
+        if positions is None:
+            positions = numpy.minimum(numpy.arange(size + 1) + offset, size)
+        available = _run_lengths(mask)[positions]
+        if item.hi is None:
+            taken = available
+        else:
+            taken = numpy.minimum(available, item.hi)
+        alive &= taken >= item.lo
+        positions = positions + taken
+    starts = numpy.flatnonzero(alive)
+    ends = starts + offset if positions is None else positions[starts]
+    return _select(starts, ends)
+
+
+def vectorized(items, buffer, pos=0, endpos=None):
+    """Spans of the matches of items in buffer[pos:endpos] as an (n, 2) int64 NumPy array"""
+    data = numpy.frombuffer(buffer, dtype=numpy.uint8)[pos:endpos]
+    if len(items) == 1:
+        spans = _single(items[0], data)
+    else:
+        spans = _sequence(items, data)
+    return spans.astype(numpy.int64) + pos
+
+
+def find_spans(pattern, buffer, flags=0, pos=0, endpos=None):
+    """Spans of every match of pattern in buffer as a flat array("q") of start, end pairs
+
+    Uses the vectorized matcher when NumPy is installed and the pattern allows it, re otherwise.
+    """
+    if endpos is None:
+        endpos = len(buffer)
+    items = vectorizable(pattern, flags) if numpy is not None else None
+    if items is None:
+        spans = array("q")
+        for start, end in zerocopy.finditer_spans(pattern, buffer, flags, pos, endpos):
+            spans.append(start)
+            spans.append(end)
+        return spans
+    spans = array("q")
+    spans.frombytes(vectorized(items, buffer, pos, endpos).tobytes())
+    return spans
+
+
+def count(pattern, buffer, flags=0):
+    """Number of matches of pattern in buffer"""
+    return len(find_spans(pattern, buffer, flags)) // 2
@@ -0,0 +1,67 @@
+"""Byte pattern searches straight over mmap.mmap and memoryview buffers"""
+import contextlib
+import mmap
+
+import recache
+
+# The byte oriented patterns from metacharacters.py (\d, [0-9a-fA-F], \s, ...) don't need the input decoded to str.
+# The re module accepts anything that supports the buffer protocol: bytes, bytearray, memoryview and mmap.mmap.
+# Searching a memory mapped file means the operating system pages the file in (and out again) as the
+# regex engine walks over it, instead of Python reading and decoding all of it into one huge string first.
+# The functions below only hand back (start, end) spans, slicing the buffer is left to the caller
+# for the few matches whose text is actually needed.
+
+
+def _bytes_pattern(pattern):
+    if isinstance(pattern, str):
+        try:
+            return pattern.encode("ascii")
+        except UnicodeEncodeError:
+            raise ValueError(
+                "only ASCII str patterns can be used on byte buffers, pass a bytes pattern"
+            ) from None
+    return pattern
+
+
+def compile(pattern, flags=0):
+    """Compile pattern as a bytes regex, an ASCII str pattern is encoded first"""
+    return recache.compile(_bytes_pattern(pattern), flags)
+
+
+def finditer_spans(pattern, buffer, flags=0, pos=0, endpos=None):
+    """Yield the (start, end) span of every match of pattern in buffer without copying the buffer"""
+    regex = compile(pattern, flags)
+    if endpos is None:
+        endpos = len(buffer)
+    for m in regex.finditer(buffer, pos, endpos):
+        yield m.span()
+
+
+def search_span(pattern, buffer, flags=0, pos=0, endpos=None):
+    """Return the span of the first match of pattern in buffer, or None"""
+    if endpos is None:
+        endpos = len(buffer)
+    m = compile(pattern, flags).search(buffer, pos, endpos)
+    return None if m is None else m.span()
+
+
+def count(pattern, buffer, flags=0):
+    """Number of matches of pattern in buffer"""
+    return sum(1 for _ in finditer_spans(pattern, buffer, flags))
+
+
+@contextlib.contextmanager
+def mapped(path):
+    """Map the file at path read-only, yielding an mmap (or b"" for an empty file, which can't be mapped)"""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def search_file(pattern, path, flags=0):
+    """Yield the spans of every match of pattern in the file at path, searching the mapped file in place"""
+    with mapped(path) as buffer:
+        yield from finditer_spans(pattern, buffer, flags)